@@ -43,6 +43,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "accounts",
     "reviews",
     "restaurants",
@@ -67,6 +68,9 @@ CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",  # React development server
 ]
 
+# Keyset-paginated list endpoints expose the next page in a Link header
+CORS_EXPOSE_HEADERS = ["Link"]
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
@@ -74,6 +78,19 @@ REST_FRAMEWORK = {
     ),
 }
 
+# restaurants.pagination.KeysetPagination
+API_PAGE_SIZE     = 50
+API_MAX_PAGE_SIZE = 200
+
+# restaurants.ranking – Bayesian-average list order: a restaurant without
+# reviews scores PRIOR_MEAN, and counts as PRIOR_WEIGHT reviews of it
+# (run `manage.py repair_review_aggregates` after changing these)
+RANKING_PRIOR_MEAN   = 3.5
+RANKING_PRIOR_WEIGHT = 10
+
+# /api/restaurants/nearby/ radius cap
+NEARBY_MAX_RADIUS_KM = 100
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(hours=1),  # Default is 5 minutes
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
@@ -131,6 +148,80 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Per-process memory by default; point "default" at Redis/Memcached when
+# running several gunicorn workers so they share availability bitmaps.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
+}
+
+# restaurants.response_cache – anonymous GETs of the restaurant list/detail,
+# reviews and tables.  Generations (and, with RESPONSE_CACHE_SHARED, bodies)
+# live in RESPONSE_CACHE_ALIAS – use a shared backend with several workers.
+RESPONSE_CACHE_ENABLED   = os.getenv("RESPONSE_CACHE_ENABLED", "1") != "0"
+RESPONSE_CACHE_ALIAS     = "default"
+RESPONSE_CACHE_SHARED    = False
+RESPONSE_CACHE_TIMEOUT   = 300                  # seconds
+RESPONSE_CACHE_MAX_BYTES = 32 * 1024 * 1024     # in-process LRU, per worker
+
+# restaurants.availability – per (restaurant, date) free-slot bitmaps
+AVAILABILITY_CACHE_ALIAS   = "default"
+AVAILABILITY_CACHE_TIMEOUT = int(os.getenv("AVAILABILITY_CACHE_TIMEOUT", 300))  # seconds
+
+# restaurants.allocation – party seating: at most this many tables joined,
+# each extra table costs as much as this many empty seats
+ALLOCATION_MAX_TABLES   = 4
+ALLOCATION_JOIN_PENALTY = 2
+
+# restaurants.waitlist – widest earliest–latest window a guest may wait
+# for, and how many waiters one freed table is offered to
+WAITLIST_MAX_WINDOW_MINUTES = 120
+WAITLIST_NOTIFY_BATCH       = 10
+
+
+# restaurants.google_cache – persistent Google Maps API cache
+GOOGLE_MAPS_BASE_URL   = os.getenv("GOOGLE_MAPS_BASE_URL", "https://maps.googleapis.com/maps/api")
+GOOGLE_API_TIMEOUT     = (3.05, 10)                 # (connect, read) seconds
+GOOGLE_API_POOL_SIZE   = 10                         # keep-alive connections per process
+GOOGLE_API_CONCURRENCY = 8                          # batch fetch threads per process
+GOOGLE_API_MAX_PER_HOST = 8                         # concurrent calls to one host
+GOOGLE_API_RETRIES     = 2                          # for timeouts, 429 / 5xx, OVER_QUERY_LIMIT
+GOOGLE_API_BACKOFF     = 0.2                        # seconds, doubled per retry (full jitter)
+GOOGLE_CACHE_TTL       = {                          # fresh for, seconds
+    "geocode": 30 * 24 * 3600,
+    "nearby":  24 * 3600,
+    "details": 24 * 3600,
+}
+GOOGLE_CACHE_MAX_STALE = 7 * 24 * 3600              # then served stale while refreshing
+GOOGLE_CACHE_MEMORY_ENTRIES = 2048                  # in-process LRU in front of the table
+
+# restaurants.background – thread pools for fire-and-forget work
+BACKGROUND_WORKERS = int(os.getenv("BACKGROUND_WORKERS", 4))
+BACKGROUND_POOLS   = {
+    "default": BACKGROUND_WORKERS,
+    "photos":  int(os.getenv("PHOTO_WORKERS", 4)),   # restaurants.photos resizing / S3 uploads
+    "mail":    int(os.getenv("MAIL_WORKERS", 2)),    # restaurants.bookings confirmation e-mails
+}
+
+# restaurants.photos – originals wait here until the photos pool has uploaded them
+PHOTO_SPOOL_DIR = os.getenv("PHOTO_SPOOL_DIR", os.path.join(BASE_DIR, "photo_spool"))
+
+# restaurants.renditions – longest edge in px, and output formats ("avif" needs Pillow >= 11.3)
+PHOTO_RENDITION_SIZES   = (150, 480, 1024, 2048)
+PHOTO_RENDITION_FORMATS = ("webp", "jpeg")
+
+
+# restaurants.search – PostgresSearchBackend, InMemorySearchBackend or
+# SubstringSearchBackend (see restaurants/search.py)
+RESTAURANT_SEARCH_BACKEND = os.getenv(
+    "RESTAURANT_SEARCH_BACKEND", "restaurants.search.PostgresSearchBackend"
+)
+SEARCH_MAX_RESULTS = 1000   # InMemorySearchBackend: ids handed to the database per query
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -188,6 +279,28 @@ AWS_S3_BUCKET_NAME = os.getenv('AWS_S3_BUCKET_NAME')
 
 USE_AWS_STORAGE = all([AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY, AWS_S3_BUCKET_NAME])
 
+# restaurants.storage – photo storage backend: S3Storage or LocalStorage
+PHOTO_STORAGE_BACKEND = os.getenv('PHOTO_STORAGE_BACKEND', 'restaurants.storage.S3Storage')
+LOCAL_STORAGE_ROOT    = os.getenv('LOCAL_STORAGE_ROOT', os.path.join(BASE_DIR, 'media_store'))
+# e.g. 'X-Accel-Redirect' behind nginx (internal location LOCAL_STORAGE_SENDFILE_PREFIX
+# aliased to LOCAL_STORAGE_ROOT) or 'X-Sendfile'; unset streams via FileResponse
+LOCAL_STORAGE_SENDFILE_HEADER = os.getenv('LOCAL_STORAGE_SENDFILE_HEADER')
+LOCAL_STORAGE_SENDFILE_PREFIX = '/protected-media/'
+
+# Photo URLs: keys are content-addressed, so objects can be cached for good.
+# With signing on, objects are private and URLs carry an expiring signature
+# (SigV4 for S3, HMAC for local storage), computed without network calls.
+PHOTO_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+PHOTO_URL_SIGNING   = os.getenv('PHOTO_URL_SIGNING', '').lower() in ('1', 'true', 'yes')
+PHOTO_URL_EXPIRY    = int(os.getenv('PHOTO_URL_EXPIRY', 3600))           # seconds
+
+# S3Storage – shared client and transfer tuning
+AWS_S3_ENDPOINT_URL          = os.getenv('AWS_S3_ENDPOINT_URL')      # MinIO / LocalStack / moto
+AWS_S3_MAX_POOL_CONNECTIONS  = int(os.getenv('AWS_S3_MAX_POOL_CONNECTIONS', 32))
+AWS_S3_MULTIPART_THRESHOLD   = 8 * 1024 * 1024
+AWS_S3_MULTIPART_CHUNKSIZE   = 8 * 1024 * 1024
+AWS_S3_MAX_CONCURRENCY       = 4                                      # parts in flight per upload
+
 FILE_UPLOAD_HANDLERS = [
     'django.core.files.uploadhandler.TemporaryFileUploadHandler',
 ]
@@ -0,0 +1,139 @@
+# restaurants/allocation.py
+# ---------------------------------------------------------------------
+#  Table allocation for a party
+# ---------------------------------------------------------------------
+#  Given the tables free at one restaurant, date and start time, pick
+#  the single table or set of tables to seat ``num_people``, minimising
+#
+#      cost = empty seats + ALLOCATION_JOIN_PENALTY · (tables - 1)
+#
+#  with at most ALLOCATION_MAX_TABLES tables; ties go to fewer tables,
+#  then to the lowest table ids.  The penalty keeps a 6-top for a party
+#  of four ahead of joining two 2-tops (both cost 2) while still letting
+#  a party of ten take a 6 and a 4 instead of waiting for a 12-top.
+#
+#  It is a small bounded knapsack: tables of the same size are
+#  interchangeable, so the DP runs over distinct sizes and seat totals
+#  up to num_people + largest size - 1 (a set seating more than that has
+#  a table it doesn't need).  Roughly sizes × seats × max tables steps,
+#  independent of how many 2-tops the restaurant has.
+#
+#  Free tables come from the cached availability entries
+#  (restaurants/availability.py), so allocating costs no queries on a
+#  cache hit.  Any free tables may be joined – there is no floor plan.
+# ---------------------------------------------------------------------
+from collections import defaultdict
+
+from django.conf import settings
+
+from .availability import get_entries, load_entries, slot_window
+from .models import TableSlot
+
+DEFAULT_MAX_TABLES   = 4
+DEFAULT_JOIN_PENALTY = 2
+
+
+def limits():
+    """``(max tables, seats charged per extra table)`` from settings."""
+    max_tables = int(getattr(settings, "ALLOCATION_MAX_TABLES", DEFAULT_MAX_TABLES))
+    penalty    = int(getattr(settings, "ALLOCATION_JOIN_PENALTY", DEFAULT_JOIN_PENALTY))
+    return max(max_tables, 1), max(penalty, 0)
+
+
+def free_tables(entry, minute):
+    """
+    ``[(table_id, size), …]`` not booked at ``minute`` that book_table()
+    would accept then: a slot within ``slot_window(minute)``, or no slots.
+    """
+    low, high = slot_window(minute)
+    tables, _ = entry
+    return [
+        (table_id, size)
+        for table_id, size, offered, booked, _ in tables
+        if minute not in booked and (not offered or any(low <= m <= high for m in offered))
+    ]
+
+
+def cost(sizes, num_people, penalty=None):
+    if penalty is None:
+        penalty = limits()[1]
+    return sum(sizes) - num_people + penalty * (len(sizes) - 1)
+
+
+def allocate(tables, num_people, max_tables=None, penalty=None):
+    """
+    Cheapest set of ``tables`` seating ``num_people`` (see module docstring).
+
+    Args:
+        tables: iterable of ``(table_id, size)``.
+        num_people (int): party size, >= 1.
+
+    Returns:
+        list[tuple] | None: chosen ``(table_id, size)``, largest first, or
+        None when no allowed combination seats the party.
+    """
+    default_max, default_penalty = limits()
+    max_tables = default_max if max_tables is None else max_tables
+    penalty    = default_penalty if penalty is None else penalty
+
+    by_size = defaultdict(list)
+    for table_id, size in tables:
+        if size > 0:
+            by_size[size].append(table_id)
+    if not by_size:
+        return None
+    for ids in by_size.values():
+        ids.sort()
+    sizes = sorted(by_size)
+    cap   = num_people + sizes[-1] - 1
+
+    # fewest[s] = (tables, {size: count}) reaching exactly s seats
+    fewest = {0: (0, {})}
+    for size in sizes:
+        copies = min(len(by_size[size]), max_tables)
+        for total, (count, used) in sorted(fewest.items(), reverse=True):
+            for k in range(1, copies + 1):
+                seats = total + k * size
+                if seats > cap or count + k > max_tables:
+                    break
+                if seats not in fewest or fewest[seats][0] > count + k:
+                    fewest[seats] = (count + k, {**used, size: k})
+
+    best = None
+    for seats, (count, used) in fewest.items():
+        if seats < num_people:
+            continue
+        rank = (seats - num_people + penalty * (count - 1), count)
+        if best is None or rank < best[0]:
+            best = (rank, used)
+    if best is None:
+        return None
+
+    chosen = [
+        (table_id, size)
+        for size, k in best[1].items()
+        for table_id in by_size[size][:k]
+    ]
+    return sorted(chosen, key=lambda t: (-t[1], t[0]))
+
+
+def split_party(chosen, num_people):
+    """Seats per chosen table: fill the largest first, so none is left empty."""
+    remaining, seats = num_people, []
+    for table_id, size in chosen:
+        taken = min(size, remaining)
+        seats.append((table_id, taken))
+        remaining -= taken
+    return seats
+
+
+def allocate_for(restaurant_id, date, time, num_people, fresh=False):
+    """
+    ``allocate()`` over the tables free at ``restaurant_id`` on ``date``
+    at ``time``; ``fresh`` reads the database instead of the cache.
+    """
+    if fresh:
+        entry = load_entries([restaurant_id], date)[restaurant_id]
+    else:
+        entry = get_entries([restaurant_id], date)[restaurant_id]
+    return allocate(free_tables(entry, TableSlot.to_minute(time)), num_people)
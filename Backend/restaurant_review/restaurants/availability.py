@@ -0,0 +1,336 @@
+# restaurants/availability.py
+# ---------------------------------------------------------------------
+#  Availability engine used by RestaurantSearchView
+# ---------------------------------------------------------------------
+#  Answers "which tables are free on <date> within ±30 min of <time>
+#  for <num_people>, optionally narrowed by city/state or zip code".
+#
+#  Free slots are cached per (restaurant, date) as compact bitmaps: one
+#  bit per half-hour of the day, one bitmap per table plus one per
+#  table-size bucket.  A search is then
+#
+#    1. one query for the restaurants matching the location filters
+#    2. one cache round-trip for their (restaurant, date) entries
+#    3. bitwise ANDs of each entry against the requested window
+#
+#  Cache misses are rebuilt in bulk (tables and slots + BOOKED slots for
+#  the date) with a fixed number of queries.  Entries are dropped when a
+#  booking on that date is created or cancelled, and a restaurant's
+#  whole set of entries is retired (version bump) when its tables change.
+# ---------------------------------------------------------------------
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Count, Q
+from django.utils.timezone import localdate
+
+from .models import Restaurant, Table, TableSlot, Booking
+
+SEARCH_WINDOW_MINUTES = 30
+LAST_MINUTE_OF_DAY    = 24 * 60 - 1
+SLOT_MINUTES          = 30             # one bitmap bit per half-hour
+TABLE_SIZE_BUCKETS    = (2, 4, 6, 8)   # bucket b holds tables seating >= b
+
+CACHE_PREFIX = "availability"
+MISS_CHUNK   = 500
+
+
+def _cache():
+    return caches[getattr(settings, "AVAILABILITY_CACHE_ALIAS", "default")]
+
+
+def _timeout():
+    return getattr(settings, "AVAILABILITY_CACHE_TIMEOUT", 300)
+
+
+def slot_window(minute, width=SEARCH_WINDOW_MINUTES):
+    """Inclusive (low, high) minute-of-day bounds around ``minute``."""
+    return max(0, minute - width), min(LAST_MINUTE_OF_DAY, minute + width)
+
+
+def window_mask(low, high):
+    """Bitmap with every half-hour bit overlapping [low, high] set."""
+    first, last = low // SLOT_MINUTES, high // SLOT_MINUTES
+    return ((1 << (last - first + 1)) - 1) << first
+
+
+def bucket_index(num_people):
+    """
+    Index into an entry's bucket bitmaps for a party size: the narrowest
+    bucket that still contains every table able to seat the party
+    (0 = every table).
+    """
+    index = 0
+    for i, size in enumerate(TABLE_SIZE_BUCKETS, start=1):
+        if size <= num_people:
+            index = i
+    return index
+
+
+def restaurants_for_location(city_state="", zip_code=""):
+    """Restaurants matching the optional city/state substring and zip code."""
+    qs = Restaurant.objects.all()
+    if city_state:
+        qs = qs.filter(Q(city__icontains=city_state) | Q(state__icontains=city_state))
+    if zip_code:
+        qs = qs.filter(zip_code=zip_code)
+    return qs
+
+
+def booked_slots(restaurants, date):
+    """
+    Load every active booking on ``date`` for ``restaurants`` in one query.
+
+    Returns a set of ``(table_id, minute_of_day)`` tuples.
+    """
+    return {
+        (table_id, TableSlot.to_minute(time))
+        for table_id, time in Booking.objects.filter(
+            restaurant__in=restaurants,
+            date=date,
+            status=Booking.Status.BOOKED,
+        ).values_list("table_id", "time")
+    }
+
+
+def bookings_today_by_restaurant(restaurants):
+    """{restaurant_id: number of bookings for today}, one grouped query."""
+    rows = (
+        Booking.objects.filter(restaurant__in=restaurants, date=localdate())
+        .values("restaurant_id")
+        .annotate(n=Count("id"))
+    )
+    return {row["restaurant_id"]: row["n"] for row in rows}
+
+
+# ---------------------------------------------------------------------
+#  Cache entries
+# ---------------------------------------------------------------------
+#  entry = (tables, buckets)
+#    tables  : ((table_id, size, offered_minutes, booked_minutes, free_bits), …)
+#              in Table.Meta.ordering order (size).  Tables without slots
+#              (bookable at any time) are listed with no offered minutes,
+#              so they never show up in a search but can be allocated.
+#    buckets : (all tables, size >= 2, size >= 4, size >= 6, size >= 8)
+#              each the OR of its member tables' free_bits
+# ---------------------------------------------------------------------
+
+def _version_key(restaurant_id):
+    return f"{CACHE_PREFIX}:version:{restaurant_id}"
+
+
+def _entry_key(restaurant_id, version, date):
+    return f"{CACHE_PREFIX}:{restaurant_id}:{version}:{date.isoformat()}"
+
+
+def _today_key(restaurant_id, date):
+    return f"{CACHE_PREFIX}:today:{restaurant_id}:{date.isoformat()}"
+
+
+def _free_bits(offered, booked):
+    bits = 0
+    for minute in offered:
+        if minute not in booked:
+            bits |= 1 << (minute // SLOT_MINUTES)
+    return bits
+
+
+def build_entry(tables):
+    """``tables``: iterable of (table_id, size, offered_minutes, booked_minutes)."""
+    rows    = []
+    buckets = [0] * (len(TABLE_SIZE_BUCKETS) + 1)
+    for table_id, size, offered, booked in tables:
+        bits = _free_bits(offered, booked)
+        rows.append((table_id, size, tuple(offered), frozenset(booked), bits))
+        buckets[0] |= bits
+        for i, bucket_size in enumerate(TABLE_SIZE_BUCKETS, start=1):
+            if size >= bucket_size:
+                buckets[i] |= bits
+    return tuple(rows), tuple(buckets)
+
+
+def _restaurant_filters(restaurant_ids, location):
+    """Yield restaurant sub-selects / id chunks covering ``restaurant_ids``."""
+    if location is not None:
+        yield location.values("id")
+        return
+    for i in range(0, len(restaurant_ids), MISS_CHUNK):
+        yield restaurant_ids[i:i + MISS_CHUNK]
+
+
+def load_entries(restaurant_ids, date, location=None):
+    """
+    Build cache entries for ``restaurant_ids`` on ``date`` straight from
+    the database.  Pass ``location`` when it selects exactly those
+    restaurants; it is used as a sub-select, keeping the query count fixed.
+    """
+    restaurant_ids = list(restaurant_ids)
+    offered = defaultdict(list)        # (rest_id, table_id, size) -> [minute, …]
+    booked  = defaultdict(set)         # table_id -> {minute, …}
+    for restaurants in _restaurant_filters(restaurant_ids, location):
+        # LEFT JOIN: a table without slots comes back once, minute None
+        slots = (
+            Table.objects.filter(restaurant__in=restaurants)
+            .order_by("restaurant", "size", "id", "slots__minute")
+            .values_list("restaurant_id", "id", "size", "slots__minute")
+        )
+        for rest_id, table_id, size, minute in slots:
+            minutes = offered[(rest_id, table_id, size)]
+            if minute is not None:
+                minutes.append(minute)
+        for table_id, minute in booked_slots(restaurants, date):
+            booked[table_id].add(minute)
+
+    per_restaurant = defaultdict(list)
+    for (rest_id, table_id, size), minutes in offered.items():
+        per_restaurant[rest_id].append((table_id, size, minutes, booked.get(table_id, ())))
+    return {
+        rest_id: build_entry(per_restaurant.get(rest_id, ()))
+        for rest_id in restaurant_ids
+    }
+
+
+def _versions(restaurant_ids):
+    cache    = _cache()
+    keys     = {_version_key(rid): rid for rid in restaurant_ids}
+    found    = cache.get_many(keys)
+    versions = {keys[k]: v for k, v in found.items()}
+    missing  = {k: time.time_ns() for k in keys if k not in found}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        versions.update({keys[k]: v for k, v in missing.items()})
+    return versions
+
+
+def get_entries(restaurant_ids, date, location=None):
+    """{restaurant_id: entry} for ``date``, rebuilding cache misses in bulk."""
+    cache    = _cache()
+    versions = _versions(restaurant_ids)
+    keys     = {_entry_key(rid, versions[rid], date): rid for rid in restaurant_ids}
+    entries  = {keys[k]: v for k, v in cache.get_many(keys).items()}
+
+    missing = [rid for rid in restaurant_ids if rid not in entries]
+    if missing:
+        everything = len(missing) == len(restaurant_ids)
+        fresh = load_entries(missing, date, location if everything else None)
+        cache.set_many(
+            {_entry_key(rid, versions[rid], date): entry for rid, entry in fresh.items()},
+            timeout=_timeout(),
+        )
+        entries.update(fresh)
+    return entries
+
+
+def get_bookings_today(restaurant_ids, location=None):
+    """Cached {restaurant_id: number of bookings for today}."""
+    cache   = _cache()
+    today   = localdate()
+    keys    = {_today_key(rid, today): rid for rid in restaurant_ids}
+    counts  = {keys[k]: v for k, v in cache.get_many(keys).items()}
+
+    missing = [rid for rid in restaurant_ids if rid not in counts]
+    if missing:
+        everything = location is not None and len(missing) == len(restaurant_ids)
+        found = bookings_today_by_restaurant(location.values("id") if everything else missing)
+        fresh = {rid: found.get(rid, 0) for rid in missing}
+        cache.set_many(
+            {_today_key(rid, today): n for rid, n in fresh.items()}, timeout=_timeout()
+        )
+        counts.update(fresh)
+    return counts
+
+
+# ---------------------------------------------------------------------
+#  Invalidation
+# ---------------------------------------------------------------------
+
+def invalidate_booking(booking):
+    """
+    Drop the cached entry for the booking's (restaurant, date).  Call
+    once a Booking is created or cancelled (from ``transaction.on_commit``).
+    """
+    cache   = _cache()
+    version = cache.get(_version_key(booking.restaurant_id))
+    if version is not None:
+        cache.delete(_entry_key(booking.restaurant_id, version, booking.date))
+    cache.delete(_today_key(booking.restaurant_id, booking.date))
+
+
+def invalidate_restaurant(restaurant_id):
+    """Retire every cached date of a restaurant, e.g. after its tables change."""
+    _cache().set(_version_key(restaurant_id), time.time_ns(), timeout=None)
+
+
+# ---------------------------------------------------------------------
+#  Search
+# ---------------------------------------------------------------------
+
+def search_availability(requested, num_people, city_state="", zip_code=""):
+    """
+    Build the RestaurantSearchView payload.
+
+    Args:
+        requested (datetime): requested date and time.
+        num_people (int): party size; only tables with ``size >= num_people``
+            are considered.
+        city_state (str): optional substring matched against city or state.
+        zip_code (str): optional exact zip code.
+
+    Returns:
+        list[dict]: one entry per restaurant with at least one free slot::
+
+            {"restaurant_id", "name", "address", "rating",
+             "tables": [{"id", "size", "times"}], "bookings_today"}
+    """
+    low, high = slot_window(TableSlot.to_minute(requested))
+    mask      = window_mask(low, high)
+    bucket    = bucket_index(num_people)
+
+    location = restaurants_for_location(city_state, zip_code)
+    restaurants = {
+        r["id"]: r for r in location.values("id", "name", "address", "rating")
+    }
+    if not restaurants:
+        return []
+
+    entries = get_entries(list(restaurants), requested.date(), location)
+
+    # restaurant_id -> [table payload, …]
+    free_tables = {}
+    for rest_id, (tables, buckets) in entries.items():
+        if not buckets[bucket] & mask:
+            continue
+        matches = []
+        for table_id, size, offered, booked, bits in tables:
+            if size < num_people or not bits & mask:
+                continue
+            # bits are half-hour grained; confirm the exact minutes
+            times = [
+                TableSlot.as_hhmm(m) for m in offered
+                if low <= m <= high and m not in booked
+            ]
+            if times:
+                matches.append({"id": table_id, "size": size, "times": times})
+        if matches:
+            free_tables[rest_id] = matches
+
+    if not free_tables:
+        return []
+    bookings_today = get_bookings_today(list(restaurants), location)
+
+    # keep the restaurant ordering of the location queryset
+    payload = []
+    for rest_id, rest in restaurants.items():
+        if rest_id not in free_tables:
+            continue
+        payload.append({
+            "restaurant_id":  rest_id,
+            "name":           rest["name"],
+            "address":        rest["address"],
+            "rating":         rest["rating"],
+            "tables":         free_tables[rest_id],
+            "bookings_today": bookings_today.get(rest_id, 0),
+        })
+    return payload
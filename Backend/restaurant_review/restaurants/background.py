@@ -0,0 +1,68 @@
+# restaurants/background.py
+# ---------------------------------------------------------------------
+#  Process-wide thread pools for fire-and-forget work
+# ---------------------------------------------------------------------
+#  Used for work that must not hold up a response (refreshing a stale
+#  Google cache entry, resizing photos).  Tasks run on their own DB
+#  connection, which is closed when the task ends.
+#
+#  Pools are named so slow work can't starve quick work; sizes come from
+#  settings.BACKGROUND_POOLS ({name: workers}), unknown names get
+#  settings.BACKGROUND_WORKERS threads.
+#
+#  settings.BACKGROUND_TASKS_EAGER = True runs tasks inline, which keeps
+#  tests inside their transaction.
+# ---------------------------------------------------------------------
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+
+logger = logging.getLogger(__name__)
+
+_executors      = {}
+_executors_lock = threading.Lock()
+
+
+def _get_executor(pool):
+    if pool not in _executors:
+        with _executors_lock:
+            if pool not in _executors:
+                workers = getattr(settings, "BACKGROUND_POOLS", {}).get(
+                    pool, getattr(settings, "BACKGROUND_WORKERS", 4)
+                )
+                _executors[pool] = ThreadPoolExecutor(
+                    max_workers=workers, thread_name_prefix=f"restaurants-{pool}"
+                )
+    return _executors[pool]
+
+
+def _run(fn, args, kwargs):
+    close_old_connections()
+    try:
+        return fn(*args, **kwargs)
+    except Exception:
+        logger.exception("background task %s failed", getattr(fn, "__name__", fn))
+        raise
+    finally:
+        connection.close()
+
+
+def submit(fn, *args, **kwargs):
+    """Run ``fn(*args, **kwargs)`` off the request thread; returns a Future."""
+    return submit_to("default", fn, *args, **kwargs)
+
+
+def submit_to(pool, fn, *args, **kwargs):
+    """``submit()`` on the named pool."""
+    if getattr(settings, "BACKGROUND_TASKS_EAGER", False):
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as exc:
+            logger.exception("background task %s failed", getattr(fn, "__name__", fn))
+            future.set_exception(exc)
+        return future
+    return _get_executor(pool).submit(_run, fn, args, kwargs)
@@ -0,0 +1,237 @@
+# restaurants/bookings.py
+# ---------------------------------------------------------------------
+#  Booking a table
+# ---------------------------------------------------------------------
+#  Optimistic: no lock is taken on the Table row.  The partial unique
+#  constraint ``unique_active_table_booking`` (one BOOKED row per
+#  table, date and time) is the only arbiter – the insert is attempted
+#  and a violation means somebody else got the slot first.  Bookings
+#  for different slots of the same table never wait on each other.
+#
+#      1 query   table + slot window check (annotated)
+#      1 insert  inside a savepoint, so a conflict doesn't poison an
+#                outer transaction (ATOMIC_REQUESTS, tests)
+#
+#  The confirmation e-mail is sent from the "mail" background pool once
+#  the booking has committed, so SMTP latency stays off the request.
+#
+#  ``book_party()`` lets restaurants/allocation.py choose the table – or
+#  tables, for a large party – and books them in one transaction.
+#
+#  Status changes of many bookings at once (nightly completion, closing
+#  a restaurant for a day) go through ``transition_status()``: one
+#  UPDATE, no per-row save() or signals.  ``complete_past_bookings()``
+#  (manage.py complete_past_bookings) walks the partial index of BOOKED
+#  rows by (date, time, id) and completes the past ones chunk by chunk.
+# ---------------------------------------------------------------------
+import logging
+
+from django.core.mail import send_mail
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from . import background, response_cache
+from .allocation import allocate_for, split_party
+from .availability import invalidate_booking, slot_window
+from .models import Booking, Table, TableSlot
+
+logger = logging.getLogger(__name__)
+
+MAIL_POOL = "mail"
+
+
+class BookingRejected(Exception):
+    """The request can never succeed as asked (HTTP 400)."""
+
+
+class BookingConflict(Exception):
+    """The slot was taken by another booking (HTTP 409)."""
+
+
+def _reject_past(date, time):
+    now = timezone.localtime()
+    if date < now.date() or (date == now.date() and time <= now.time()):
+        raise BookingRejected("Cannot book in the past.")
+
+
+def book_table(user, restaurant_id, table_id, date, time, num_people, notify=True):
+    """
+    Book ``table_id`` for ``date`` ``time``; ``notify`` e-mails the guest.
+
+    Returns:
+        Booking: the new BOOKED row.
+
+    Raises:
+        BookingRejected: past slot, unknown table, too small, outside its slots.
+        BookingConflict: the table is already booked at that time.
+    """
+    _reject_past(date, time)
+
+    low, high = slot_window(TableSlot.to_minute(time))
+    table = (
+        Table.objects.filter(id=table_id, restaurant_id=restaurant_id)
+        .annotate(
+            total_slots=Count("slots"),
+            slots_in_window=Count("slots", filter=Q(slots__minute__range=(low, high))),
+        )
+        .only("id", "size", "restaurant_id")
+        .first()
+    )
+    if table is None:
+        raise BookingRejected("Table / restaurant mismatch.")
+    if num_people > table.size:
+        raise BookingRejected("Table seats fewer than requested party.")
+    if table.total_slots and not table.slots_in_window:
+        raise BookingRejected("Requested time outside allowed slots.")
+
+    try:
+        with transaction.atomic():
+            booking = Booking.objects.create(
+                user=user,
+                restaurant_id=restaurant_id,
+                table=table,
+                date=date,
+                time=time,
+                num_people=num_people,
+            )
+    except IntegrityError:
+        # only the partial unique constraint is expected to fire here
+        if Booking.objects.filter(
+            table_id=table_id, date=date, time=time, status=Booking.Status.BOOKED
+        ).exists():
+            raise BookingConflict("Table already booked at that time.")
+        raise
+
+    if notify:
+        transaction.on_commit(lambda: background.submit_to(MAIL_POOL, send_confirmation, booking.pk))
+    return booking
+
+
+def book_party(user, restaurant_id, date, time, num_people, notify=True):
+    """
+    Book the table or tables restaurants.allocation picks for a party,
+    all or nothing.  If another booking took one of them first, the
+    allocation is redone once from the database before giving up.
+
+    Returns:
+        list[Booking]: one per table, largest table first.
+
+    Raises:
+        BookingRejected: a slot in the past.
+        BookingConflict: no free combination of tables seats the party.
+    """
+    _reject_past(date, time)
+    for fresh in (False, True):
+        chosen = allocate_for(restaurant_id, date, time, num_people, fresh=fresh)
+        if chosen is None:
+            break
+        try:
+            with transaction.atomic():
+                bookings = [
+                    Booking.objects.create(
+                        user=user,
+                        restaurant_id=restaurant_id,
+                        table_id=table_id,
+                        date=date,
+                        time=time,
+                        num_people=seats,
+                    )
+                    for table_id, seats in split_party(chosen, num_people)
+                ]
+        except IntegrityError:
+            continue                    # a table went meanwhile (or the cache was stale)
+        if notify:
+            transaction.on_commit(lambda: background.submit_to(
+                MAIL_POOL, send_confirmation, bookings[0].pk, num_people
+            ))
+        return bookings
+    raise BookingConflict("No free tables for that party at that time.")
+
+
+def send_confirmation(booking_id, num_people=None):
+    """E-mail the guest; worker entry point.  ``num_people`` for a whole party."""
+    booking = (
+        Booking.objects.select_related("user", "restaurant")
+        .filter(pk=booking_id).first()
+    )
+    if booking is None:
+        return
+    user = booking.user
+    try:
+        send_mail(
+            "Booking Confirmation",
+            (
+                f"Hi {user.first_name or user.username},\n\n"
+                f"Your table for {num_people or booking.num_people} at {booking.restaurant.name} "
+                f"on {booking.date:%B %d, %Y} at {booking.time:%H:%M} is confirmed."
+            ),
+            "noreply@restaurantapp.com",
+            [user.email],
+            fail_silently=False,
+        )
+    except Exception as e:
+        logger.error("Email send failed for booking %s: %s", booking_id, e)
+
+def transition_status(queryset, new_status):
+    """
+    Move every booking in ``queryset`` to ``new_status`` with one UPDATE,
+    stamping ``status_changed_at``.  Rows already in ``new_status`` keep
+    their stamp.  Bypasses save() and signals, so the cached availability
+    and responses of the affected (restaurant, date)s are retired here;
+    Booking instances already in memory are not refreshed.
+
+    Returns:
+        int: number of bookings changed.
+    """
+    if new_status not in Booking.Status.values:
+        raise ValueError(f"Unknown booking status: {new_status!r}")
+    pending = queryset.exclude(status=new_status)
+    with transaction.atomic():
+        touched = list(
+            pending.order_by().values_list("restaurant_id", "date").distinct()
+        )
+        if not touched:
+            return 0
+        now = timezone.now()
+        changed = pending.update(status=new_status, status_changed_at=now, updated_at=now)
+
+    def retire_availability():
+        for restaurant_id, date in touched:
+            invalidate_booking(Booking(restaurant_id=restaurant_id, date=date))
+
+    transaction.on_commit(retire_availability)
+    for restaurant_id in {restaurant_id for restaurant_id, _ in touched}:
+        response_cache.invalidate_restaurant(restaurant_id, listing=False)
+    return changed
+
+
+def _after(watermark):
+    date, time, pk = watermark
+    return Q(date__gt=date) | Q(date=date, time__gt=time) | Q(date=date, time=time, pk__gt=pk)
+
+
+def complete_past_bookings(now=None, chunk_size=1000, after=None):
+    """
+    Mark BOOKED bookings that started before ``now`` COMPLETED, one
+    ``transition_status()`` per chunk of ``chunk_size`` rows, in
+    (date, time, id) order.  Each chunk commits on its own, so an
+    interrupted run loses nothing; pass the last watermark as ``after``
+    to skip ahead (completed rows leave the index anyway).
+
+    Yields:
+        tuple: ``((date, time, id) watermark, bookings changed)`` per chunk.
+    """
+    now  = timezone.localtime(now)
+    past = Q(date__lt=now.date()) | Q(date=now.date(), time__lt=now.time())
+    booked = Booking.objects.filter(past, status=Booking.Status.BOOKED)
+    while True:
+        chunk = booked.filter(_after(after)) if after else booked
+        rows  = list(chunk.order_by("date", "time", "pk").values_list("date", "time", "pk")[:chunk_size])
+        if not rows:
+            return
+        after   = rows[-1]
+        changed = transition_status(
+            Booking.objects.filter(pk__in=[pk for _, _, pk in rows]), Booking.Status.COMPLETED
+        )
+        yield after, changed
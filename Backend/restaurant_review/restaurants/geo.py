@@ -0,0 +1,169 @@
+# restaurants/geo.py
+# ---------------------------------------------------------------------
+#  Geohash helpers for the nearby-search endpoint
+# ---------------------------------------------------------------------
+#  Restaurants store a geohash of their coordinates in an indexed
+#  column.  Geohashes of nearby points share a prefix, so a radius
+#  search becomes
+#
+#    1. bounding box of the search circle
+#    2. the few geohash cells (finest precision, <= 16 cells) covering it
+#    3. geohash LIKE 'cell%' OR …            → B-tree prefix range scans
+#       AND lat/lng BETWEEN bounding box     → drops cell corners
+#    4. exact haversine distance <= radius, ORDER BY distance
+#
+#  within_radius() applies all four steps to a Restaurant queryset.  The
+#  module does not import models, so models.py and migrations can use it.
+# ---------------------------------------------------------------------
+import math
+import operator
+from functools import reduce
+
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.functions import ASin, Cos, Least, Power, Radians, Sin, Sqrt
+
+BASE32          = "0123456789bcdefghjkmnpqrstuvwxyz"
+PRECISION       = 9             # stored precision, ~5 m cells
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE   = math.pi * EARTH_RADIUS_KM / 180
+MAX_COVER_CELLS = 16
+
+
+def encode(latitude, longitude, precision=PRECISION):
+    """Geohash of a point, ``precision`` characters long."""
+    lat_lo, lat_hi = -90.0, 90.0
+    lng_lo, lng_hi = -180.0, 180.0
+    chars, bits, n_bits, even = [], 0, 0, True
+    while len(chars) < precision:
+        if even:
+            mid = (lng_lo + lng_hi) / 2
+            bit = longitude >= mid
+            lng_lo, lng_hi = (mid, lng_hi) if bit else (lng_lo, mid)
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            bit = latitude >= mid
+            lat_lo, lat_hi = (mid, lat_hi) if bit else (lat_lo, mid)
+        bits    = (bits << 1) | bit
+        n_bits += 1
+        even    = not even
+        if n_bits == 5:
+            chars.append(BASE32[bits])
+            bits, n_bits = 0, 0
+    return "".join(chars)
+
+
+def cell_size(precision):
+    """(height, width) of a geohash cell in degrees."""
+    lng_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lng_bits)
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Great-circle distance between two points in kilometres."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi      = phi2 - phi1
+    d_lambda   = math.radians(lng2 - lng1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_box(latitude, longitude, radius_km):
+    """
+    (south, west, north, east) in degrees enclosing the search circle.
+    ``west > east`` when the box crosses the antimeridian; near the poles
+    the box spans every longitude.
+    """
+    d_lat = radius_km / KM_PER_DEGREE
+    south = max(-90.0, latitude - d_lat)
+    north = min(90.0, latitude + d_lat)
+    if south == -90.0 or north == 90.0:
+        return south, -180.0, north, 180.0
+
+    cos_lat = math.cos(math.radians(latitude))
+    d_lng = radius_km / (KM_PER_DEGREE * cos_lat) if cos_lat > 1e-12 else 360.0
+    if d_lng >= 180.0:
+        return south, -180.0, north, 180.0
+    west = longitude - d_lng
+    east = longitude + d_lng
+    if west < -180.0:
+        west += 360.0
+    if east > 180.0:
+        east -= 360.0
+    return south, west, north, east
+
+
+def _lng_ranges(west, east):
+    if west <= east:
+        return [(west, east)]
+    return [(west, 180.0), (-180.0, east)]
+
+
+def covering_cells(south, west, north, east):
+    """
+    Geohash prefixes that together cover the bounding box, using the
+    finest precision that needs at most MAX_COVER_CELLS cells.  Returns
+    an empty list when the box is too large for a prefix filter to help.
+    """
+    for precision in range(PRECISION, 0, -1):
+        height, width = cell_size(precision)
+        rows = int(north // height) - int(south // height) + 1
+        cols = sum(int(e // width) - int(w // width) + 1 for w, e in _lng_ranges(west, east))
+        if rows * cols > MAX_COVER_CELLS:
+            continue
+
+        cells = set()
+        for w, e in _lng_ranges(west, east):
+            lat = south
+            while True:
+                lng = w
+                while True:
+                    cells.add(encode(min(lat, 90.0), min(lng, 180.0), precision))
+                    if lng >= e:
+                        break
+                    lng = min(lng + width, e)
+                if lat >= north:
+                    break
+                lat = min(lat + height, north)
+        return sorted(cells)
+    return []
+
+
+def distance_expression(latitude, longitude):
+    """
+    Haversine distance in km from a fixed point to each row's
+    ``latitude`` / ``longitude``, as an ORM expression (SQLite gets the
+    math functions from Django's Python implementations).
+    """
+    lat = Radians(F("latitude"))
+    lng = Radians(F("longitude"))
+    lat0 = Value(math.radians(latitude), output_field=FloatField())
+    lng0 = Value(math.radians(longitude), output_field=FloatField())
+    a = (
+        Power(Sin((lat - lat0) / 2), 2)
+        + Cos(lat0) * Cos(lat) * Power(Sin((lng - lng0) / 2), 2)
+    )
+    return Value(2 * EARTH_RADIUS_KM, output_field=FloatField()) * ASin(
+        Least(Value(1.0, output_field=FloatField()), Sqrt(a))
+    )
+
+
+def within_radius(queryset, latitude, longitude, radius_km):
+    """
+    Restaurants of ``queryset`` within ``radius_km`` of the point,
+    annotated with ``distance_km``.  Ordering is left to the caller.
+    """
+    south, west, north, east = box = bounding_box(latitude, longitude, radius_km)
+
+    in_box = Q(latitude__range=(south, north)) & reduce(
+        operator.or_, [Q(longitude__range=r) for r in _lng_ranges(west, east)]
+    )
+    cells = covering_cells(*box)
+    if cells:
+        in_box &= reduce(operator.or_, [Q(geohash__startswith=cell) for cell in cells])
+
+    return (
+        queryset.filter(in_box)
+        .annotate(distance_km=distance_expression(latitude, longitude))
+        .filter(distance_km__lte=radius_km)
+    )
@@ -0,0 +1,246 @@
+# restaurants/google_cache.py
+# ---------------------------------------------------------------------
+#  Persistent cache for Google Maps API responses
+# ---------------------------------------------------------------------
+#  Lookups go through two layers:
+#
+#    1. a bounded in-process LRU      – repeated lookups never leave the process
+#    2. GoogleCacheEntry rows         – shared by every process, survive restarts
+#
+#  and only then to Google.  Each entry has two deadlines:
+#
+#    fresh_until   served as-is
+#    expires_at    served stale while one background refresh runs
+#                  (stale-while-revalidate); past it the entry is refetched
+#                  synchronously, and is still served if Google is down
+#
+#  cached_many() answers a whole batch with one query and hands the
+#  misses back to the caller to fetch concurrently (services.py).
+#
+#  Expired rows are evicted by ``manage.py purge_google_cache``.
+#  TTLs per kind come from settings.GOOGLE_CACHE_TTL (seconds) and the
+#  stale window from settings.GOOGLE_CACHE_MAX_STALE.
+# ---------------------------------------------------------------------
+import logging
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import background
+from .models import GoogleCacheEntry
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL = {
+    GoogleCacheEntry.Kind.GEOCODE: 30 * 24 * 3600,   # zip centroids barely move
+    GoogleCacheEntry.Kind.NEARBY:  24 * 3600,
+    GoogleCacheEntry.Kind.DETAILS: 24 * 3600,
+}
+DEFAULT_MAX_STALE      = 7 * 24 * 3600
+DEFAULT_MEMORY_ENTRIES = 2048
+
+
+class GoogleAPIError(Exception):
+    """
+    Google could not be reached or returned an error; nothing to cache.
+    ``transient`` marks failures worth retrying (timeouts, 5xx, quota).
+    """
+    def __init__(self, message, transient=False):
+        super().__init__(message)
+        self.transient = transient
+
+
+def _ttl(kind):
+    return getattr(settings, "GOOGLE_CACHE_TTL", {}).get(kind, DEFAULT_TTL[kind])
+
+
+def _max_stale():
+    return getattr(settings, "GOOGLE_CACHE_MAX_STALE", DEFAULT_MAX_STALE)
+
+
+# ---------------------------------------------------------------------
+#  In-process layer
+# ---------------------------------------------------------------------
+#  (kind, key) -> (payload, fresh_until, expires_at), least recently
+#  used first
+_memory      = OrderedDict()
+_memory_lock = threading.Lock()
+_inflight    = set()          # (kind, key) currently being revalidated
+
+
+def _remember(kind, key, entry):
+    limit = getattr(settings, "GOOGLE_CACHE_MEMORY_ENTRIES", DEFAULT_MEMORY_ENTRIES)
+    with _memory_lock:
+        _memory[(kind, key)] = entry
+        _memory.move_to_end((kind, key))
+        while len(_memory) > limit:
+            _memory.popitem(last=False)
+
+
+def _recall(kind, key):
+    with _memory_lock:
+        entry = _memory.get((kind, key))
+        if entry is not None:
+            _memory.move_to_end((kind, key))
+        return entry
+
+
+def clear_memory():
+    """Drop the in-process layer (the database rows stay)."""
+    with _memory_lock:
+        _memory.clear()
+
+
+@receiver(setting_changed)
+def _reset_memory(setting, **kwargs):
+    if setting.startswith("GOOGLE_"):
+        clear_memory()
+
+
+# ---------------------------------------------------------------------
+#  Lookups
+# ---------------------------------------------------------------------
+
+def _load(kind, key):
+    row = (
+        GoogleCacheEntry.objects.filter(kind=kind, key=key)
+        .values_list("payload", "fresh_until", "expires_at")
+        .first()
+    )
+    if row is not None:
+        _remember(kind, key, row)
+    return row
+
+
+def store(kind, key, payload):
+    """Save a freshly fetched ``payload`` in both layers."""
+    now         = timezone.now()
+    fresh_until = now + timedelta(seconds=_ttl(kind))
+    expires_at  = fresh_until + timedelta(seconds=_max_stale())
+    GoogleCacheEntry.objects.update_or_create(
+        kind=kind,
+        key=key,
+        defaults={
+            "payload":     payload,
+            "fetched_at":  now,
+            "fresh_until": fresh_until,
+            "expires_at":  expires_at,
+        },
+    )
+    _remember(kind, key, (payload, fresh_until, expires_at))
+    return payload
+
+
+def _revalidate(kind, key, fetch):
+    try:
+        store(kind, key, fetch())
+    except GoogleAPIError as exc:
+        logger.warning("revalidating %s:%s failed: %s", kind, key, exc)
+    finally:
+        with _memory_lock:
+            _inflight.discard((kind, key))
+
+
+def _schedule_revalidation(kind, key, fetch):
+    with _memory_lock:
+        if (kind, key) in _inflight:
+            return
+        _inflight.add((kind, key))
+    background.submit(_revalidate, kind, key, fetch)
+
+
+def cached(kind, key, fetch):
+    """
+    Payload for ``(kind, key)``, calling ``fetch()`` only when the cache
+    can't answer.
+
+    Args:
+        kind (GoogleCacheEntry.Kind): which API the payload comes from.
+        key (str): lookup key within ``kind`` (zip code, place_id, …).
+        fetch (callable): returns a JSON-serialisable payload or raises
+            GoogleAPIError.  Called synchronously on a miss, from the
+            background pool on a stale hit.
+
+    Returns:
+        The cached or fetched payload.
+
+    Raises:
+        GoogleAPIError: on a miss when Google can't be reached.
+    """
+    now   = timezone.now()
+    entry = _recall(kind, key) or _load(kind, key)
+    if entry is not None:
+        payload, fresh_until, expires_at = entry
+        if now < fresh_until:
+            return payload
+        if now < expires_at:
+            _schedule_revalidation(kind, key, fetch)
+            return payload
+
+    try:
+        return store(kind, key, fetch())
+    except GoogleAPIError:
+        if entry is None:
+            raise
+        logger.warning("serving expired %s:%s, Google unavailable", kind, key)
+        return entry[0]
+
+
+def cached_many(kind, keys, make_fetch):
+    """
+    Batch form of ``cached()`` that leaves the fetching to the caller.
+
+    Args:
+        kind (GoogleCacheEntry.Kind): which API the payloads come from.
+        keys (iterable[str]): lookup keys within ``kind``.
+        make_fetch (callable): ``make_fetch(key)`` returns the fetch
+            callable used to revalidate a stale entry in the background.
+
+    Returns:
+        tuple: ``(payloads, missing, expired)`` – {key: payload} for fresh
+        and stale hits, the keys the caller must fetch and ``store()``,
+        and {key: payload} of expired entries among them to fall back on.
+    """
+    now     = timezone.now()
+    keys    = list(keys)
+    entries = {key: entry for key in keys if (entry := _recall(kind, key)) is not None}
+    unknown = [key for key in keys if key not in entries]
+    if unknown:
+        rows = GoogleCacheEntry.objects.filter(kind=kind, key__in=unknown).values_list(
+            "key", "payload", "fresh_until", "expires_at"
+        )
+        for key, *entry in rows:
+            entries[key] = tuple(entry)
+            _remember(kind, key, entries[key])
+
+    payloads, missing, expired = {}, [], {}
+    for key in keys:
+        entry = entries.get(key)
+        if entry is None:
+            missing.append(key)
+            continue
+        payload, fresh_until, expires_at = entry
+        if now < fresh_until:
+            payloads[key] = payload
+        elif now < expires_at:
+            payloads[key] = payload
+            _schedule_revalidation(kind, key, make_fetch(key))
+        else:
+            missing.append(key)
+            expired[key] = payload
+    return payloads, missing, expired
+
+
+def purge_expired():
+    """Delete entries past their stale window; returns the number removed."""
+    now = timezone.now()
+    deleted, _ = GoogleCacheEntry.objects.filter(expires_at__lte=now).delete()
+    with _memory_lock:
+        for cache_key in [k for k, (_, _, expires_at) in _memory.items() if expires_at <= now]:
+            del _memory[cache_key]
+    return deleted
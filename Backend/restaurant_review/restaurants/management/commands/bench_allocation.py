@@ -0,0 +1,131 @@
+"""
+Benchmark party allocation on a synthetic restaurant with many tables.
+
+    python manage.py bench_allocation --tables 150 --occupancy 0.5
+
+For each party size it times restaurants.allocation (solver alone, and
+allocate_for() through the availability cache) and compares the seats
+it wastes with the single smallest free table that fits – all a party
+could get before.  With --brute the solver is also checked against an
+exhaustive search over combinations of up to three tables.
+
+Everything runs inside a transaction that is rolled back at the end.
+"""
+import itertools
+import random
+import statistics
+import time
+from datetime import time as dt_time, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from restaurants.allocation import allocate, allocate_for, cost, free_tables, limits
+from restaurants.availability import get_entries
+from restaurants.models import Booking, Restaurant, Table, TableSlot
+
+SIZES   = [2, 2, 2, 4, 4, 4, 4, 6, 6, 8, 10]
+TIMES   = ["17:00", "17:30", "18:00", "18:30", "19:00", "19:30", "20:00", "20:30", "21:00"]
+PARTIES = [1, 2, 3, 4, 5, 6, 7, 9, 12, 15, 20, 25, 30]
+
+
+class _Rollback(Exception):
+    pass
+
+
+def brute_force(tables, num_people, max_tables=3):
+    # every combination, for reference
+    penalty = limits()[1]
+    best = None
+    for k in range(1, max_tables + 1):
+        for combo in itertools.combinations(tables, k):
+            sizes = [size for _, size in combo]
+            if sum(sizes) >= num_people:
+                rank = (cost(sizes, num_people, penalty), k)
+                if best is None or rank < best:
+                    best = rank
+    return best
+
+
+class Command(BaseCommand):
+    help = "Time the table allocation solver and compare it with single-table seating."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tables", type=int, default=150)
+        parser.add_argument("--occupancy", type=float, default=0.5,
+                            help="share of table slots already booked")
+        parser.add_argument("--repeat", type=int, default=50)
+        parser.add_argument("--brute", action="store_true",
+                            help="check against exhaustive search (slow)")
+        parser.add_argument("--seed", type=int, default=1)
+
+    def handle(self, *args, **opts):
+        random.seed(opts["seed"])
+        try:
+            with transaction.atomic():
+                restaurant, date = self.populate(opts["tables"], opts["occupancy"])
+                self.run(restaurant, date, opts["repeat"], opts["brute"])
+                raise _Rollback
+        except _Rollback:
+            self.stdout.write("synthetic data rolled back")
+
+    # -----------------------------------------------------------------
+    def populate(self, n, occupancy):
+        owner = get_user_model().objects.create_user(
+            username="bench-owner", email="bench-owner@example.com", password="x", role="owner"
+        )
+        restaurant = Restaurant.objects.create(
+            owner=owner, name="Bench Hall", address="1 Main St", city="San Jose", state="CA",
+            zip_code="95112", price_range="$$", hours_of_operation="9-5", phone_number="555-0100",
+        )
+        tables = [
+            Table.objects.create(restaurant=restaurant, size=random.choice(SIZES), available_times=TIMES)
+            for _ in range(n)
+        ]
+        date = timezone.localdate() + timedelta(days=1)
+        Booking.objects.bulk_create(
+            Booking(user=owner, restaurant=restaurant, table=table, date=date,
+                    time=dt_time.fromisoformat(start), num_people=1)
+            for table in tables for start in TIMES if random.random() < occupancy
+        )
+        return restaurant, date
+
+    def run(self, restaurant, date, repeat, brute):
+        start = dt_time(19, 0)
+        entry = get_entries([restaurant.pk], date)[restaurant.pk]
+        free  = free_tables(entry, TableSlot.to_minute(start))
+        self.stdout.write(f"{len(entry[0])} tables, {len(free)} free at {start:%H:%M}")
+        self.stdout.write(
+            f"{'party':>5} {'solver µs':>10} {'cached µs':>10} {'tables':>7} {'waste':>6} "
+            f"{'single':>7}" + (f" {'brute ms':>9} {'match':>6}" if brute else "")
+        )
+        for party in PARTIES:
+            solver = self.median_us(lambda: allocate(free, party), repeat)
+            cached = self.median_us(lambda: allocate_for(restaurant.pk, date, start, party), repeat)
+            chosen = allocate(free, party)
+            fits   = [size for _, size in free if size >= party]
+            single = str(min(fits) - party) if fits else "-"
+            line = (
+                f"{party:>5} {solver:>10.0f} {cached:>10.0f} "
+                f"{len(chosen) if chosen else '-':>7} "
+                f"{sum(s for _, s in chosen) - party if chosen else '-':>6} {single:>7}"
+            )
+            if brute:
+                started = time.perf_counter()
+                expected = brute_force(free, party)
+                elapsed = (time.perf_counter() - started) * 1000
+                got = allocate(free, party, max_tables=3)
+                got = got and (cost([s for _, s in got], party), len(got))
+                line += f" {elapsed:>9.0f} {'yes' if got == expected else 'NO':>6}"
+            self.stdout.write(line)
+
+    @staticmethod
+    def median_us(fn, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            fn()
+            timings.append((time.perf_counter() - started) * 1_000_000)
+        return statistics.median(timings)
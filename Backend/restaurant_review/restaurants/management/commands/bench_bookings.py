@@ -0,0 +1,158 @@
+"""
+Benchmark concurrent table bookings: the old table-locking path against
+restaurants.bookings.book_table (insert, let the unique constraint decide).
+
+    python manage.py bench_bookings --requests 500 --workers 32
+
+Threads need to see each other's commits, so the synthetic restaurant,
+tables and guests are committed and deleted again at the end.  Run it
+against PostgreSQL – SQLite serialises all writers, whatever the path.
+"""
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import time as dt_time, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from restaurants.availability import slot_window
+from restaurants.bookings import BookingConflict, book_table
+from restaurants.models import Booking, Restaurant, Table, TableSlot
+
+TIMES = ["18:00", "18:30", "19:00", "19:30", "20:00", "20:30", "21:00"]
+
+
+def legacy_book_table(user, restaurant_id, table_id, date, time, num_people):
+    # the pre-optimistic implementation, for reference
+    with transaction.atomic():
+        table = Table.objects.select_for_update().get(id=table_id, restaurant_id=restaurant_id)
+        low, high = slot_window(TableSlot.to_minute(time))
+        table.slots.aggregate(
+            total=Count("id"), in_window=Count("id", filter=Q(minute__range=(low, high)))
+        )
+        if Booking.objects.filter(
+            table=table, date=date, time=time, status=Booking.Status.BOOKED
+        ).exists():
+            raise BookingConflict("Table already booked at that time.")
+        return Booking.objects.create(
+            user=user, restaurant_id=restaurant_id, table=table,
+            date=date, time=time, num_people=num_people,
+        )
+
+
+def optimistic_book_table(*args):
+    return book_table(*args, notify=False)
+
+
+class Command(BaseCommand):
+    help = "Compare locking and optimistic booking under concurrent load."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=500)
+        parser.add_argument("--workers", type=int, default=32)
+        parser.add_argument("--tables", type=int, default=4)
+        parser.add_argument("--days", type=int, default=7)
+        parser.add_argument("--seed", type=int, default=1)
+
+    def handle(self, *args, **opts):
+        random.seed(opts["seed"])
+        if connection.vendor != "postgresql":
+            self.stderr.write(f"warning: {connection.vendor} serialises writers; numbers are not meaningful")
+        restaurant, guests = self.populate(opts["tables"], opts["workers"])
+        try:
+            requests = self.requests(restaurant, opts["requests"], opts["days"])
+            slots    = len({request[1:4] for request in requests})
+            self.stdout.write(
+                f"{len(requests)} bookings over {slots} table slots, {opts['workers']} threads"
+            )
+            self.stdout.write(
+                f"{'path':<12} {'seconds':>8} {'req/s':>8} {'booked':>7} "
+                f"{'conflict':>9} {'errors':>7} {'double':>7}"
+            )
+            for label, book in (("locking", legacy_book_table), ("optimistic", optimistic_book_table)):
+                Booking.objects.filter(restaurant=restaurant).delete()
+                self.run(label, book, restaurant, guests, requests, opts["workers"])
+        finally:
+            restaurant.owner.delete()                   # cascades to everything else
+            get_user_model().objects.filter(pk__in=[g.pk for g in guests]).delete()
+            self.stdout.write("synthetic data deleted")
+
+    # -----------------------------------------------------------------
+    @transaction.atomic
+    def populate(self, tables, guests):
+        User  = get_user_model()
+        owner = User.objects.create_user(
+            username="bench-booking-owner", email="bench-booking-owner@example.com",
+            password="x", role="owner",
+        )
+        restaurant = Restaurant.objects.create(
+            owner=owner, name="Bench Bistro", address="1 Main St", city="San Jose", state="CA",
+            zip_code="95112", price_range="$$", hours_of_operation="9-5", phone_number="555-0100",
+        )
+        for _ in range(tables):
+            Table.objects.create(restaurant=restaurant, size=4, available_times=TIMES)
+        created = User.objects.bulk_create(
+            User(username=f"bench-guest-{i}", email=f"bench-guest-{i}@example.com",
+                 password="!", role="user")
+            for i in range(guests)
+        )
+        return restaurant, created
+
+    def requests(self, restaurant, n, days):
+        # (restaurant_id, table_id, date, time, num_people), clustered on few slots
+        table_ids = list(restaurant.tables.values_list("id", flat=True))
+        first_day = timezone.localdate() + timedelta(days=1)
+        return [
+            (
+                restaurant.pk,
+                random.choice(table_ids),
+                first_day + timedelta(days=random.randrange(days)),
+                dt_time.fromisoformat(random.choice(TIMES)),
+                2,
+            )
+            for _ in range(n)
+        ]
+
+    def run(self, label, book, restaurant, guests, requests, workers):
+        outcomes = {"booked": 0, "conflict": 0, "errors": 0}
+        lock = threading.Lock()
+
+        def worker(guest, chunk):
+            counts = dict.fromkeys(outcomes, 0)
+            try:
+                for request in chunk:
+                    try:
+                        book(guest, *request)
+                        counts["booked"] += 1
+                    except BookingConflict:
+                        counts["conflict"] += 1
+                    except DatabaseError:
+                        counts["errors"] += 1
+            finally:
+                connection.close()
+            with lock:
+                for key, value in counts.items():
+                    outcomes[key] += value
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for i, guest in enumerate(guests[:workers]):
+                pool.submit(worker, guest, requests[i::workers])
+        elapsed = time.perf_counter() - started
+
+        double = (
+            Booking.objects.filter(restaurant=restaurant, status=Booking.Status.BOOKED)
+            .values("table", "date", "time")
+            .annotate(n=Count("id"))
+            .filter(n__gt=1)
+            .count()
+        )
+        self.stdout.write(
+            f"{label:<12} {elapsed:>8.2f} {len(requests) / elapsed:>8.0f} {outcomes['booked']:>7} "
+            f"{outcomes['conflict']:>9} {outcomes['errors']:>7} {double:>7}"
+        )
@@ -0,0 +1,155 @@
+"""
+Benchmark the restaurant search backends on synthetic data.
+
+    python manage.py bench_search --restaurants 100000
+
+Everything runs inside a transaction that is rolled back at the end, so
+the command is safe to point at a development database.
+"""
+import random
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+
+from restaurants.models import Restaurant, CuisineType, FoodType
+from restaurants.search import (
+    InMemorySearchBackend,
+    PostgresSearchBackend,
+    SubstringSearchBackend,
+    document_parts,
+)
+
+CUISINES = ["Italian", "Mexican", "Chinese", "Greek", "Japanese", "Indian",
+            "French", "Thai", "Korean", "Vietnamese", "Spanish", "Lebanese"]
+FOODS    = ["Vegan", "Vegetarian", "Gluten-free", "Halal", "Kosher", "Seafood"]
+WORDS    = ["golden", "spoon", "garden", "house", "kitchen", "grill", "noodle",
+            "taco", "pizza", "sushi", "curry", "bistro", "cafe", "corner", "dragon",
+            "olive", "lotus", "harbor", "river", "street", "family", "royal", "little"]
+CITIES   = ["San Jose", "Oakland", "Fremont", "Palo Alto", "Sunnyvale", "Berkeley"]
+
+DEFAULT_QUERIES = ["pizza", "thai", "golden dragon", "veg", "sushi san", "kitchen italian"]
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Compare icontains, substring, in-memory BM25 and PostgreSQL search."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--restaurants", type=int, default=100_000)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--page-size", type=int, default=50)
+        parser.add_argument("--query", action="append", dest="queries")
+        parser.add_argument("--seed", type=int, default=1)
+
+    def handle(self, *args, **opts):
+        random.seed(opts["seed"])
+        try:
+            with transaction.atomic():
+                self.populate(opts["restaurants"])
+                self.run(opts["queries"] or DEFAULT_QUERIES, opts["repeat"], opts["page_size"])
+                raise _Rollback
+        except _Rollback:
+            self.stdout.write("synthetic data rolled back")
+
+    # -----------------------------------------------------------------
+    def populate(self, n):
+        started = time.perf_counter()
+        owner = get_user_model().objects.create_user(
+            username="bench-owner", email="bench-owner@example.com", password="x", role="owner"
+        )
+        cuisines = CuisineType.objects.bulk_create(CuisineType(name=c) for c in CUISINES)
+        foods    = FoodType.objects.bulk_create(FoodType(name=f) for f in FOODS)
+
+        rows, tags = [], []
+        for i in range(n):
+            name   = " ".join(random.sample(WORDS, 2)).title()
+            city   = random.choice(CITIES)
+            desc   = " ".join(random.choices(WORDS, k=12))
+            rest_c = random.sample(cuisines, random.randint(1, 2))
+            rest_f = random.sample(foods, random.randint(0, 1))
+            parts  = document_parts(name, desc, city, [c.name for c in rest_c],
+                                    [f.name for f in rest_f])
+            rows.append(Restaurant(
+                owner=owner, name=name, address=f"{i} Main St", city=city, state="CA",
+                zip_code="95112", price_range="$$", hours_of_operation="9-5",
+                phone_number="555-0100", description=desc,
+                rating=round(random.uniform(1, 5), 2), search_document="\n".join(parts),
+            ))
+            tags.append((rest_c, rest_f))
+
+        # bulk_create skips signals, so documents are filled in directly above
+        created = Restaurant.objects.bulk_create(rows, batch_size=2000)
+        cuisine_links = [
+            Restaurant.cuisine_type.through(restaurant_id=r.pk, cuisinetype_id=c.pk)
+            for r, (rest_c, _) in zip(created, tags) for c in rest_c
+        ]
+        food_links = [
+            Restaurant.food_type.through(restaurant_id=r.pk, foodtype_id=f.pk)
+            for r, (_, rest_f) in zip(created, tags) for f in rest_f
+        ]
+        Restaurant.cuisine_type.through.objects.bulk_create(cuisine_links, batch_size=5000)
+        Restaurant.food_type.through.objects.bulk_create(food_links, batch_size=5000)
+
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    """
+                    UPDATE restaurants_restaurant SET search_vector =
+                        setweight(to_tsvector('english', split_part(search_document, E'\\n', 1)), 'A') ||
+                        setweight(to_tsvector('english', split_part(search_document, E'\\n', 2)), 'B') ||
+                        setweight(to_tsvector('english', split_part(search_document, E'\\n', 3)), 'C')
+                    WHERE owner_id = %s
+                    """,
+                    [owner.pk],
+                )
+                cursor.execute("ANALYZE restaurants_restaurant")
+        self.stdout.write(f"populated {n} restaurants in {time.perf_counter() - started:.1f}s")
+
+    # -----------------------------------------------------------------
+    def run(self, queries, repeat, page_size):
+        def legacy_icontains(qs, text):
+            # the pre-search-document implementation, for reference
+            return qs.filter(
+                Q(name__icontains=text)
+                | Q(cuisine_type__name__icontains=text)
+                | Q(food_type__name__icontains=text)
+            ).distinct().order_by("-rating", "id")
+
+        memory = InMemorySearchBackend()
+        started = time.perf_counter()
+        memory.build()
+        self.stdout.write(
+            f"in-memory index: {len(memory.doc_len)} docs, {len(memory.vocab)} terms, "
+            f"built in {time.perf_counter() - started:.2f}s"
+        )
+
+        backends = [
+            ("icontains (legacy)", legacy_icontains),
+            ("substring", lambda qs, text: SubstringSearchBackend().search(qs, text)
+                .order_by("-search_score", "id")),
+            ("in-memory bm25", lambda qs, text: memory.search(qs, text)
+                .order_by("-search_score", "id")),
+        ]
+        if PostgresSearchBackend.available():
+            backends.append(("postgres fts", lambda qs, text: PostgresSearchBackend()
+                .search(qs, text).order_by("-search_score", "id")))
+
+        self.stdout.write(f"{'backend':<20} {'query':<18} {'median ms':>10} {'hits':>6}")
+        for label, search in backends:
+            for text in queries:
+                timings, hits = [], 0
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    hits = len(list(search(Restaurant.objects.all(), text)[:page_size]
+                                    .values_list("id", flat=True)))
+                    timings.append((time.perf_counter() - started) * 1000)
+                self.stdout.write(
+                    f"{label:<20} {text:<18} {statistics.median(timings):>10.1f} {hits:>6}"
+                )
@@ -0,0 +1,54 @@
+"""
+Mark bookings whose time has passed COMPLETED.
+
+    python manage.py complete_past_bookings
+    python manage.py complete_past_bookings --chunk-size 5000 --after 2026-01-31,20:00:00.250000,81234
+
+Meant for cron (e.g. hourly).  Works in index-ordered chunks that commit
+one by one; the watermark printed with each chunk can be passed back as
+--after to resume, though a plain rerun also picks up where it stopped.
+"""
+import time
+from datetime import date as dt_date, time as dt_time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from restaurants.bookings import complete_past_bookings
+
+
+def watermark(value):
+    try:
+        day, start, pk = value.split(",")
+        return dt_date.fromisoformat(day), dt_time.fromisoformat(start), int(pk)
+    except ValueError:
+        raise CommandError(f"--after expects DATE,TIME,ID, got {value!r}")
+
+
+class Command(BaseCommand):
+    help = "Mark BOOKED bookings in the past COMPLETED, in chunked bulk updates."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=1000)
+        parser.add_argument("--after", type=watermark, help="resume after DATE,TIME,ID")
+        parser.add_argument("--sleep", type=float, default=0, help="seconds between chunks")
+
+    def handle(self, *args, **opts):
+        started = chunk_started = time.perf_counter()
+        total = chunks = 0
+        for (day, start, pk), changed in complete_past_bookings(
+            chunk_size=opts["chunk_size"], after=opts["after"]
+        ):
+            total  += changed
+            chunks += 1
+            self.stdout.write(
+                f"chunk {chunks}: {changed} completed in "
+                f"{(time.perf_counter() - chunk_started) * 1000:.0f}ms, "
+                f"watermark {day.isoformat()},{start.isoformat()},{pk}"
+            )
+            if opts["sleep"]:
+                time.sleep(opts["sleep"])
+            chunk_started = time.perf_counter()
+        self.stdout.write(
+            f"completed {total} bookings in {chunks} chunks, "
+            f"{time.perf_counter() - started:.1f}s"
+        )
@@ -0,0 +1,47 @@
+"""
+Process spooled photos the background pool never finished.
+
+    python manage.py process_photos            # PENDING rows (e.g. after a restart)
+    python manage.py process_photos --failed   # also retry FAILED rows
+
+PROCESSING rows claimed more than --stale minutes ago (default 30) are
+taken over too: their worker died mid-way.  Rows a live worker holds are
+skipped, so this is safe to run while the pool is busy.
+
+Runs on the host that holds the spool directory (PHOTO_SPOOL_DIR).
+"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from restaurants.models import RestaurantPhoto
+from restaurants.photos import process_photo
+
+
+class Command(BaseCommand):
+    help = "Upload and thumbnail photos left PENDING (and optionally FAILED)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--failed", action="store_true", help="retry FAILED photos too")
+        parser.add_argument("--stale", type=float, default=30,
+                            help="minutes after which a PROCESSING claim counts as abandoned")
+
+    def handle(self, *args, **opts):
+        statuses = [RestaurantPhoto.Status.PENDING]
+        if opts["failed"]:
+            statuses.append(RestaurantPhoto.Status.FAILED)
+        stale_before = timezone.now() - timedelta(minutes=opts["stale"])
+        ids = list(
+            RestaurantPhoto.objects.filter(
+                Q(status__in=statuses)
+                | Q(status=RestaurantPhoto.Status.PROCESSING, claimed_at__lt=stale_before)
+            ).values_list("pk", flat=True)
+        )
+        for photo_id in ids:
+            process_photo(photo_id, stale_before=stale_before)
+        ready = RestaurantPhoto.objects.filter(
+            pk__in=ids, status=RestaurantPhoto.Status.READY
+        ).count()
+        self.stdout.write(f"processed {len(ids)} photos, {ready} ready")
@@ -0,0 +1,18 @@
+"""
+Evict Google API cache entries past their stale window.
+
+    python manage.py purge_google_cache
+
+Meant for cron; entries are also refreshed in place on access, so this
+only reclaims rows nobody has asked for in a while.
+"""
+from django.core.management.base import BaseCommand
+
+from restaurants.google_cache import purge_expired
+
+
+class Command(BaseCommand):
+    help = "Delete expired Google API cache entries."
+
+    def handle(self, *args, **opts):
+        self.stdout.write(f"deleted {purge_expired()} expired entries")
@@ -0,0 +1,49 @@
+# Generated by Django 5.1.2 on 2026-10-18 13:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def populate_table_slots(apps, schema_editor):
+    """Copy every Table.available_times "HH:MM" entry into TableSlot rows."""
+    Table     = apps.get_model('restaurants', 'Table')
+    TableSlot = apps.get_model('restaurants', 'TableSlot')
+
+    batch = []
+    for table_id, times in Table.objects.values_list('id', 'available_times').iterator():
+        minutes = set()
+        for value in times or []:
+            try:
+                hours, mins = (int(part) for part in str(value).split(':')[:2])
+            except ValueError:
+                continue
+            if 0 <= hours < 24 and 0 <= mins < 60:
+                minutes.add(hours * 60 + mins)
+        batch.extend(TableSlot(table_id=table_id, minute=m) for m in sorted(minutes))
+        if len(batch) >= 5000:
+            TableSlot.objects.bulk_create(batch)
+            batch = []
+    TableSlot.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0015_remove_booking_unique_table_date_time_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TableSlot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('minute', models.PositiveSmallIntegerField()),
+                ('table', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='slots', to='restaurants.table')),
+            ],
+            options={
+                'ordering': ['table', 'minute'],
+                'constraints': [models.UniqueConstraint(fields=('table', 'minute'), name='unique_table_slot_minute')],
+            },
+        ),
+        migrations.RunPython(populate_table_slots, migrations.RunPython.noop),
+    ]
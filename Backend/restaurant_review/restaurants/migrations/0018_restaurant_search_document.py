@@ -0,0 +1,72 @@
+# Generated by Django 5.1.2 on 2026-10-18 13:17
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations, models
+
+# frozen copies of restaurants.search helpers as of this migration
+
+
+def document_parts(name, description, city, cuisines, foods):
+    return (
+        name or '',
+        ' '.join([*cuisines, *foods]),
+        ' '.join(filter(None, [city, description])),
+    )
+
+
+def search_vector(parts):
+    vector = None
+    for weight, text in zip('ABC', parts):
+        term = SearchVector(
+            models.Value(text, output_field=models.TextField()), weight=weight, config='english'
+        )
+        vector = term if vector is None else vector + term
+    return vector
+
+
+def backfill_search_documents(apps, schema_editor):
+    Restaurant = apps.get_model('restaurants', 'Restaurant')
+    postgres   = schema_editor.connection.vendor == 'postgresql'
+
+    restaurants = Restaurant.objects.prefetch_related('cuisine_type', 'food_type')
+    for rest in restaurants.iterator(chunk_size=500):
+        parts = document_parts(
+            rest.name,
+            rest.description,
+            rest.city,
+            [c.name for c in rest.cuisine_type.all()],
+            [f.name for f in rest.food_type.all()],
+        )
+        fields = {'search_document': '\n'.join(parts)}
+        if postgres:
+            fields['search_vector'] = search_vector(parts)
+        Restaurant.objects.filter(pk=rest.pk).update(**fields)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0017_keyset_pagination_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='restaurant',
+            name='search_document',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='restaurant',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='restaurant',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='restaurant_search_vector_gin'),
+        ),
+        migrations.RunPython(backfill_search_documents, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.1.2 on 2026-10-18 13:23
+
+from django.db import migrations, models
+
+from restaurants.geo import encode
+
+
+def backfill_geohashes(apps, schema_editor):
+    Restaurant = apps.get_model('restaurants', 'Restaurant')
+    located = Restaurant.objects.filter(latitude__isnull=False, longitude__isnull=False)
+    batch = []
+    for rest in located.only('pk', 'latitude', 'longitude').iterator(chunk_size=1000):
+        rest.geohash = encode(rest.latitude, rest.longitude)
+        batch.append(rest)
+        if len(batch) == 1000:
+            Restaurant.objects.bulk_update(batch, ['geohash'])
+            batch = []
+    Restaurant.objects.bulk_update(batch, ['geohash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0018_restaurant_search_document'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='restaurant',
+            name='geohash',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=12),
+        ),
+        migrations.RunPython(backfill_geohashes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.2 on 2026-10-18 13:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0019_restaurant_geohash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GoogleCacheEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('geocode', 'Geocode'), ('nearby', 'Nearby search'), ('details', 'Place details')], max_length=10)),
+                ('key', models.CharField(max_length=255)),
+                ('payload', models.JSONField(null=True)),
+                ('fetched_at', models.DateTimeField()),
+                ('fresh_until', models.DateTimeField()),
+                ('expires_at', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('kind', 'key'), name='unique_google_cache_key')],
+            },
+        ),
+    ]
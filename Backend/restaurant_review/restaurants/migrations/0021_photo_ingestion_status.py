@@ -0,0 +1,23 @@
+# Generated by Django 5.1.2 on 2026-10-18 13:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0020_google_cache_entry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='restaurantphoto',
+            name='spool_path',
+            field=models.CharField(blank=True, default='', max_length=500),
+        ),
+        migrations.AddField(
+            model_name='restaurantphoto',
+            name='status',
+            field=models.CharField(choices=[('PENDING', 'Pending'), ('READY', 'Ready'), ('FAILED', 'Failed')], db_index=True, default='READY', max_length=10),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-18 13:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0021_photo_ingestion_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='restaurantphoto',
+            name='renditions',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
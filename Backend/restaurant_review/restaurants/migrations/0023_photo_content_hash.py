@@ -0,0 +1,23 @@
+# Generated by Django 5.1.2 on 2026-10-18 13:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0022_photo_renditions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='restaurantphoto',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='restaurantphoto',
+            name='perceptual_hash',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=16),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.2 on 2026-10-18 13:59
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0025_restaurant_rating_histogram'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(condition=models.Q(('status', 'BOOKED')), fields=['date', 'time', 'id'], name='booking_booked_start_idx'),
+        ),
+    ]
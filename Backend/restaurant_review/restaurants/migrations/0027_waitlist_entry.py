@@ -0,0 +1,36 @@
+# Generated by Django 5.1.2 on 2026-10-18 14:05
+
+import django.core.validators
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0026_booking_booked_start_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WaitlistEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('earliest', models.PositiveSmallIntegerField()),
+                ('latest', models.PositiveSmallIntegerField()),
+                ('num_people', models.PositiveSmallIntegerField(validators=[django.core.validators.MinValueValidator(1)])),
+                ('status', models.CharField(choices=[('WAITING', 'Waiting'), ('NOTIFIED', 'Notified')], default='WAITING', max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('notified_at', models.DateTimeField(blank=True, null=True)),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waitlist_entries', to='restaurants.restaurant')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waitlist_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['created_at', 'id'],
+                'indexes': [models.Index(condition=models.Q(('status', 'WAITING')), fields=['restaurant', 'date', 'earliest'], name='waitlist_waiting_idx'), models.Index(fields=['user', '-created_at'], name='restaurants_user_id_9aacc4_idx')],
+            },
+        ),
+    ]
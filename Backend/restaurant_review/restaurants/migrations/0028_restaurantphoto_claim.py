@@ -0,0 +1,23 @@
+# Generated by Django 5.1.2 on 2026-10-18 14:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0027_waitlist_entry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='restaurantphoto',
+            name='claimed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='restaurantphoto',
+            name='status',
+            field=models.CharField(choices=[('PENDING', 'Pending'), ('PROCESSING', 'Processing'), ('READY', 'Ready'), ('FAILED', 'Failed')], db_index=True, default='READY', max_length=10),
+        ),
+    ]
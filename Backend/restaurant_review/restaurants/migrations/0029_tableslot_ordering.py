@@ -0,0 +1,17 @@
+# Generated by Django 5.1.2 on 2026-10-18 14:37
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0028_restaurantphoto_claim'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='tableslot',
+            options={'ordering': ['table_id', 'minute']},
+        ),
+    ]
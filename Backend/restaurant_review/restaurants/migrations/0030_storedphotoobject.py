@@ -0,0 +1,42 @@
+# Generated by Django 5.1.2 on 2026-10-18 14:46
+
+from collections import Counter
+
+from django.db import migrations, models
+
+
+def count_references(apps, schema_editor):
+    """One reference per READY photo naming a key as original, thumbnail or rendition."""
+    RestaurantPhoto   = apps.get_model('restaurants', 'RestaurantPhoto')
+    StoredPhotoObject = apps.get_model('restaurants', 'StoredPhotoObject')
+
+    counts = Counter()
+    rows = RestaurantPhoto.objects.filter(status='READY').values_list(
+        'photo_key', 'thumbnail_s3_key', 'renditions'
+    )
+    for photo_key, thumbnail, renditions in rows.iterator():
+        keys = {photo_key, thumbnail, *(r.get('key') for r in renditions or [])}
+        counts.update(k for k in keys if k)
+    StoredPhotoObject.objects.bulk_create(
+        (StoredPhotoObject(key=key, references=n) for key, n in counts.items()),
+        batch_size=5000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0029_tableslot_ordering'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredPhotoObject',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=255, unique=True)),
+                ('references', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(count_references, migrations.RunPython.noop),
+    ]
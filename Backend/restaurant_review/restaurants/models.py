@@ -1,8 +1,18 @@
+import os
+
 from django.db import models
 from django.conf import settings
 from django.core.validators import MinValueValidator
 from django.utils import timezone
 from django.db.models import Q
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.dispatch import receiver
+
+from . import geo, ranking
+
 # ---------------------------------------------------------------------
 #  Lookup tables
 # ---------------------------------------------------------------------
@@ -25,6 +35,12 @@ class FoodType(models.Model):
 #  Restaurant & photos
 # ---------------------------------------------------------------------
 
+class RestaurantQuerySet(models.QuerySet):
+    def with_listing_relations(self):
+        """Prefetch everything the listing serializers render per row."""
+        return self.prefetch_related('photos', 'cuisine_type', 'food_type')
+
+
 class Restaurant(models.Model):
     CATEGORY_CHOICES = [
         ('fast_food', 'Fast Food'),
@@ -52,6 +68,8 @@ class Restaurant(models.Model):
     zip_code           = models.CharField(max_length=10)
     latitude           = models.FloatField(null=True, blank=True)
     longitude          = models.FloatField(null=True, blank=True)
+    geohash            = models.CharField(max_length=12, blank=True, default='',
+                                          db_index=True, editable=False)   # see restaurants/geo.py
 
     # Meta & tags
     cuisine_type       = models.ManyToManyField(CuisineType, related_name='restaurants')
@@ -59,34 +77,218 @@ class Restaurant(models.Model):
     price_range        = models.CharField(max_length=3, choices=PRICE_RANGE_CHOICES)
     category           = models.CharField(max_length=20, choices=CATEGORY_CHOICES, default='cafe')
 
-    # Misc
-    rating             = models.DecimalField(max_digits=3, decimal_places=2, default=0.0)
+    # Review aggregates (maintained by reviews.models, never by save())
+    rating             = models.DecimalField(max_digits=3, decimal_places=2, default=0.0)  # average
+    rating_sum         = models.PositiveIntegerField(default=0)
     review_count       = models.PositiveIntegerField(default=0)
+    stars_1            = models.PositiveIntegerField(default=0)   # histogram: reviews per star
+    stars_2            = models.PositiveIntegerField(default=0)
+    stars_3            = models.PositiveIntegerField(default=0)
+    stars_4            = models.PositiveIntegerField(default=0)
+    stars_5            = models.PositiveIntegerField(default=0)
+    ranking_score      = models.FloatField(default=ranking.default_score)  # Bayesian average, see restaurants/ranking.py
+
+    # Misc
     hours_of_operation = models.CharField(max_length=100)
     website            = models.URLField(blank=True, null=True)
     phone_number       = models.CharField(max_length=15)
     description        = models.TextField(blank=True)
     created_at         = models.DateTimeField(auto_now_add=True)
 
+    # Search (maintained by signals, see restaurants/search.py)
+    search_document    = models.TextField(blank=True, default='', editable=False)
+    search_vector      = SearchVectorField(null=True, editable=False)   # PostgreSQL only
+
+    objects = RestaurantQuerySet.as_manager()
+
     class Meta:
         ordering = ['name']
         indexes  = [
             models.Index(fields=['city', 'state']),
+            models.Index(fields=['-rating', 'id']),              # rating range filters
+            models.Index(fields=['-ranking_score', 'id']),       # keyset pagination
+            GinIndex(fields=['search_vector'], name='restaurant_search_vector_gin'),
         ]
 
     def __str__(self):
         return self.name
 
+    STAR_FIELDS             = ('stars_1', 'stars_2', 'stars_3', 'stars_4', 'stars_5')
+    REVIEW_AGGREGATE_FIELDS = ('rating', 'rating_sum', 'review_count', *STAR_FIELDS, 'ranking_score')
+
+    @property
+    def rating_histogram(self):
+        """Review counts for 1 … 5 stars."""
+        return [getattr(self, name) for name in self.STAR_FIELDS]
+
+    def save(self, *args, **kwargs):
+        # review aggregates are updated in place with F(); a full save of a
+        # stale instance must not write them back
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in self.REVIEW_AGGREGATE_FIELDS
+            ]
+        # keep the indexed geohash in step with the coordinates
+        if self.latitude is None or self.longitude is None:
+            self.geohash = ''
+        else:
+            self.geohash = geo.encode(self.latitude, self.longitude)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'geohash'}
+        super().save(*args, **kwargs)
+
+
+@receiver(post_save, sender=Restaurant)
+def refresh_search_document(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    from .search import update_search_documents
+    update_search_documents([instance.pk])
+
+
+@receiver(post_delete, sender=Restaurant)
+def drop_search_document(sender, instance, **kwargs):
+    from .search import get_search_backend
+    get_search_backend().remove([instance.pk])
+
+
+@receiver(m2m_changed, sender=Restaurant.cuisine_type.through)
+@receiver(m2m_changed, sender=Restaurant.food_type.through)
+def refresh_search_document_tags(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear' and reverse:
+        # post_clear has no pk_set: remember whom tag.restaurants.clear() unlinks
+        instance._cleared_restaurant_ids = list(instance.restaurants.values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    from .search import update_search_documents
+    if not reverse:
+        update_search_documents([instance.pk])
+    elif pk_set:                                   # tag.restaurants.add(...)
+        update_search_documents(pk_set)
+    else:                                          # tag.restaurants.clear()
+        update_search_documents(instance.__dict__.pop('_cleared_restaurant_ids', []))
+
+
+@receiver(post_save, sender=Restaurant)
+@receiver(post_delete, sender=Restaurant)
+def invalidate_restaurant_responses(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    from .response_cache import invalidate_restaurant
+    invalidate_restaurant(instance.pk)
+
+
+@receiver(m2m_changed, sender=Restaurant.cuisine_type.through)
+@receiver(m2m_changed, sender=Restaurant.food_type.through)
+def invalidate_tagged_responses(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    from .response_cache import ALL_SCOPE, LIST_SCOPE, invalidate, restaurant_scope
+    if not reverse:
+        invalidate(restaurant_scope(instance.pk), LIST_SCOPE)
+    elif pk_set:
+        invalidate(LIST_SCOPE, *(restaurant_scope(pk) for pk in pk_set))
+    else:                                          # tag.restaurants.clear()
+        invalidate(ALL_SCOPE)
+
+
+@receiver(post_save, sender=CuisineType)
+@receiver(post_save, sender=FoodType)
+@receiver(post_delete, sender=CuisineType)
+@receiver(post_delete, sender=FoodType)
+def invalidate_tag_table(sender, created=False, **kwargs):
+    # new tags are picked up lazily; renames and deletes retire the table
+    if created:
+        return
+    from .tags import invalidate_tag_table
+    invalidate_tag_table()
+
+
+@receiver(post_save, sender=CuisineType)
+@receiver(post_save, sender=FoodType)
+@receiver(post_delete, sender=CuisineType)
+@receiver(post_delete, sender=FoodType)
+def invalidate_tag_responses(sender, created=False, raw=False, **kwargs):
+    # renames change which restaurants a list search matches
+    if created or raw:
+        return
+    from .response_cache import LIST_SCOPE, invalidate
+    invalidate(LIST_SCOPE)
+
+
+@receiver(post_save, sender=CuisineType)
+@receiver(post_save, sender=FoodType)
+def refresh_search_document_tag_name(sender, instance, created=False, raw=False, **kwargs):
+    if created or raw:
+        return
+    from .search import update_search_documents
+    update_search_documents(instance.restaurants.values_list('pk', flat=True))
+
 
 class RestaurantPhoto(models.Model):
+    class Status(models.TextChoices):
+        PENDING    = 'PENDING',    'Pending'      # spooled, waiting for restaurants.photos
+        PROCESSING = 'PROCESSING', 'Processing'   # claimed by one worker (claimed_at)
+        READY      = 'READY',      'Ready'
+        FAILED     = 'FAILED',     'Failed'
+
     restaurant        = models.ForeignKey(Restaurant, on_delete=models.CASCADE, related_name='photos')
     photo_key         = models.CharField(max_length=255)          # S3 object key (full-size)
     thumbnail_s3_key  = models.CharField(max_length=255, blank=True, null=True)
     uploaded_at       = models.DateTimeField(auto_now_add=True)
+    status            = models.CharField(max_length=10, choices=Status.choices,
+                                         default=Status.READY, db_index=True)
+    spool_path        = models.CharField(max_length=500, blank=True, default='')  # original, until processed
+    renditions        = models.JSONField(default=list, blank=True)  # [{size, width, height, format, key}], see restaurants/renditions.py
+    content_hash      = models.CharField(max_length=64, blank=True, default='', db_index=True)  # sha256 of the original
+    perceptual_hash   = models.CharField(max_length=16, blank=True, default='', db_index=True)  # 64-bit dHash, hex
+    claimed_at        = models.DateTimeField(null=True, blank=True)  # when processing started
 
     def __str__(self):
         return f'{self.restaurant.name} – {self.photo_key}'
 
+    @property
+    def storage_keys(self):
+        """Every stored object of this photo: original, thumbnail, renditions."""
+        keys = [self.photo_key, self.thumbnail_s3_key, *(r['key'] for r in self.renditions)]
+        return list(dict.fromkeys(k for k in keys if k))
+
+
+class StoredPhotoObject(models.Model):
+    """
+    Reference count of one object in photo storage: the READY
+    RestaurantPhoto rows naming it as original, thumbnail or rendition.
+    Kept by restaurants.photos; the object is deleted when it drops to 0.
+    """
+    key        = models.CharField(max_length=255, unique=True)
+    references = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.key} ×{self.references}'
+
+
+@receiver(post_save, sender=RestaurantPhoto)
+@receiver(post_delete, sender=RestaurantPhoto)
+def invalidate_photo_responses(sender, instance, raw=False, **kwargs):
+    # photos.process_photo() updates rows in place and invalidates itself
+    if raw:
+        return
+    from .response_cache import invalidate_restaurant
+    invalidate_restaurant(instance.restaurant_id)
+
+
+@receiver(post_delete, sender=RestaurantPhoto)
+def drop_photo_spool_file(sender, instance, **kwargs):
+    # a photo deleted before processing leaves its spooled original behind
+    if instance.spool_path:
+        try:
+            os.remove(instance.spool_path)
+        except FileNotFoundError:
+            pass
+
 
 # ---------------------------------------------------------------------
 #  Table & Booking
@@ -105,6 +307,78 @@ class Table(models.Model):
     def __str__(self):
         return f'{self.restaurant.name} | Table {self.id} (seats {self.size})'
 
+    def sync_slots(self):
+        """Rebuild this table's TableSlot rows from ``available_times``."""
+        minutes = set()
+        for value in self.available_times or []:
+            try:
+                minutes.add(TableSlot.to_minute(value))
+            except (TypeError, ValueError):
+                continue  # ignore malformed entries instead of failing the save
+        self.slots.exclude(minute__in=minutes).delete()
+        existing = set(self.slots.values_list('minute', flat=True))
+        TableSlot.objects.bulk_create(
+            TableSlot(table=self, minute=m) for m in sorted(minutes - existing)
+        )
+
+
+class TableSlot(models.Model):
+    """
+    One allowed start time of a Table, stored as minutes after midnight
+    (18:30 → 1110) so window filtering is a plain indexed range query.
+    Kept in sync with ``Table.available_times`` on every Table save.
+    """
+    table  = models.ForeignKey(Table, on_delete=models.CASCADE, related_name='slots')
+    minute = models.PositiveSmallIntegerField()   # 0 … 1439
+
+    class Meta:
+        ordering    = ['table_id', 'minute']   # no join to Table for the default order
+        constraints = [
+            models.UniqueConstraint(fields=['table', 'minute'], name='unique_table_slot_minute'),
+        ]
+
+    def __str__(self):
+        return f'Table {self.table_id} @ {self.as_hhmm(self.minute)}'
+
+    @staticmethod
+    def to_minute(value):
+        """``"18:30"`` / ``time(18, 30)`` → ``1110``."""
+        if isinstance(value, str):
+            hours, minutes = value.split(':')[:2]
+            hours, minutes = int(hours), int(minutes)
+            if not (0 <= hours < 24 and 0 <= minutes < 60):
+                raise ValueError(f'Invalid time of day: {value!r}')
+            return hours * 60 + minutes
+        return value.hour * 60 + value.minute
+
+    @staticmethod
+    def as_hhmm(minute):
+        """``1110`` → ``"18:30"``."""
+        return f'{minute // 60:02d}:{minute % 60:02d}'
+
+
+@receiver(post_save, sender=Table)
+def sync_table_slots(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    instance.sync_slots()
+
+
+@receiver(post_save, sender=Table)
+@receiver(post_delete, sender=Table)
+def invalidate_table_availability(sender, instance, **kwargs):
+    from .availability import invalidate_restaurant
+    transaction.on_commit(lambda: invalidate_restaurant(instance.restaurant_id))
+
+
+@receiver(post_save, sender=Table)
+@receiver(post_delete, sender=Table)
+def invalidate_table_responses(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    from .response_cache import invalidate_restaurant
+    invalidate_restaurant(instance.restaurant_id, listing=False)
+
 
 class Booking(models.Model):
     class Status(models.TextChoices):
@@ -139,26 +413,46 @@ class Booking(models.Model):
         ordering = ['-created_at']
         indexes  = [
             models.Index(fields=['restaurant', 'date']),
+            models.Index(fields=['user', '-created_at', 'id']),  # keyset pagination
+            # complete_past_bookings walks the BOOKED rows in start order
+            models.Index(fields=['date', 'time', 'id'], condition=Q(status='BOOKED'),
+                         name='booking_booked_start_idx'),
         ]
 
     def __str__(self):
         return (f'Booking #{self.id} – {self.restaurant.name} – '
                 f'{self.date} {self.time} – {self.user.get_full_name() or self.user.username}')
-    def save(self, *args, **kwargs):
-        is_new = self._state.adding
-        old_status = None
-
-        if not is_new:
-            try:
-                old = Booking.objects.get(pk=self.pk)
-                old_status = old.status
-            except Booking.DoesNotExist:
-                pass
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # the stored status, so save() can spot a change without re-reading it
+        if 'status' in field_names:
+            instance._loaded_status = values[field_names.index('status')]
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        if fields is None or 'status' in fields:
+            self._loaded_status = self.status
 
-        if old_status != self.status:
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            changed = True
+        elif 'status' in self.get_deferred_fields():
+            changed = False                         # never loaded, so never touched
+        else:
+            changed = getattr(self, '_loaded_status', None) != self.status
+
+        if changed:
             self.status_changed_at = timezone.now()
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and 'status_changed_at' not in update_fields:
+                kwargs['update_fields'] = [*update_fields, 'status_changed_at']
 
+        # for post_save receivers: the status this save moved away from
+        self._previous_status = getattr(self, '_loaded_status', None) if changed else self.status
         super().save(*args, **kwargs)
+        self._loaded_status = self.status
 
 
     # A quick helper you may call from views/serializers
@@ -166,3 +460,96 @@ class Booking(models.Model):
         return timezone.localdate() > self.date or (
             timezone.localdate() == self.date and timezone.localtime().time() > self.time
         )
+
+
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+def invalidate_booking_availability(sender, instance, **kwargs):
+    # creating or cancelling a booking only touches its own (restaurant, date)
+    from .availability import invalidate_booking
+    transaction.on_commit(lambda: invalidate_booking(instance))
+
+
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+def invalidate_booking_responses(sender, instance, raw=False, **kwargs):
+    # the detail view shows today's booking count
+    if raw:
+        return
+    from .response_cache import invalidate_restaurant
+    invalidate_restaurant(instance.restaurant_id, listing=False)
+
+
+@receiver(post_save, sender=Booking)
+def offer_cancelled_slot(sender, instance, created, raw=False, **kwargs):
+    # a BOOKED slot coming free goes to the waitlist (restaurants/waitlist.py)
+    if raw or created:
+        return
+    if (instance.status == Booking.Status.CANCELLED
+            and getattr(instance, '_previous_status', None) == Booking.Status.BOOKED):
+        from .waitlist import slot_released
+        slot_released(instance)
+
+
+class WaitlistEntry(models.Model):
+    """
+    A party waiting for a table at ``restaurant`` on ``date``, starting
+    anywhere from ``earliest`` to ``latest`` (minutes after midnight, as
+    TableSlot).  Windows are at most WAITLIST_MAX_WINDOW_MINUTES wide, so
+    the entries covering a minute all sit in one short range of the
+    (restaurant, date, earliest) index.
+    """
+    class Status(models.TextChoices):
+        WAITING  = 'WAITING',  'Waiting'
+        NOTIFIED = 'NOTIFIED', 'Notified'
+
+    user        = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE,
+                                    related_name='waitlist_entries')
+    restaurant  = models.ForeignKey(Restaurant, on_delete=models.CASCADE,
+                                    related_name='waitlist_entries')
+    date        = models.DateField()
+    earliest    = models.PositiveSmallIntegerField()   # 0 … 1439
+    latest      = models.PositiveSmallIntegerField()
+    num_people  = models.PositiveSmallIntegerField(validators=[MinValueValidator(1)])
+    status      = models.CharField(max_length=10, choices=Status.choices, default=Status.WAITING)
+    created_at  = models.DateTimeField(auto_now_add=True)
+    notified_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['created_at', 'id']
+        indexes  = [
+            models.Index(fields=['restaurant', 'date', 'earliest'],
+                         condition=Q(status='WAITING'), name='waitlist_waiting_idx'),
+            models.Index(fields=['user', '-created_at']),
+        ]
+
+    def __str__(self):
+        return (f'Waitlist #{self.id} – restaurant {self.restaurant_id} – {self.date} '
+                f'{TableSlot.as_hhmm(self.earliest)}-{TableSlot.as_hhmm(self.latest)} '
+                f'for {self.num_people}')
+
+
+# ---------------------------------------------------------------------
+#  Google Maps API cache (see restaurants/google_cache.py)
+# ---------------------------------------------------------------------
+
+class GoogleCacheEntry(models.Model):
+    class Kind(models.TextChoices):
+        GEOCODE = 'geocode', 'Geocode'
+        NEARBY  = 'nearby',  'Nearby search'
+        DETAILS = 'details', 'Place details'
+
+    kind        = models.CharField(max_length=10, choices=Kind.choices)
+    key         = models.CharField(max_length=255)               # zip code / place_id / …
+    payload     = models.JSONField(null=True)
+    fetched_at  = models.DateTimeField()
+    fresh_until = models.DateTimeField()                         # serve without revalidating
+    expires_at  = models.DateTimeField(db_index=True)            # serve stale until, then evict
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'key'], name='unique_google_cache_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind}:{self.key}"
@@ -0,0 +1,158 @@
+# restaurants/pagination.py
+# ---------------------------------------------------------------------
+#  Keyset (cursor) pagination
+# ---------------------------------------------------------------------
+#  Pages are cut with a WHERE clause on the ordering columns instead of
+#  OFFSET, so page 1 000 costs the same index range scan as page 1:
+#
+#      ORDER BY rating DESC, id ASC
+#      WHERE rating < :r OR (rating = :r AND id > :id)
+#
+#  Response bodies stay plain JSON lists (the frontend depends on that);
+#  the next page is advertised in a ``Link: <…>; rel="next"`` header.
+# ---------------------------------------------------------------------
+import base64
+import binascii
+import datetime
+import decimal
+import json
+import operator
+from functools import reduce
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class CursorEncoder(json.JSONEncoder):
+    """
+    Lossless JSON for ordering values.  DjangoJSONEncoder truncates
+    datetimes to milliseconds, which would break equality on the
+    tie-break step of the keyset filter.
+    """
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.date, datetime.time)):
+            return o.isoformat()
+        if isinstance(o, decimal.Decimal):
+            return str(o)
+        return super().default(o)
+
+
+class KeysetPagination(BasePagination):
+    """
+    Forward-only keyset pagination over ``ordering``.  The last ordering
+    field must be unique (normally ``id``) so every row has exactly one
+    position.
+    """
+    ordering              = ("id",)
+    cursor_query_param    = "cursor"
+    page_size_query_param = "page_size"
+    invalid_cursor_message = "Invalid cursor"
+
+    def __init__(self, ordering=None):
+        if ordering is not None:
+            self.ordering = tuple(ordering)
+        self.page_size     = getattr(settings, "API_PAGE_SIZE", 50)
+        self.max_page_size = getattr(settings, "API_MAX_PAGE_SIZE", 200)
+        self.next_cursor   = None
+
+    # -----------------------------------------------------------------
+    #  Cursor encoding
+    # -----------------------------------------------------------------
+    def encode_cursor(self, values):
+        raw = json.dumps(values, cls=CursorEncoder, separators=(",", ":"))
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            values = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    # -----------------------------------------------------------------
+    #  Keyset filter
+    # -----------------------------------------------------------------
+    def after(self, values):
+        """Q selecting every row that sorts strictly after ``values``."""
+        conditions = []
+        equal      = Q()
+        for field, value in zip(self.ordering, values):
+            name   = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            conditions.append(equal & Q(**{f"{name}__{lookup}": value}))
+            equal &= Q(**{name: value})
+        return reduce(operator.or_, conditions)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size    = self.get_page_size(request)
+        cursor       = self.decode_cursor(request)
+
+        queryset = queryset.order_by(*self.ordering)
+        try:
+            if cursor is not None:
+                queryset = queryset.filter(self.after(cursor))
+            page = list(queryset[:page_size + 1])
+        except (TypeError, ValueError, ValidationError):
+            # cursor values that don't fit the ordering columns
+            raise NotFound(self.invalid_cursor_message)
+
+        self.next_cursor = None
+        if len(page) > page_size:
+            page = page[:page_size]
+            self.next_cursor = self.encode_cursor(self.position(page[-1]))
+        return page
+
+    def position(self, item):
+        names = [field.lstrip("-") for field in self.ordering]
+        if isinstance(item, dict):
+            return [item[name] for name in names]
+        return [getattr(item, name) for name in names]
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        headers = {}
+        next_link = self.get_next_link()
+        if next_link:
+            headers["Link"] = f'<{next_link}>; rel="next"'
+        return Response(data, headers=headers)
+
+
+class RestaurantPagination(KeysetPagination):
+    ordering = ("-ranking_score", "id")         # Bayesian average, restaurants/ranking.py
+
+
+class ReviewPagination(KeysetPagination):
+    ordering = ("-created_at", "id")
+
+
+class BookingPagination(KeysetPagination):
+    ordering = ("-created_at", "id")
+
+
+def paginated_response(request, queryset, serializer_class, paginator, **kwargs):
+    """One-liner for plain APIViews: paginate, serialize, add the Link header."""
+    page = paginator.paginate_queryset(queryset, request)
+    return paginator.get_paginated_response(serializer_class(page, many=True, **kwargs).data)
@@ -0,0 +1,317 @@
+# restaurants/photos.py
+# ---------------------------------------------------------------------
+#  Photo ingestion pipeline
+# ---------------------------------------------------------------------
+#  Upload views only spool the original to local disk and create a
+#  PENDING RestaurantPhoto; the request returns straight away.  Once the
+#  transaction commits, each photo is handed to the "photos" background
+#  pool (restaurants/background.py), which
+#
+#    1. uploads the original to photo storage (restaurants/storage.py)
+#    2. renders and uploads the responsive renditions (restaurants/renditions.py)
+#    3. marks the row READY and removes the spool file
+#
+#  Photos are processed in parallel, one task each.  A task first claims
+#  its row (PENDING/FAILED → PROCESSING, one conditional UPDATE), so a
+#  pool worker and ``manage.py process_photos`` never work on the same
+#  photo.  A failure marks the row FAILED and keeps the spool file, so
+#  ``manage.py process_photos`` can retry it (and picks up PENDING rows,
+#  and PROCESSING rows whose worker died, after a restart).
+#
+#  Deduplication: uploads are hashed (SHA-256, streamed) before they are
+#  spooled.  When a READY photo with the same bytes exists the new row
+#  just points at its stored objects and renditions – nothing is spooled,
+#  uploaded or rendered.  Each stored object has a reference count
+#  (StoredPhotoObject): one per READY row naming it as original,
+#  thumbnail or rendition, taken when a row becomes READY – processed or
+#  reusing a donor – in the same transaction.  ``release()`` gives the
+#  row's references back and deletes the objects that reach zero once
+#  the row's deletion has committed.
+#  Each photo also gets a 64-bit dHash (perceptual_hash) for finding
+#  near-duplicates that differ in encoding or size.
+# ---------------------------------------------------------------------
+import hashlib
+import logging
+import mimetypes
+import os
+import shutil
+import tempfile
+import uuid
+
+from PIL import Image
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import background, renditions
+from .response_cache import invalidate_restaurant
+from .models import RestaurantPhoto, StoredPhotoObject
+from .utils import upload_to_s3, delete_s3_objects
+
+logger = logging.getLogger(__name__)
+
+PHOTO_POOL = "photos"
+
+
+def spool_dir():
+    path = getattr(settings, "PHOTO_SPOOL_DIR", None) or os.path.join(
+        tempfile.gettempdir(), "restaurant_photo_spool"
+    )
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _extension(name):
+    ext = os.path.splitext(name or "")[1].lower().lstrip(".")
+    return ext if ext.isalnum() else "jpg"
+
+
+def content_hash(uploaded):
+    digest = hashlib.sha256()
+    for chunk in uploaded.chunks():
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def perceptual_hash(source):
+    """64-bit difference hash as 16 hex digits; ``source`` is a path or file."""
+    with Image.open(source) as image:
+        image.draft("L", (64, 64))              # JPEG: decode at 1/8 scale
+        small = image.convert("L").resize((9, 8), Image.Resampling.LANCZOS)
+    pixels = list(small.getdata())
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            left, right = pixels[row * 9 + col], pixels[row * 9 + col + 1]
+            bits = (bits << 1) | (left > right)
+    return f"{bits:016x}"
+
+
+def _spool(uploaded, name):
+    """Write the upload to the spool dir once; temp files are just moved."""
+    path = os.path.join(spool_dir(), name)
+    temp_path = getattr(uploaded, "temporary_file_path", None)
+    if temp_path is not None:
+        uploaded.file.flush()
+        shutil.move(temp_path(), path)
+    else:
+        with open(path, "wb") as out:
+            for chunk in uploaded.chunks():
+                out.write(chunk)
+    return path
+
+
+def _stored_copy(sha):
+    """A READY photo with these bytes, locked so it can't be released under us."""
+    return (
+        RestaurantPhoto.objects.select_for_update()
+        .filter(content_hash=sha, status=RestaurantPhoto.Status.READY)
+        .order_by("pk")
+        .first()
+    )
+
+
+def _shared_fields(donor):
+    return {
+        "photo_key":        donor.photo_key,
+        "thumbnail_s3_key": donor.thumbnail_s3_key,
+        "renditions":       donor.renditions,
+        "perceptual_hash":  donor.perceptual_hash,
+    }
+
+
+def _retain(keys):
+    """Count one more reference to each of ``keys``."""
+    StoredPhotoObject.objects.bulk_create(
+        [StoredPhotoObject(key=key) for key in keys], ignore_conflicts=True
+    )
+    StoredPhotoObject.objects.filter(key__in=keys).update(references=F("references") + 1)
+
+
+def _drop(keys):
+    """
+    Count one reference less to each of ``keys``.
+
+    Returns:
+        list[str]: the keys nothing references any more.
+    """
+    StoredPhotoObject.objects.filter(key__in=keys, references__gt=0).update(
+        references=F("references") - 1
+    )
+    unused = StoredPhotoObject.objects.filter(key__in=keys, references=0)
+    orphaned = set(unused.values_list("key", flat=True))
+    unused.delete()
+    return [key for key in keys if key in orphaned]
+
+
+def _uncounted(keys):
+    counted = set(StoredPhotoObject.objects.filter(key__in=keys).values_list("key", flat=True))
+    return [key for key in keys if key not in counted]
+
+
+def ingest(restaurant, uploaded):
+    """
+    Return a RestaurantPhoto for one uploaded file: READY straight away
+    if the same bytes are already stored, otherwise spooled and PENDING,
+    with processing starting when the surrounding transaction commits.
+    """
+    sha = content_hash(uploaded)
+    with transaction.atomic():
+        donor = _stored_copy(sha)
+        if donor is not None:
+            _retain(donor.storage_keys)
+            return RestaurantPhoto.objects.create(
+                restaurant=restaurant, content_hash=sha, **_shared_fields(donor)
+            )
+
+    # content-addressed, so the object (and its URL) never changes
+    ext   = _extension(uploaded.name)
+    photo = RestaurantPhoto.objects.create(
+        restaurant=restaurant,
+        photo_key=f"restaurant_photos/{sha}.{ext}",
+        status=RestaurantPhoto.Status.PENDING,
+        spool_path=_spool(uploaded, f"{uuid.uuid4()}.{ext}"),
+        content_hash=sha,
+    )
+    transaction.on_commit(lambda: schedule(photo.pk))
+    return photo
+
+
+def ingest_all(restaurant, uploaded_files):
+    return [ingest(restaurant, uploaded) for uploaded in uploaded_files]
+
+
+def schedule(photo_id):
+    background.submit_to(PHOTO_POOL, process_photo, photo_id)
+
+
+def claim(photo_id, stale_before=None):
+    """
+    Take ``photo_id`` for processing: PENDING/FAILED → PROCESSING in one
+    conditional UPDATE, so only one worker (or ``manage.py process_photos``)
+    gets it.  PROCESSING rows claimed before ``stale_before`` – their
+    worker died – can be taken over.
+
+    Returns:
+        datetime | None: the claim's ``claimed_at``, None if not claimed.
+    """
+    claimable = Q(status__in=[RestaurantPhoto.Status.PENDING, RestaurantPhoto.Status.FAILED])
+    if stale_before is not None:
+        claimable |= Q(status=RestaurantPhoto.Status.PROCESSING, claimed_at__lt=stale_before)
+    claimed_at = timezone.now()
+    claimed = RestaurantPhoto.objects.filter(claimable, pk=photo_id).update(
+        status=RestaurantPhoto.Status.PROCESSING, claimed_at=claimed_at
+    )
+    return claimed_at if claimed else None
+
+
+def process_photo(photo_id, stale_before=None):
+    """Upload the original and its renditions of a spooled photo; worker entry point."""
+    claimed_at = claim(photo_id, stale_before)
+    if claimed_at is None:
+        return
+    photo = RestaurantPhoto.objects.filter(pk=photo_id).first()
+    if photo is None:
+        return
+    # every later write is conditional on still holding this claim
+    ours = RestaurantPhoto.objects.filter(
+        pk=photo_id, status=RestaurantPhoto.Status.PROCESSING, claimed_at=claimed_at
+    )
+    if photo.content_hash and _reuse_stored_copy(photo, ours):
+        return
+    content_type = mimetypes.guess_type(photo.spool_path)[0] or "application/octet-stream"
+    uploaded = []
+    try:
+        phash = perceptual_hash(photo.spool_path)
+        # streamed from the spool file, multipart when large
+        photo_key = upload_to_s3(photo.spool_path, photo.photo_key, content_type=content_type)
+        with open(photo.spool_path, "rb") as original:
+            for rendition in renditions.render(original):
+                key = renditions.rendition_key(photo.photo_key, rendition["size"], rendition["format"])
+                key = upload_to_s3(rendition.pop("data"), key, content_type=rendition.pop("content_type"))
+                uploaded.append({**rendition, "key": key})
+    except Exception:
+        logger.exception("processing photo %s failed", photo_id)
+        if ours.update(status=RestaurantPhoto.Status.FAILED):
+            invalidate_restaurant(photo.restaurant_id)
+        return
+
+    # the smallest JPEG doubles as the legacy thumbnail
+    thumbnail = min(
+        uploaded, key=lambda r: (r["format"] != "jpeg", r["size"])
+    )["key"]
+    keys = list(dict.fromkeys([photo_key, *(r["key"] for r in uploaded)]))
+    with transaction.atomic():
+        updated = ours.update(
+            status=RestaurantPhoto.Status.READY,
+            photo_key=photo_key,            # storage backends may rename
+            spool_path="",
+            renditions=uploaded,
+            thumbnail_s3_key=thumbnail,
+            perceptual_hash=phash,
+        )
+        if updated:
+            _retain(keys)
+    if updated:
+        invalidate_restaurant(photo.restaurant_id)
+    elif RestaurantPhoto.objects.filter(pk=photo_id).exists():
+        return                              # taken over as stale; the new owner needs the spool file
+    else:
+        # deleted while we were uploading: drop what nobody else counts
+        orphaned = _uncounted(keys)
+        if orphaned:
+            delete_s3_objects(orphaned)
+    _drop_spool_file(photo.spool_path)
+
+
+def _reuse_stored_copy(photo, ours):
+    """
+    Point ``photo`` at an identical photo stored since it was spooled
+    (e.g. the same file uploaded twice in one request).
+    """
+    with transaction.atomic():
+        donor = _stored_copy(photo.content_hash)
+        if donor is None:
+            return False
+        if not ours.update(
+            status=RestaurantPhoto.Status.READY, spool_path="", **_shared_fields(donor)
+        ):
+            return True                     # claim lost or row deleted; not ours to finish
+        _retain(donor.storage_keys)
+        invalidate_restaurant(photo.restaurant_id)
+    _drop_spool_file(photo.spool_path)
+    return True
+
+
+def _drop_spool_file(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def release(photo):
+    """
+    Delete ``photo`` and give back its references.  Stored objects whose
+    count drops to zero are deleted from storage after the row's deletion
+    commits, so a rollback never leaves a row pointing at deleted objects.
+    A photo that never became READY holds no references; whatever an
+    earlier attempt uploaded for it is deleted unless another row counts it.
+    Failed storage deletions are logged (utils.delete_s3_objects) and leave
+    unreferenced objects behind.
+    """
+    with transaction.atomic():
+        # locked, so processing can't turn it READY while we count
+        photo = RestaurantPhoto.objects.select_for_update().filter(pk=photo.pk).first()
+        if photo is None:
+            return
+        keys = photo.storage_keys
+        if photo.status == RestaurantPhoto.Status.READY:
+            orphaned = _drop(keys)
+        else:
+            orphaned = _uncounted(keys)
+        photo.delete()
+        if orphaned:
+            transaction.on_commit(lambda: delete_s3_objects(orphaned))
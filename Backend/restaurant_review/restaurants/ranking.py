@@ -0,0 +1,49 @@
+# restaurants/ranking.py
+# ---------------------------------------------------------------------
+#  Bayesian-average ranking score
+# ---------------------------------------------------------------------
+#  A raw average puts one 5-star review above 500 reviews averaging 4.8.
+#  The ranking score pulls every restaurant toward a prior instead:
+#
+#      score = (C · m + Σ ratings) / (C + n)
+#
+#      m = settings.RANKING_PRIOR_MEAN     what an unknown place is assumed to score
+#      C = settings.RANKING_PRIOR_WEIGHT   how many reviews that assumption is worth
+#
+#  Few reviews → close to m; many reviews → close to the real average.
+#  Restaurant.ranking_score stores it (indexed), kept current by the
+#  incremental review aggregates in reviews/models.py; after changing
+#  the prior run ``manage.py repair_review_aggregates``.
+# ---------------------------------------------------------------------
+from django.conf import settings
+from django.db.models import FloatField, Value
+from django.db.models.functions import Cast
+
+DEFAULT_PRIOR_MEAN   = 3.5
+DEFAULT_PRIOR_WEIGHT = 10
+
+
+def prior():
+    """``(mean, weight)``; the weight is kept positive so n = 0 is defined."""
+    mean   = float(getattr(settings, "RANKING_PRIOR_MEAN", DEFAULT_PRIOR_MEAN))
+    weight = float(getattr(settings, "RANKING_PRIOR_WEIGHT", DEFAULT_PRIOR_WEIGHT))
+    return mean, max(weight, 1e-9)
+
+
+def bayesian_score(rating_sum, review_count):
+    mean, weight = prior()
+    return (weight * mean + rating_sum) / (weight + review_count)
+
+
+def default_score():
+    """Score of a restaurant without reviews (Restaurant.ranking_score default)."""
+    return bayesian_score(0, 0)
+
+
+def score_expression(rating_sum, review_count):
+    """``bayesian_score()`` over column expressions, for UPDATE ... SET."""
+    mean, weight = prior()
+    return (
+        (Value(weight * mean) + Cast(rating_sum, FloatField()))
+        / (Value(weight) + Cast(review_count, FloatField()))
+    )
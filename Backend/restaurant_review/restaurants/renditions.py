@@ -0,0 +1,112 @@
+# restaurants/renditions.py
+# ---------------------------------------------------------------------
+#  Responsive photo renditions
+# ---------------------------------------------------------------------
+#  Each photo is rendered once per (size, format) in
+#
+#      settings.PHOTO_RENDITION_SIZES    longest edge in px, e.g. 150/480/1024/2048
+#      settings.PHOTO_RENDITION_FORMATS  "webp", "jpeg" (progressive), "avif"
+#
+#  Sizes larger than the original are skipped (no upscaling), except the
+#  smallest, which is always produced.  JPEG sources are decoded with
+#  Image.draft(), letting libjpeg downscale by 1/2–1/8 while decoding;
+#  every size is then resized from the previous one, largest first.
+#  EXIF orientation is applied and the EXIF block dropped; the ICC
+#  profile is kept so colours survive.  Formats the installed Pillow
+#  can't write (AVIF needs Pillow >= 11.3) are skipped.
+# ---------------------------------------------------------------------
+from io import BytesIO
+
+from django.conf import settings
+from PIL import Image, ImageOps, features
+
+DEFAULT_SIZES   = (150, 480, 1024, 2048)
+DEFAULT_FORMATS = ("webp", "jpeg")
+
+FORMATS = {
+    #  name     Pillow format, extension, content type, save options
+    "webp": ("WEBP", "webp", "image/webp", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", "jpg", "image/jpeg",
+             {"quality": 82, "progressive": True, "optimize": True}),
+    "avif": ("AVIF", "avif", "image/avif", {"quality": 60}),
+}
+
+
+def configured_sizes():
+    return tuple(sorted(getattr(settings, "PHOTO_RENDITION_SIZES", DEFAULT_SIZES)))
+
+
+def configured_formats():
+    """Configured formats the installed Pillow can encode."""
+    formats = getattr(settings, "PHOTO_RENDITION_FORMATS", DEFAULT_FORMATS)
+    return tuple(
+        name for name in formats
+        if name in FORMATS and (name == "jpeg" or _supported(name))
+    )
+
+
+def _supported(name):
+    try:
+        return bool(features.check(name))
+    except ValueError:              # Pillow doesn't know the feature at all
+        return False
+
+
+def rendition_key(photo_key, size, fmt):
+    """``restaurant_photos/<sha256>.jpg`` → ``renditions/<sha256>/480.webp``."""
+    stem = photo_key.rsplit("/", 1)[-1].rsplit(".", 1)[0]
+    return f"renditions/{stem}/{size}.{FORMATS[fmt][1]}"
+
+
+def _load(source, largest):
+    image = Image.open(source)
+    if image.format == "JPEG":
+        # decode straight at the smallest 1/2^n scale still >= largest
+        image.draft("RGB", (largest, largest))
+    icc   = image.info.get("icc_profile")
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+    return image, icc
+
+
+def render(source, sizes=None, formats=None):
+    """
+    Render ``source`` (path or file object) into every size × format.
+
+    Returns:
+        list[dict]: ``{"size", "width", "height", "format", "content_type",
+        "data"}`` per rendition, smallest first; ``data`` is a BytesIO.
+    """
+    sizes   = sorted(sizes or configured_sizes())
+    formats = formats or configured_formats()
+    image, icc = _load(source, sizes[-1])
+
+    longest = max(image.size)
+    wanted  = [s for s in sizes if s <= longest] or sizes[:1]
+    if sizes[0] not in wanted:
+        wanted.insert(0, sizes[0])
+
+    renditions = []
+    current    = image
+    for size in reversed(wanted):
+        if max(current.size) > size:
+            current = current.copy()
+            current.thumbnail((size, size), Image.Resampling.LANCZOS)
+        for fmt in formats:
+            pil_format, _, mime, options = FORMATS[fmt]
+            frame = current.convert("RGB") if fmt == "jpeg" and current.mode != "RGB" else current
+            data  = BytesIO()
+            extra = {"icc_profile": icc} if icc else {}
+            frame.save(data, format=pil_format, **options, **extra)   # no exif=: stripped
+            data.seek(0)
+            renditions.append({
+                "size":         size,
+                "width":        current.width,
+                "height":       current.height,
+                "format":       fmt,
+                "content_type": mime,
+                "data":         data,
+            })
+    renditions.sort(key=lambda r: r["size"])       # stable: keeps format order
+    return renditions
@@ -0,0 +1,267 @@
+# restaurants/response_cache.py
+# ---------------------------------------------------------------------
+#  Response cache for anonymous public reads
+# ---------------------------------------------------------------------
+#  Views decorated with @cached_response name the *scopes* their output
+#  depends on:
+#
+#      "restaurants"            the restaurant list (anything shown in it)
+#      "restaurant:<id>"        one restaurant's detail, reviews and tables
+#      "all"                    implied by every response
+#
+#  Each scope has a generation – the time.time_ns() of its last change –
+#  kept in the shared cache settings.RESPONSE_CACHE_ALIAS.  Signals in
+#  models.py bump generations; nothing is ever deleted.  A response is
+#  stored under
+#
+#      sha1(path, normalized query, renderer format, generations)
+#
+#  first in a bounded in-process LRU (RESPONSE_CACHE_MAX_BYTES), and
+#  with RESPONSE_CACHE_SHARED also in the shared cache so other workers
+#  can reuse it.  The same hash is the ETag and the newest generation is
+#  Last-Modified, so conditional GETs get a 304 from one cache round
+#  trip, without touching the database or the stored body.
+#
+#  Generations are bumped both immediately and again on commit: a
+#  request that read the old rows mid-transaction can't leave them
+#  cached under the new generation.  Only anonymous GET/HEAD 200s are
+#  cached; entries also expire after RESPONSE_CACHE_TIMEOUT seconds
+#  (capped at half the signed-URL lifetime when PHOTO_URL_SIGNING is on).
+#  With signing on, the start of the current signing window is part of
+#  the key (and so the ETag) and of Last-Modified, so revalidating
+#  clients get fresh photo URLs instead of a 304 for expired ones.
+#
+#  With the default LocMemCache each process invalidates only itself;
+#  point RESPONSE_CACHE_ALIAS at Redis/Memcached when running several.
+# ---------------------------------------------------------------------
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.db import connection, transaction
+from django.dispatch import receiver
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from .storage import signing_enabled, signing_window
+
+CACHE_PREFIX      = "response"
+ALL_SCOPE         = "all"
+LIST_SCOPE        = "restaurants"
+KEPT_HEADERS      = ("Link",)
+DEFAULT_TIMEOUT   = 300
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+
+
+def restaurant_scope(restaurant_id):
+    return f"restaurant:{restaurant_id}"
+
+
+def _cache():
+    return caches[getattr(settings, "RESPONSE_CACHE_ALIAS", "default")]
+
+
+def _enabled():
+    return getattr(settings, "RESPONSE_CACHE_ENABLED", True)
+
+
+def _timeout():
+    timeout = getattr(settings, "RESPONSE_CACHE_TIMEOUT", DEFAULT_TIMEOUT)
+    if getattr(settings, "PHOTO_URL_SIGNING", False):
+        timeout = min(timeout, getattr(settings, "PHOTO_URL_EXPIRY", 3600) // 2)
+    return timeout
+
+
+# ---------------------------------------------------------------------
+#  Generations
+# ---------------------------------------------------------------------
+
+def _generation_key(scope):
+    return f"{CACHE_PREFIX}:generation:{scope}"
+
+
+def generations(scopes):
+    """{scope: generation}; scopes never bumped (or evicted) start now."""
+    cache   = _cache()
+    keys    = {_generation_key(scope): scope for scope in (ALL_SCOPE, *scopes)}
+    found   = cache.get_many(keys)
+    missing = {k: time.time_ns() for k in keys if k not in found}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        found.update(missing)
+    return {keys[k]: v for k, v in found.items()}
+
+
+def _bump(scopes):
+    now = time.time_ns()
+    _cache().set_many({_generation_key(scope): now for scope in scopes}, timeout=None)
+
+
+def invalidate(*scopes):
+    """Retire every cached response depending on ``scopes``."""
+    _bump(scopes)
+    if connection.in_atomic_block:
+        transaction.on_commit(lambda: _bump(scopes))
+
+
+def invalidate_restaurant(restaurant_id, listing=True):
+    """A restaurant changed; ``listing`` if the change shows in the list too."""
+    scopes = [restaurant_scope(restaurant_id)]
+    if listing:
+        scopes.append(LIST_SCOPE)
+    invalidate(*scopes)
+
+
+# ---------------------------------------------------------------------
+#  In-process layer
+# ---------------------------------------------------------------------
+#  key -> (content, content_type, headers, expires_at), least recently
+#  used first; bounded by the total size of the bodies
+
+_memory       = OrderedDict()
+_memory_bytes = 0
+_memory_lock  = threading.Lock()
+
+
+def _remember(key, entry):
+    global _memory_bytes
+    limit = getattr(settings, "RESPONSE_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES)
+    with _memory_lock:
+        if key in _memory:
+            _memory_bytes -= len(_memory.pop(key)[0])
+        _memory[key] = entry
+        _memory_bytes += len(entry[0])
+        while _memory_bytes > limit and _memory:
+            _memory_bytes -= len(_memory.popitem(last=False)[1][0])
+
+
+def _recall(key):
+    with _memory_lock:
+        entry = _memory.get(key)
+        if entry is None:
+            return None
+        if entry[3] <= time.time():
+            del _memory[key]
+            return None
+        _memory.move_to_end(key)
+        return entry
+
+
+def clear_memory():
+    global _memory_bytes
+    with _memory_lock:
+        _memory.clear()
+        _memory_bytes = 0
+
+
+@receiver(setting_changed)
+def _reset_memory(setting, **kwargs):
+    if setting.startswith("RESPONSE_CACHE_"):
+        clear_memory()
+
+
+# ---------------------------------------------------------------------
+#  Decorator
+# ---------------------------------------------------------------------
+
+def _signed_at():
+    """Start of the current photo URL signing window, or None without signing."""
+    return signing_window()[0] if signing_enabled() else None
+
+
+def _key(request, scope_generations, signed_at):
+    params = sorted(
+        (name, value)
+        for name in request.query_params
+        for value in request.query_params.getlist(name)
+        if value != ""
+    )
+    raw = "|".join((
+        request.path,
+        repr(params),
+        request.accepted_renderer.format,
+        repr(sorted(scope_generations.items())),
+        repr(signed_at),
+    ))
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def _lookup(key):
+    entry = _recall(key)
+    if entry is None and getattr(settings, "RESPONSE_CACHE_SHARED", False):
+        entry = _cache().get(f"{CACHE_PREFIX}:body:{key}")
+        if entry is not None:
+            _remember(key, entry)
+    return entry
+
+
+def _store(key, entry):
+    _remember(key, entry)
+    if getattr(settings, "RESPONSE_CACHE_SHARED", False):
+        _cache().set(f"{CACHE_PREFIX}:body:{key}", entry, timeout=_timeout())
+
+
+def _validators(response, etag, last_modified):
+    response["ETag"]          = etag
+    response["Last-Modified"] = http_date(last_modified)
+    response["Cache-Control"] = "public, no-cache"        # always revalidate
+    return response
+
+
+def cached_response(scopes):
+    """
+    Cache an APIView ``get`` for anonymous requests.
+
+    Args:
+        scopes (callable): ``scopes(**url_kwargs)`` → scope names the
+            response depends on (see module docstring).
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            if (not _enabled() or request.method not in ("GET", "HEAD")
+                    or request.user.is_authenticated):
+                return method(view, request, *args, **kwargs)
+
+            scope_generations = generations(scopes(**kwargs))
+            signed_at     = _signed_at()
+            key           = _key(request, scope_generations, signed_at)
+            etag          = f'"{key}"'
+            last_modified = max(max(scope_generations.values()) // 1_000_000_000, signed_at or 0)
+
+            not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if not_modified is not None:
+                return _validators(not_modified, etag, last_modified)
+
+            entry = _lookup(key)
+            if entry is None:
+                response = method(view, request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+                # render now (finalize_response won't render it again)
+                response.accepted_renderer   = request.accepted_renderer
+                response.accepted_media_type = request.accepted_media_type
+                response.renderer_context    = view.get_renderer_context()
+                response.render()
+                entry = (
+                    response.content,
+                    response["Content-Type"],
+                    tuple((h, response[h]) for h in KEPT_HEADERS if response.has_header(h)),
+                    time.time() + _timeout(),
+                )
+                _store(key, entry)
+                return _validators(response, etag, last_modified)
+
+            content, content_type, headers, _ = entry
+            response = HttpResponse(content, content_type=content_type)
+            for header, value in headers:
+                response[header] = value
+            return _validators(response, etag, last_modified)
+        return wrapper
+    return decorator
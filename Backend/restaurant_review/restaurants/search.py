@@ -0,0 +1,409 @@
+# restaurants/search.py
+# ---------------------------------------------------------------------
+#  Restaurant search
+# ---------------------------------------------------------------------
+#  Every restaurant carries a denormalized search document with three
+#  weighted blocks (see document_parts):
+#
+#      A  name
+#      B  cuisine + food-type names
+#      C  city + description
+#
+#  Signals in models.py keep it current when a restaurant is saved, its
+#  M2M tags change, or a tag is renamed, and forward the change to the
+#  configured search backend.  Only documents that actually changed are
+#  written, UPDATE_BATCH rows per statement, so renaming a tag used by
+#  thousands of restaurants costs a handful of queries:
+#
+#      settings.RESTAURANT_SEARCH_BACKEND = "restaurants.search.PostgresSearchBackend"
+#
+#  PostgresSearchBackend    tsvector + GIN index, ts_rank relevance
+#  InMemorySearchBackend    in-process inverted index with BM25 scoring,
+#                           for SQLite / test / single-process deployments
+#  SubstringSearchBackend   plain icontains on the document, no index
+#
+#  Backends annotate an integer ``search_score`` (relevance boosted by
+#  rating, higher is better) that keyset pagination orders on.
+# ---------------------------------------------------------------------
+import heapq
+import math
+import re
+import threading
+from bisect import bisect_left, insort
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, SearchVectorField
+from django.core.signals import setting_changed
+from django.db import connection, transaction
+from django.db.models import BigIntegerField, Case, F, FloatField, TextField, Value, When
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Cast
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+SEARCH_CONFIG = "english"
+
+# relevance is boosted by up to 50 % for a 5-star rating
+RATING_BOOST = 0.1
+
+# relevance is scaled to integers so keyset pagination compares exact values
+SCORE_SCALE = 1_000_000
+
+# rows per bulk UPDATE of documents / vectors
+UPDATE_BATCH = 500
+
+_TOKEN_RE = re.compile(r"[^\W_]+")
+
+
+def tokenize(text):
+    """Lower-cased word tokens of ``text``."""
+    return _TOKEN_RE.findall((text or "").lower())
+
+
+def boosted_score(relevance):
+    """Integer ``search_score`` expression: relevance × rating boost."""
+    rating = Cast("rating", FloatField())
+    return Cast(relevance * (1 + RATING_BOOST * rating) * SCORE_SCALE, BigIntegerField())
+
+
+def rating_score():
+    """``search_score`` for backends without relevance: rating alone."""
+    return Cast(F("rating") * 100, BigIntegerField())
+
+
+# ---------------------------------------------------------------------
+#  Documents
+# ---------------------------------------------------------------------
+
+def document_parts(name, description, city, cuisines, foods):
+    """(A, B, C) weighted text blocks of a restaurant's search document."""
+    return (
+        name or "",
+        " ".join([*cuisines, *foods]),
+        " ".join(filter(None, [city, description])),
+    )
+
+
+def split_document(document):
+    """Inverse of ``"\\n".join(document_parts(...))``."""
+    parts = (document or "").split("\n", 2)
+    return tuple(parts + [""] * (3 - len(parts)))
+
+
+def search_vector(parts):
+    """Weighted tsvector expression for ``document_parts()`` output."""
+    vector = None
+    for weight, text in zip("ABC", parts):
+        term = SearchVector(
+            Value(text, output_field=TextField()), weight=weight, config=SEARCH_CONFIG
+        )
+        vector = term if vector is None else vector + term
+    return vector
+
+
+def update_search_documents(restaurant_ids):
+    """Recompute search_document for ``restaurant_ids`` and re-index the changed ones."""
+    from .models import Restaurant
+
+    restaurants = (
+        Restaurant.objects.filter(pk__in=list(restaurant_ids))
+        .only("name", "description", "city", "search_document")
+        .prefetch_related("cuisine_type", "food_type")
+    )
+    changed, documents = [], {}
+    for rest in restaurants:
+        parts = document_parts(
+            rest.name,
+            rest.description,
+            rest.city,
+            [c.name for c in rest.cuisine_type.all()],
+            [f.name for f in rest.food_type.all()],
+        )
+        document = "\n".join(parts)
+        if document == rest.search_document:
+            continue
+        rest.search_document = document
+        changed.append(rest)
+        documents[rest.pk] = parts
+    if not changed:
+        return
+    Restaurant.objects.bulk_update(changed, ["search_document"], batch_size=UPDATE_BATCH)
+    get_search_backend().index(documents)
+
+
+# ---------------------------------------------------------------------
+#  Backends
+# ---------------------------------------------------------------------
+
+class BaseSearchBackend:
+    def search(self, queryset, text):
+        """
+        Filter ``queryset`` to restaurants matching ``text`` and annotate
+        an integer ``search_score``.
+        """
+        raise NotImplementedError
+
+    def index(self, documents):
+        """``documents``: {restaurant_id: document_parts tuple} to (re)index."""
+
+    def remove(self, restaurant_ids):
+        """Drop deleted restaurants from the index."""
+
+
+class SubstringSearchBackend(BaseSearchBackend):
+    """Case-insensitive substring match on the stored document."""
+
+    def search(self, queryset, text):
+        return queryset.filter(search_document__icontains=text.strip()).annotate(
+            search_score=rating_score()
+        )
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """
+    PostgreSQL full-text search over ``Restaurant.search_vector``.  On
+    any other database it degrades to SubstringSearchBackend.
+    """
+
+    def __init__(self):
+        self.fallback = SubstringSearchBackend()
+
+    @staticmethod
+    def available():
+        return connection.vendor == "postgresql"
+
+    @staticmethod
+    def prefix_query(text):
+        """
+        ``"ital pizz"`` → ``ital:* & pizz:*`` so partial words keep
+        matching the way the old ``icontains`` search did.  Only word
+        characters reach the raw query, so user input can't inject
+        tsquery syntax.
+        """
+        terms = tokenize(text)
+        if not terms:
+            return None
+        return SearchQuery(
+            " & ".join(f"{term}:*" for term in terms), search_type="raw", config=SEARCH_CONFIG
+        )
+
+    def search(self, queryset, text):
+        if not self.available():
+            return self.fallback.search(queryset, text)
+        query = self.prefix_query(text)
+        if query is None:
+            return queryset.annotate(search_score=rating_score())
+        return queryset.filter(search_vector=query).annotate(
+            search_score=boosted_score(SearchRank(F("search_vector"), query))
+        )
+
+    def index(self, documents):
+        if not self.available():
+            return
+        from .models import Restaurant
+
+        items = list(documents.items())
+        for i in range(0, len(items), UPDATE_BATCH):
+            batch = items[i:i + UPDATE_BATCH]
+            Restaurant.objects.filter(pk__in=[pk for pk, _ in batch]).update(
+                search_vector=Case(
+                    *(When(pk=pk, then=search_vector(parts)) for pk, parts in batch),
+                    output_field=SearchVectorField(),
+                )
+            )
+
+
+class InMemorySearchBackend(BaseSearchBackend):
+    """
+    Inverted index held in process memory.
+
+    * built lazily from ``Restaurant.search_document`` on the first search
+    * updated incrementally through ``index()`` / ``remove()`` (signals);
+      changes made by *other* processes are not seen, so use it for
+      SQLite, tests and single-process deployments
+    * every query token is a prefix (``ital`` matches ``italian``) and all
+      tokens must match, like the PostgreSQL backend
+    * BM25 ranking with per-block weights (name > tags > city/description)
+    """
+    k1 = 1.2
+    b  = 0.75
+    FIELD_WEIGHTS         = (3.0, 2.0, 1.0)
+    MAX_PREFIX_EXPANSIONS = 64
+
+    def __init__(self):
+        self.max_results = getattr(settings, "SEARCH_MAX_RESULTS", 1000)
+        self._lock       = threading.RLock()
+        self._built      = False
+        self._reset()
+
+    def _reset(self):
+        self.postings  = defaultdict(dict)  # term -> {doc_id: weighted tf}
+        self.doc_terms = {}                 # doc_id -> (term, …)
+        self.doc_len   = {}                 # doc_id -> weighted length
+        self.vocab     = []                 # sorted terms, for prefix lookups
+        self.total_len = 0.0
+
+    # -----------------------------------------------------------------
+    #  Index maintenance
+    # -----------------------------------------------------------------
+    def build(self, documents=None):
+        """(Re)build from ``documents`` or from every stored search_document."""
+        from .models import Restaurant
+
+        if documents is None:
+            documents = {
+                pk: split_document(doc)
+                for pk, doc in Restaurant.objects.values_list("pk", "search_document").iterator()
+            }
+        with self._lock:
+            self._reset()
+            for pk, parts in documents.items():
+                self._add(pk, parts)
+            self.vocab  = sorted(self.postings)
+            self._built = True
+
+    def _ensure_built(self):
+        if not self._built:
+            with self._lock:
+                if not self._built:
+                    self.build()
+
+    def _add(self, pk, parts, keep_vocab=False):
+        weighted = Counter()
+        for weight, text in zip(self.FIELD_WEIGHTS, parts):
+            for term in tokenize(text):
+                weighted[term] += weight
+        for term, tf in weighted.items():
+            postings = self.postings[term]
+            if keep_vocab and not postings:
+                insort(self.vocab, term)
+            postings[pk] = tf
+        self.doc_terms[pk] = tuple(weighted)
+        self.doc_len[pk]   = sum(weighted.values())
+        self.total_len    += self.doc_len[pk]
+
+    def _discard(self, pk):
+        for term in self.doc_terms.pop(pk, ()):
+            postings = self.postings[term]
+            postings.pop(pk, None)
+            if not postings:
+                del self.postings[term]
+                i = bisect_left(self.vocab, term)
+                if i < len(self.vocab) and self.vocab[i] == term:
+                    del self.vocab[i]
+        self.total_len -= self.doc_len.pop(pk, 0.0)
+
+    def index(self, documents):
+        # apply once the writing transaction commits, so a rollback can't
+        # leave the index ahead of the database
+        transaction.on_commit(lambda: self._apply(documents))
+
+    def _apply(self, documents):
+        with self._lock:
+            if not self._built:
+                return            # the lazy build will read the fresh rows
+            for pk, parts in documents.items():
+                self._discard(pk)
+                self._add(pk, parts, keep_vocab=True)
+
+    def remove(self, restaurant_ids):
+        restaurant_ids = list(restaurant_ids)
+
+        def discard():
+            with self._lock:
+                for pk in restaurant_ids:
+                    self._discard(pk)
+        transaction.on_commit(discard)
+
+    # -----------------------------------------------------------------
+    #  Querying
+    # -----------------------------------------------------------------
+    def expand(self, prefix):
+        """Indexed terms starting with ``prefix``, most frequent first."""
+        start = bisect_left(self.vocab, prefix)
+        end   = bisect_left(self.vocab, prefix + "\uffff")
+        terms = self.vocab[start:end]
+        if len(terms) > self.MAX_PREFIX_EXPANSIONS:
+            terms = sorted(terms, key=lambda t: -len(self.postings[t]))
+            terms = terms[:self.MAX_PREFIX_EXPANSIONS]
+        return terms
+
+    def scores(self, text):
+        """{restaurant_id: BM25 score} for documents matching every token."""
+        self._ensure_built()
+        with self._lock:
+            n_docs = len(self.doc_len)
+            if not n_docs:
+                return {}
+            avg_len = self.total_len / n_docs or 1.0
+
+            totals = None
+            for token in dict.fromkeys(tokenize(text)):
+                token_scores = defaultdict(float)
+                for term in self.expand(token):
+                    postings = self.postings[term]
+                    idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                    for pk, tf in postings.items():
+                        norm = self.k1 * (1 - self.b + self.b * self.doc_len[pk] / avg_len)
+                        token_scores[pk] += idf * tf * (self.k1 + 1) / (tf + norm)
+                if totals is None:
+                    totals = token_scores
+                else:
+                    totals = {pk: s + token_scores[pk] for pk, s in totals.items()
+                              if pk in token_scores}
+                if not totals:
+                    return {}
+            return dict(totals or {})
+
+    def search(self, queryset, text):
+        if not tokenize(text):
+            return queryset.annotate(search_score=rating_score())
+        # bound the id list handed to the database
+        top = heapq.nlargest(self.max_results, self.scores(text).items(), key=lambda item: item[1])
+        if not top:
+            return queryset.none().annotate(search_score=rating_score())
+        # simple CASE on the primary key: far cheaper to build and evaluate
+        # than one When() expression per id
+        opts   = queryset.model._meta
+        column = f"{connection.ops.quote_name(opts.db_table)}.{connection.ops.quote_name(opts.pk.column)}"
+        relevance = RawSQL(
+            f"CASE {column} {' '.join(['WHEN %s THEN %s'] * len(top))} ELSE 0.0 END",
+            [value for item in top for value in item],
+            output_field=FloatField(),
+        )
+        return queryset.filter(pk__in=[pk for pk, _ in top]).annotate(
+            search_score=boosted_score(relevance)
+        )
+
+
+# ---------------------------------------------------------------------
+#  Backend selection
+# ---------------------------------------------------------------------
+_backend      = None
+_backend_lock = threading.Lock()
+
+
+def get_search_backend():
+    """Process-wide instance of ``settings.RESTAURANT_SEARCH_BACKEND``."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                path = getattr(
+                    settings, "RESTAURANT_SEARCH_BACKEND", "restaurants.search.PostgresSearchBackend"
+                )
+                _backend = import_string(path)()
+    return _backend
+
+
+@receiver(setting_changed)
+def _reset_search_backend(setting, **kwargs):
+    global _backend
+    if setting in ("RESTAURANT_SEARCH_BACKEND", "SEARCH_MAX_RESULTS"):
+        _backend = None
+
+
+def search_restaurants(queryset, text):
+    """Run ``text`` through the configured backend."""
+    return get_search_backend().search(queryset, text)
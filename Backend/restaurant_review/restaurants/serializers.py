@@ -1,6 +1,5 @@
-from django.conf import settings
 from django.utils import timezone
-from django.db.models import Avg
+from django.db import models
 from rest_framework import serializers
 
 
@@ -10,8 +9,12 @@ from .models import (
     FoodType,
     RestaurantPhoto,
     Table,
+    TableSlot,
     Booking,
+    WaitlistEntry,
 )
+from .renditions import FORMATS
+from .storage import get_storage
 from reviews.models import Review
 
 class TableSerializer(serializers.ModelSerializer):
@@ -28,26 +31,66 @@ class TablePayloadSerializer(serializers.Serializer):
 # ------------------------------------------------------------------
 #  Photo
 # ------------------------------------------------------------------
+class RestaurantPhotoListSerializer(serializers.ListSerializer):
+    """Builds (and signs) the URLs of the whole list in one storage call."""
+
+    def to_representation(self, data):
+        photos = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        keys   = [
+            key for photo in photos
+            if photo.status == RestaurantPhoto.Status.READY
+            for key in photo.storage_keys
+        ]
+        self.child.urls = get_storage().urls(keys)
+        try:
+            return super().to_representation(photos)
+        finally:
+            self.child.urls = None
+
+
 class RestaurantPhotoSerializer(serializers.ModelSerializer):
     thumbnail_url = serializers.SerializerMethodField()
     high_res_url  = serializers.SerializerMethodField()
+    srcset        = serializers.SerializerMethodField()
+
+    urls = None                                     # set by RestaurantPhotoListSerializer
 
     class Meta:
         model  = RestaurantPhoto
-        fields = ["id", "thumbnail_url", "high_res_url", "uploaded_at"]
+        fields = ["id", "thumbnail_url", "high_res_url", "srcset", "uploaded_at", "status"]
+        list_serializer_class = RestaurantPhotoListSerializer
+
+    def _url(self, key):
+        if not key:
+            return None
+        if self.urls is not None and key in self.urls:
+            return self.urls[key]
+        return get_storage().url(key)
 
-    # ↓ Presigned or public URLs for S3 objects
+    # ↓ URLs from the storage backend (None until processed)
     def get_thumbnail_url(self, obj):
-        return (
-            f"https://{settings.AWS_S3_BUCKET_NAME}.s3."
-            f"{settings.AWS_REGION}.amazonaws.com/{obj.thumbnail_s3_key}"
-        )
+        if obj.status != RestaurantPhoto.Status.READY:
+            return None
+        return self._url(obj.thumbnail_s3_key)
 
     def get_high_res_url(self, obj):
-        return (
-            f"https://{settings.AWS_S3_BUCKET_NAME}.s3."
-            f"{settings.AWS_REGION}.amazonaws.com/{obj.photo_key}"
-        )
+        if obj.status != RestaurantPhoto.Status.READY:
+            return None
+        return self._url(obj.photo_key)
+
+    def get_srcset(self, obj):
+        """
+        ``{content_type: "url 150w, url 480w, …"}`` for <picture>/<img srcset>,
+        so the browser picks the smallest adequate rendition.
+        """
+        if obj.status != RestaurantPhoto.Status.READY or not obj.renditions:
+            return {}
+        srcset = {}
+        for rendition in obj.renditions:            # stored smallest first
+            mime = FORMATS[rendition["format"]][2]
+            entry = f"{self._url(rendition['key'])} {rendition['width']}w"
+            srcset[mime] = f"{srcset[mime]}, {entry}" if mime in srcset else entry
+        return srcset
 
 
 # ------------------------------------------------------------------
@@ -64,6 +107,7 @@ class RestaurantSerializer(serializers.ModelSerializer):
     )
     review_count  = serializers.SerializerMethodField()
     average_rating = serializers.SerializerMethodField()
+    rating_histogram = serializers.ListField(child=serializers.IntegerField(), read_only=True)
     tables = TablePayloadSerializer(many=True, write_only=True, required=False)
     class Meta:
         # 1️⃣  Read-only fields
@@ -87,21 +131,18 @@ class RestaurantSerializer(serializers.ModelSerializer):
             "description",
             "review_count",
             "average_rating",
+            "rating_histogram",
             "photos",
             "tables",
         ]
-        read_only_fields = ["id"]
+        read_only_fields = ["id", "rating"]
 
+    # Denormalized on Restaurant by reviews.models – no queries per row.
     def get_review_count(self, obj):
-        return Review.objects.filter(restaurant=obj).count()
+        return obj.review_count
 
     def get_average_rating(self, obj):
-        avg = (
-            Review.objects.filter(restaurant=obj)
-            .aggregate(Avg("rating"))
-            .get("rating__avg")
-        )
-        return round(avg, 1) if avg else None
+        return round(float(obj.rating), 1) if obj.review_count else None
     
     # tables = TablePayloadSerializer(many=True, write_only=True, required=False)
         
@@ -120,6 +161,13 @@ class RestaurantSerializer(serializers.ModelSerializer):
         return restaurant
 
 
+class NearbyRestaurantSerializer(RestaurantSerializer):
+    """RestaurantSerializer plus coordinates and distance from the search point."""
+    distance_km = serializers.FloatField(read_only=True)
+
+    class Meta(RestaurantSerializer.Meta):
+        fields = RestaurantSerializer.Meta.fields + ["latitude", "longitude", "distance_km"]
+
 
 # ------------------------------------------------------------------
 #  Restaurant Detail (read-only)
@@ -150,6 +198,7 @@ class RestaurantDetailSerializer(serializers.ModelSerializer):
             "photos",
             "reviews",
         ]
+        read_only_fields = ["rating"]
 
     def get_reviews(self, obj):
         return [
@@ -268,3 +317,31 @@ class BookingSerializer(serializers.ModelSerializer):
 
 
 
+
+
+class WaitlistEntrySerializer(serializers.ModelSerializer):
+    restaurant_name = serializers.ReadOnlyField(source="restaurant.name")
+    earliest        = serializers.SerializerMethodField()
+    latest          = serializers.SerializerMethodField()
+
+    class Meta:
+        model  = WaitlistEntry
+        fields = [
+            "id",
+            "restaurant",
+            "restaurant_name",
+            "date",
+            "earliest",
+            "latest",
+            "num_people",
+            "status",
+            "created_at",
+            "notified_at",
+        ]
+        read_only_fields = fields
+
+    def get_earliest(self, obj):
+        return TableSlot.as_hhmm(obj.earliest)
+
+    def get_latest(self, obj):
+        return TableSlot.as_hhmm(obj.latest)
@@ -1,10 +1,26 @@
+import logging
+import random
 import requests
 import os
-from .models import CuisineType, FoodType
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+from .models import GoogleCacheEntry
+from .google_cache import GoogleAPIError, cached, cached_many, store
+from .tags import infer_tags
+
+logger = logging.getLogger(__name__)
 
 # Get the Google API Key from environment variables
 GOOGLE_API_KEY = os.getenv('GOOGLE_API_KEY')
 
+NEARBY_RADIUS_M = 5000  # Adjust the radius as needed
+
 # Mapping of keywords to your CuisineType model names
 CUISINE_TYPE_MAPPING = {
     'italian': 'Italian',
@@ -26,26 +42,205 @@ FOOD_TYPE_MAPPING = {
     # Add more mappings as needed
 }
 
+# ---------------------------------------------------------------------
+#  HTTP client
+# ---------------------------------------------------------------------
+#  One pooled, keep-alive session per process; every call has a
+#  (connect, read) timeout, at most GOOGLE_API_MAX_PER_HOST calls run
+#  against one host at a time, and transient failures (connection
+#  errors, 429 / 5xx, OVER_QUERY_LIMIT) are retried with exponential
+#  backoff.  settings.GOOGLE_MAPS_BASE_URL can point at a local stub for
+#  tests.
+
+# NOT_FOUND (unknown place_id) is an answer worth caching, not an error
+OK_GOOGLE_STATUS        = {'OK', 'ZERO_RESULTS', 'NOT_FOUND'}
+TRANSIENT_HTTP_STATUS   = {429, 500, 502, 503, 504}
+TRANSIENT_GOOGLE_STATUS = {'OVER_QUERY_LIMIT', 'UNKNOWN_ERROR'}
+
+_session         = None
+_session_lock    = threading.Lock()
+_host_slots      = {}                # host -> BoundedSemaphore
+_host_slots_lock = threading.Lock()
+
+
+def google_session():
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                pool_size = getattr(settings, 'GOOGLE_API_POOL_SIZE', 10)
+                session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+                session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+                _session = session
+    return _session
+
+
+def _host_slot(url):
+    host = urlsplit(url).netloc
+    with _host_slots_lock:
+        if host not in _host_slots:
+            _host_slots[host] = threading.BoundedSemaphore(
+                getattr(settings, 'GOOGLE_API_MAX_PER_HOST', 8)
+            )
+        return _host_slots[host]
+
+
+def _get_once(url, params, timeout):
+    with _host_slot(url):
+        try:
+            response = google_session().get(url, params=params, timeout=timeout)
+        except requests.RequestException as exc:
+            # str(exc) carries the full URL, key= included: keep it out of logs
+            raise GoogleAPIError(f"{type(exc).__name__} {urlsplit(url).path}", transient=True) from exc
+    if response.status_code != 200:
+        raise GoogleAPIError(
+            f"HTTP {response.status_code}",
+            transient=response.status_code in TRANSIENT_HTTP_STATUS,
+        )
+    try:
+        data = response.json()
+    except ValueError as exc:
+        raise GoogleAPIError(f"invalid JSON: {exc}") from exc
+    google_status = data.get('status', 'OK')
+    if google_status not in OK_GOOGLE_STATUS:
+        raise GoogleAPIError(
+            f"{google_status} {data.get('error_message', '')}".strip(),
+            transient=google_status in TRANSIENT_GOOGLE_STATUS,
+        )
+    return data
+
+
+def google_get(path, **params):
+    """
+    GET ``<GOOGLE_MAPS_BASE_URL>/<path>`` and return the decoded JSON.
+    Raises GoogleAPIError on network errors, non-200 responses and
+    Google error statuses (anything but OK / ZERO_RESULTS / NOT_FOUND)
+    once the retries for transient failures are used up.
+    """
+    base_url = getattr(settings, 'GOOGLE_MAPS_BASE_URL', 'https://maps.googleapis.com/maps/api')
+    timeout  = getattr(settings, 'GOOGLE_API_TIMEOUT', (3.05, 10))
+    retries  = getattr(settings, 'GOOGLE_API_RETRIES', 2)
+    backoff  = getattr(settings, 'GOOGLE_API_BACKOFF', 0.2)      # seconds, doubled per retry
+    url      = f"{base_url.rstrip('/')}/{path}"
+    params   = {**params, 'key': GOOGLE_API_KEY}
+
+    for attempt in range(retries + 1):
+        try:
+            return _get_once(url, params, timeout)
+        except GoogleAPIError as exc:
+            if not exc.transient or attempt == retries:
+                raise GoogleAPIError(f"{path}: {exc}", transient=exc.transient) from exc
+            # full jitter keeps retries from many threads from lining up
+            time.sleep(random.uniform(0, backoff * 2 ** attempt))
+
+
+# ---------------------------------------------------------------------
+#  Concurrent fetches
+# ---------------------------------------------------------------------
+#  Batch lookups fan their cache misses out over a bounded thread pool.
+#  Identical requests already in flight (from this batch or another
+#  request thread) share one HTTP call.  The pool threads only do HTTP;
+#  cache reads and writes stay on the calling thread.
+
+_fetch_pool      = None
+_fetch_pool_lock = threading.Lock()
+_inflight        = {}                # key -> Future of the call in flight
+_inflight_lock   = threading.Lock()
+
+
+def _get_fetch_pool():
+    global _fetch_pool
+    if _fetch_pool is None:
+        with _fetch_pool_lock:
+            if _fetch_pool is None:
+                _fetch_pool = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'GOOGLE_API_CONCURRENCY', 8),
+                    thread_name_prefix='google-fetch',
+                )
+    return _fetch_pool
+
+
+def _coalesced(key, fn):
+    """Future for ``fn()``, shared with any identical call already running."""
+    with _inflight_lock:
+        future = _inflight.get(key)
+        if future is not None:
+            return future
+        future = _get_fetch_pool().submit(fn)
+        _inflight[key] = future
+
+    def done(_):
+        with _inflight_lock:
+            _inflight.pop(key, None)
+    future.add_done_callback(done)
+    return future
+
+
+# ---------------------------------------------------------------------
+#  Cached lookups (see restaurants/google_cache.py)
+# ---------------------------------------------------------------------
+
+def geocode_zip(zip_code):
+    """{'lat': …, 'lng': …} for a zip code, or None when Google has no match."""
+    def fetch():
+        results = google_get('geocode/json', address=zip_code).get('results')
+        return results[0]['geometry']['location'] if results else None
+    return cached(GoogleCacheEntry.Kind.GEOCODE, zip_code, fetch)
+
+
+def nearby_restaurants(lat, lng, radius=NEARBY_RADIUS_M):
+    """Raw Places nearby-search results around a point."""
+    def fetch():
+        return google_get(
+            'place/nearbysearch/json', location=f"{lat},{lng}", radius=radius, type='restaurant'
+        ).get('results', [])
+    # ~1 m of rounding keeps keys stable for the same geocoded centroid
+    return cached(GoogleCacheEntry.Kind.NEARBY, f"{lat:.5f},{lng:.5f}:{radius}", fetch)
+
+
+def _fetch_place_details(place_id):
+    return google_get('place/details/json', place_id=place_id).get('result', {})
+
+
+def place_details(place_id):
+    """Raw Places details ``result`` for a place_id ({} when unknown)."""
+    return cached(GoogleCacheEntry.Kind.DETAILS, place_id, lambda: _fetch_place_details(place_id))
+
+
+def place_details_many(place_ids):
+    """
+    Raw details for many place_ids at once: {place_id: result}.  Cache
+    hits cost one query for the whole batch; misses are fetched
+    concurrently, so the batch takes about as long as its slowest call.
+    Place_ids Google can't answer for are left out.
+    """
+    kind = GoogleCacheEntry.Kind.DETAILS
+    results, missing, expired = cached_many(
+        kind, dict.fromkeys(place_ids), lambda pid: lambda: _fetch_place_details(pid)
+    )
+    futures = {
+        pid: _coalesced(('details', pid), lambda pid=pid: _fetch_place_details(pid))
+        for pid in missing
+    }
+    for pid, future in futures.items():
+        try:
+            results[pid] = store(kind, pid, future.result())
+        except GoogleAPIError as exc:
+            if pid in expired:
+                results[pid] = expired[pid]       # stale beats nothing
+            logger.warning("place details %s failed: %s", pid, exc)
+    return results
+
+
 def fetch_google_places(zip_code):
-    geocode_url = f"https://maps.googleapis.com/maps/api/geocode/json?address={zip_code}&key={GOOGLE_API_KEY}"
-    geocode_response = requests.get(geocode_url)
-    if geocode_response.status_code == 200:
-        location_data = geocode_response.json().get('results')
-        if location_data:
-            location = location_data[0]['geometry']['location']
-            lat, lng = location['lat'], location['lng']
-            
-            places_url = "https://maps.googleapis.com/maps/api/place/nearbysearch/json"
-            params = {
-                'location': f"{lat},{lng}",
-                'radius': 5000,  # Adjust the radius as needed
-                'type': 'restaurant',
-                'key': GOOGLE_API_KEY
-            }
-            places_response = requests.get(places_url, params=params)
-            if places_response.status_code == 200:
-                return places_response.json().get('results')
-    return []
+    try:
+        location = geocode_zip(zip_code)
+        if not location:
+            return []
+        return nearby_restaurants(location['lat'], location['lng'])
+    except GoogleAPIError:
+        return []
 
 def normalize_google_place_result(place):
     price_level_mapping = {
@@ -59,19 +254,11 @@ def normalize_google_place_result(place):
     place_name = place.get('name', '').lower()
     place_description = place.get('vicinity', '').lower()  # You can also look into `formatted_address` or `place.get('description', '')`
 
-    # Infer cuisine type based on name or description
-    inferred_cuisine_ids = []
-    for keyword, cuisine_name in CUISINE_TYPE_MAPPING.items():
-        if keyword in place_name or keyword in place_description or any(keyword in place_type for place_type in place_types):
-            cuisine_obj, created = CuisineType.objects.get_or_create(name=cuisine_name)
-            inferred_cuisine_ids.append(cuisine_obj.id)
-
-    # Infer food type based on name or description
-    inferred_food_type_ids = []
-    for keyword, food_name in FOOD_TYPE_MAPPING.items():
-        if keyword in place_name or keyword in place_description or any(keyword in place_type for place_type in place_types):
-            food_type_obj, created = FoodType.objects.get_or_create(name=food_name)
-            inferred_food_type_ids.append(food_type_obj.id)
+    # Infer cuisine / food type from name, description and place types
+    # (cached lookup table, no queries once warm – see restaurants/tags.py)
+    inferred_cuisine_ids, inferred_food_type_ids = infer_tags(
+        place_name, place_description, *place_types
+    )
 
     return {
         'name': place.get('name', 'N/A'),
@@ -88,11 +275,24 @@ def normalize_google_place_result(place):
     }
 
 def fetch_google_place_details(place_id):
-    details_url = f"https://maps.googleapis.com/maps/api/place/details/json?place_id={place_id}&key={GOOGLE_API_KEY}"
-    details_response = requests.get(details_url)
-    if details_response.status_code == 200:
-        result = details_response.json().get('result', {})
-        
+    try:
+        result = place_details(place_id)
+    except GoogleAPIError:
+        result = None
+    return normalize_google_place_details(result)
+
+
+def fetch_google_place_details_batch(place_ids):
+    """{place_id: normalized details} for many places, fetched concurrently."""
+    return {
+        place_id: normalize_google_place_details(result)
+        for place_id, result in place_details_many(place_ids).items()
+        if result
+    }
+
+
+def normalize_google_place_details(result):
+    if result:
         # Extracting the description or forming a basic description
         description = result.get('editorial_summary', {}).get('overview', 'No description available')
 
@@ -100,17 +300,7 @@ def fetch_google_place_details(place_id):
         if description == 'No description available':
             description = f"{result.get('name', '').lower()} - {', '.join(result.get('types', []))}"
 
-        inferred_cuisine_ids = []
-        for keyword, cuisine_name in CUISINE_TYPE_MAPPING.items():
-            if keyword in description:
-                cuisine_obj, created = CuisineType.objects.get_or_create(name=cuisine_name)
-                inferred_cuisine_ids.append(cuisine_obj.id)
-
-        inferred_food_type_ids = []
-        for keyword, food_name in FOOD_TYPE_MAPPING.items():
-            if keyword in description:
-                food_type_obj, created = FoodType.objects.get_or_create(name=food_name)
-                inferred_food_type_ids.append(food_type_obj.id)
+        inferred_cuisine_ids, inferred_food_type_ids = infer_tags(description)
 
         return {
             'name': result.get('name', 'N/A'),
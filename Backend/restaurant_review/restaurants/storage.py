@@ -0,0 +1,373 @@
+# restaurants/storage.py
+# ---------------------------------------------------------------------
+#  Photo storage backends
+# ---------------------------------------------------------------------
+#  settings.PHOTO_STORAGE_BACKEND selects one process-wide backend:
+#
+#    restaurants.storage.S3Storage      (default) bucket AWS_S3_BUCKET_NAME
+#    restaurants.storage.LocalStorage   content-addressed files under
+#                                       LOCAL_STORAGE_ROOT, served by
+#                                       views.local_media
+#
+#  Backends decide the final object key: ``upload_*`` return it and
+#  callers store what they get back (S3 keeps the requested key, local
+#  storage only its extension).  ``url(key)`` is the one place public
+#  URLs are built.
+#
+#  S3Storage holds one shared client (boto3 clients are thread-safe):
+#
+#    * connection pool sized by AWS_S3_MAX_POOL_CONNECTIONS, so parallel
+#      photo workers reuse TLS connections instead of re-handshaking
+#    * uploads from a path stream straight off disk; files above
+#      AWS_S3_MULTIPART_THRESHOLD go up as AWS_S3_MULTIPART_CHUNKSIZE
+#      parts, AWS_S3_MAX_CONCURRENCY at a time
+#    * deletes are batched through delete_objects (1 000 keys per call)
+#
+#  AWS_S3_ENDPOINT_URL points the client at MinIO / moto / LocalStack.
+#
+#  Caching & signing: photo keys never get new content (originals are
+#  named by their SHA-256, renditions after the original), so objects
+#  are uploaded with PHOTO_CACHE_CONTROL (a year, immutable).  With
+#  PHOTO_URL_SIGNING on, objects are private (Cache-Control ``private,
+#  max-age=PHOTO_URL_EXPIRY``) and ``urls()`` returns
+#  expiring signed URLs – S3 SigV4 presigned, local HMAC – computed
+#  here without any network call.  The signing key is derived once per
+#  batch and the signing time is rounded down to PHOTO_URL_EXPIRY / 2,
+#  so a URL stays byte-identical (and CDN/browser cacheable) for that
+#  window and is always valid for at least half the expiry.
+# ---------------------------------------------------------------------
+import hashlib
+import hmac
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from urllib.parse import quote, urlencode, urlsplit
+
+import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from botocore.exceptions import BotoCoreError, ClientError
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.urls import reverse
+from django.utils.crypto import constant_time_compare
+from django.utils.encoding import force_bytes
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+DELETE_BATCH = 1000             # S3 limit per delete_objects call
+
+DEFAULT_CACHE_CONTROL = "public, max-age=31536000, immutable"
+DEFAULT_URL_EXPIRY    = 3600
+MAX_S3_URL_EXPIRY     = 7 * 24 * 3600     # SigV4 limit
+
+
+def cache_control():
+    """
+    Cache-Control for stored photos.  Signed objects are private and kept
+    no longer than a URL lives, so shared caches can't serve them past
+    the signature's expiry.  S3 stores the header with the object: after
+    turning signing on, re-upload (or re-copy) existing objects.
+    """
+    if signing_enabled():
+        expiry = getattr(settings, "PHOTO_URL_EXPIRY", DEFAULT_URL_EXPIRY)
+        return f"private, max-age={expiry}"
+    return getattr(settings, "PHOTO_CACHE_CONTROL", DEFAULT_CACHE_CONTROL)
+
+
+def signing_enabled():
+    return getattr(settings, "PHOTO_URL_SIGNING", False)
+
+
+def signing_window(now=None):
+    """``(signed_at, expires_in)`` shared by every URL signed in this window."""
+    expiry = getattr(settings, "PHOTO_URL_EXPIRY", DEFAULT_URL_EXPIRY)
+    now    = int(now if now is not None else time.time())
+    step   = max(expiry // 2, 1)
+    return now - now % step, expiry
+
+
+class StorageError(Exception):
+    pass
+
+
+class BaseStorage:
+    def upload_path(self, path, key, content_type=None):
+        """Store the file at ``path``; returns the key it was stored under."""
+        with open(path, "rb") as fileobj:
+            return self.upload_fileobj(fileobj, key, content_type)
+
+    def upload_fileobj(self, fileobj, key, content_type=None):
+        """Store a readable binary file object; returns the final key."""
+        raise NotImplementedError
+
+    def delete_many(self, keys):
+        """Delete ``keys``; returns the keys that could not be deleted."""
+        raise NotImplementedError
+
+    def url(self, key):
+        """URL of ``key`` – signed when PHOTO_URL_SIGNING is on."""
+        return self.urls([key])[key]
+
+    def urls(self, keys):
+        """``{key: url}`` for many keys; signs them as one batch."""
+        raise NotImplementedError
+
+
+# ---------------------------------------------------------------------
+#  S3
+# ---------------------------------------------------------------------
+
+class S3Storage(BaseStorage):
+    def __init__(self):
+        self.bucket = settings.AWS_S3_BUCKET_NAME
+        self.client = boto3.client(
+            "s3",
+            aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+            region_name=settings.AWS_REGION,
+            endpoint_url=getattr(settings, "AWS_S3_ENDPOINT_URL", None) or None,
+            config=Config(
+                max_pool_connections=getattr(settings, "AWS_S3_MAX_POOL_CONNECTIONS", 32),
+                retries={"max_attempts": 3, "mode": "standard"},
+                tcp_keepalive=True,
+                signature_version="s3v4",
+                s3={"addressing_style": "virtual"},
+            ),
+        )
+        self.transfer_config = TransferConfig(
+            multipart_threshold=getattr(settings, "AWS_S3_MULTIPART_THRESHOLD", 8 * MB),
+            multipart_chunksize=getattr(settings, "AWS_S3_MULTIPART_CHUNKSIZE", 8 * MB),
+            max_concurrency=getattr(settings, "AWS_S3_MAX_CONCURRENCY", 4),
+        )
+
+    def _extra_args(self, content_type):
+        extra = {"CacheControl": cache_control()}
+        if not signing_enabled():
+            extra["ACL"] = "public-read"
+        if content_type:
+            extra["ContentType"] = content_type
+        return extra
+
+    def upload_path(self, path, key, content_type=None):
+        """Stream a file on disk to ``key`` (multipart above the threshold)."""
+        try:
+            self.client.upload_file(
+                path, self.bucket, key,
+                ExtraArgs=self._extra_args(content_type), Config=self.transfer_config,
+            )
+        except (BotoCoreError, ClientError) as exc:
+            raise StorageError(f"upload of {key} failed") from exc
+        return key
+
+    def upload_fileobj(self, fileobj, key, content_type=None):
+        try:
+            self.client.upload_fileobj(
+                fileobj, self.bucket, key,
+                ExtraArgs=self._extra_args(content_type), Config=self.transfer_config,
+            )
+        except (BotoCoreError, ClientError) as exc:
+            raise StorageError(f"upload of {key} failed") from exc
+        return key
+
+    def delete_many(self, keys):
+        keys   = [k for k in dict.fromkeys(keys) if k]
+        failed = []
+        for i in range(0, len(keys), DELETE_BATCH):
+            batch = keys[i:i + DELETE_BATCH]
+            try:
+                response = self.client.delete_objects(
+                    Bucket=self.bucket,
+                    Delete={"Objects": [{"Key": k} for k in batch], "Quiet": True},
+                )
+            except (BotoCoreError, ClientError) as exc:
+                logger.warning("delete_objects failed for %d keys: %s", len(batch), exc)
+                failed.extend(batch)
+                continue
+            failed.extend(error["Key"] for error in response.get("Errors", []))
+        return failed
+
+    def _base_url(self):
+        endpoint = getattr(settings, "AWS_S3_ENDPOINT_URL", None)
+        if endpoint:
+            return f"{endpoint.rstrip('/')}/{self.bucket}"
+        return f"https://{self.bucket}.s3.{settings.AWS_REGION}.amazonaws.com"
+
+    def urls(self, keys):
+        base = self._base_url()
+        if not signing_enabled():
+            return {key: f"{base}/{quote(key)}" for key in keys}
+        return self._presign(base, keys)
+
+    def _presign(self, base, keys):
+        """SigV4 query-string presigning (GET, unsigned payload) for many keys."""
+        access_key = settings.AWS_ACCESS_KEY_ID
+        secret_key = settings.AWS_SECRET_ACCESS_KEY
+        if not (access_key and secret_key):
+            # instance-role credentials: let botocore sign, one key at a time
+            return {
+                key: self.client.generate_presigned_url(
+                    "get_object", Params={"Bucket": self.bucket, "Key": key},
+                    ExpiresIn=min(signing_window()[1], MAX_S3_URL_EXPIRY),
+                )
+                for key in keys
+            }
+
+        signed_at, expiry = signing_window()
+        stamp   = datetime.fromtimestamp(signed_at, timezone.utc)
+        date    = stamp.strftime("%Y%m%d")
+        amzdate = stamp.strftime("%Y%m%dT%H%M%SZ")
+        scope   = f"{date}/{settings.AWS_REGION}/s3/aws4_request"
+        signing_key = force_bytes("AWS4" + secret_key)
+        for part in (date, settings.AWS_REGION, "s3", "aws4_request"):
+            signing_key = hmac.new(signing_key, part.encode(), hashlib.sha256).digest()
+
+        parts  = urlsplit(base)
+        host   = parts.netloc
+        query  = urlencode({
+            "X-Amz-Algorithm":     "AWS4-HMAC-SHA256",
+            "X-Amz-Credential":    f"{access_key}/{scope}",
+            "X-Amz-Date":          amzdate,
+            "X-Amz-Expires":       str(min(expiry, MAX_S3_URL_EXPIRY)),
+            "X-Amz-SignedHeaders": "host",
+        }, quote_via=quote, safe="-_.~")
+        urls = {}
+        for key in keys:
+            path = f"{parts.path}/{quote(key, safe='/~')}"
+            canonical = f"GET\n{path}\n{query}\nhost:{host}\n\nhost\nUNSIGNED-PAYLOAD"
+            to_sign = "\n".join((
+                "AWS4-HMAC-SHA256", amzdate, scope,
+                hashlib.sha256(canonical.encode()).hexdigest(),
+            ))
+            signature = hmac.new(signing_key, to_sign.encode(), hashlib.sha256).hexdigest()
+            urls[key] = f"{parts.scheme}://{host}{path}?{query}&X-Amz-Signature={signature}"
+        return urls
+
+
+# ---------------------------------------------------------------------
+#  Local disk
+# ---------------------------------------------------------------------
+
+class LocalStorage(BaseStorage):
+    """
+    Content-addressed files on local disk::
+
+        <LOCAL_STORAGE_ROOT>/ab/cd/abcd…(sha256).webp
+
+    Identical content is stored once; two hex levels of sharding keep
+    directories small.  Files are written to a temp file on the same
+    filesystem and renamed into place, so readers never see a partial
+    file.
+    """
+    KEY_RE = re.compile(r"[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}(\.[a-z0-9]{1,5})?")
+
+    def __init__(self):
+        self.root = os.fspath(
+            getattr(settings, "LOCAL_STORAGE_ROOT", None)
+            or os.path.join(settings.BASE_DIR, "media_store")
+        )
+        self.tmp = os.path.join(self.root, "tmp")
+        os.makedirs(self.tmp, exist_ok=True)
+
+    @staticmethod
+    def _extension(key):
+        ext = os.path.splitext(key or "")[1].lower()
+        return ext if re.fullmatch(r"\.[a-z0-9]{1,5}", ext) else ""
+
+    def path(self, key):
+        """Absolute path of ``key``; raises StorageError for malformed keys."""
+        if not self.KEY_RE.fullmatch(key or ""):
+            raise StorageError(f"not a local storage key: {key!r}")
+        return os.path.join(self.root, *key.split("/"))
+
+    def upload_fileobj(self, fileobj, key, content_type=None):
+        digest = hashlib.sha256()
+        with tempfile.NamedTemporaryFile(dir=self.tmp, delete=False) as out:
+            try:
+                for chunk in iter(lambda: fileobj.read(MB), b""):
+                    digest.update(chunk)
+                    out.write(chunk)
+            except BaseException:
+                os.unlink(out.name)
+                raise
+        sha       = digest.hexdigest()
+        final_key = f"{sha[:2]}/{sha[2:4]}/{sha}{self._extension(key)}"
+        final     = self.path(final_key)
+        os.makedirs(os.path.dirname(final), exist_ok=True)
+        if os.path.exists(final):
+            os.unlink(out.name)                 # same content already stored
+        else:
+            os.chmod(out.name, 0o644)
+            os.replace(out.name, final)
+        return final_key
+
+    def delete_many(self, keys):
+        failed = []
+        for key in dict.fromkeys(keys):
+            if not key:
+                continue
+            try:
+                os.remove(self.path(key))
+            except FileNotFoundError:
+                pass
+            except (OSError, StorageError):
+                failed.append(key)
+        return failed
+
+    def _signature(self, key, expires):
+        # key derived once per instance; see views.local_media for the check
+        if not hasattr(self, "_signing_key"):
+            self._signing_key = hashlib.sha256(
+                b"restaurants.storage.LocalStorage" + force_bytes(settings.SECRET_KEY)
+            ).digest()
+        return hmac.new(self._signing_key, f"{key}:{expires}".encode(), hashlib.sha256).hexdigest()
+
+    def urls(self, keys):
+        if not signing_enabled():
+            return {key: reverse("local-media", args=[key]) for key in keys}
+        signed_at, expiry = signing_window()
+        expires = signed_at + expiry
+        return {
+            key: f"{reverse('local-media', args=[key])}?"
+                 f"expires={expires}&signature={self._signature(key, expires)}"
+            for key in keys
+        }
+
+    def verify(self, key, expires, signature):
+        """Check a signed URL's query parameters."""
+        try:
+            expires = int(expires)
+        except (TypeError, ValueError):
+            return False
+        return expires > time.time() and constant_time_compare(
+            self._signature(key, expires), signature or ""
+        )
+
+
+_storage      = None
+_storage_lock = threading.Lock()
+
+
+def get_storage():
+    """Process-wide instance of ``settings.PHOTO_STORAGE_BACKEND``."""
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                path = getattr(settings, "PHOTO_STORAGE_BACKEND", "restaurants.storage.S3Storage")
+                _storage = import_string(path)()
+    return _storage
+
+
+@receiver(setting_changed)
+def _reset_storage(setting, **kwargs):
+    global _storage
+    if setting.startswith(("AWS_", "LOCAL_STORAGE_", "PHOTO_STORAGE_")) or setting == "SECRET_KEY":
+        _storage = None
@@ -0,0 +1,92 @@
+# restaurants/tags.py
+# ---------------------------------------------------------------------
+#  Cuisine / food-type inference for Google results
+# ---------------------------------------------------------------------
+#  services.CUISINE_TYPE_MAPPING / FOOD_TYPE_MAPPING map keywords to
+#  CuisineType / FoodType names.  Inferring the tags of a place used to
+#  mean a get_or_create per keyword hit; instead a process-wide table
+#  holds
+#
+#    * {name: id} for every CuisineType and FoodType (one query each)
+#    * one compiled regex alternation over every keyword, so a place's
+#      text is scanned once regardless of how many keywords there are
+#
+#  The table is rebuilt lazily after a CuisineType / FoodType is renamed
+#  or deleted (signals in models.py); names it hasn't seen are looked up
+#  once and added.  Once warm, tagging a whole batch of places costs no
+#  queries.
+# ---------------------------------------------------------------------
+import re
+import threading
+
+from .models import CuisineType, FoodType
+
+
+class TagTable:
+    """Snapshot of the keyword matcher and tag ids."""
+
+    def __init__(self, cuisine_mapping, food_mapping):
+        self.cuisine_mapping = dict(cuisine_mapping)
+        self.food_mapping    = dict(food_mapping)
+        self.cuisine_ids     = dict(CuisineType.objects.values_list("name", "id"))
+        self.food_ids        = dict(FoodType.objects.values_list("name", "id"))
+
+        keywords = sorted({*self.cuisine_mapping, *self.food_mapping}, key=len, reverse=True)
+        # zero-width lookahead so keywords overlapping each other all match
+        self.pattern = (
+            re.compile("(?=(%s))" % "|".join(map(re.escape, keywords))) if keywords else None
+        )
+
+    def keywords_in(self, *texts):
+        """Set of mapping keywords occurring (as substrings) in ``texts``."""
+        if self.pattern is None:
+            return set()
+        haystack = "\n".join(t.lower() for t in texts if t)
+        return {match.group(1) for match in self.pattern.finditer(haystack)}
+
+    def _ids(self, mapping, ids, model, found):
+        result = []
+        for keyword, name in mapping.items():          # keep mapping order
+            if keyword not in found:
+                continue
+            if name not in ids:
+                # first sighting of this tag: look it up (or create it) once
+                ids[name] = model.objects.get_or_create(name=name)[0].id
+            result.append(ids[name])
+        return result
+
+    def infer(self, *texts):
+        """(cuisine_ids, food_type_ids) inferred from ``texts``."""
+        found = self.keywords_in(*texts)
+        return (
+            self._ids(self.cuisine_mapping, self.cuisine_ids, CuisineType, found),
+            self._ids(self.food_mapping, self.food_ids, FoodType, found),
+        )
+
+
+_table      = None
+_table_lock = threading.Lock()
+
+
+def get_tag_table():
+    """Process-wide TagTable, built on first use."""
+    global _table
+    table = _table
+    if table is None:
+        from .services import CUISINE_TYPE_MAPPING, FOOD_TYPE_MAPPING
+
+        with _table_lock:
+            if _table is None:
+                _table = TagTable(CUISINE_TYPE_MAPPING, FOOD_TYPE_MAPPING)
+            table = _table
+    return table
+
+
+def invalidate_tag_table():
+    global _table
+    _table = None
+
+
+def infer_tags(*texts):
+    """(cuisine_ids, food_type_ids) for a place's name / description / types."""
+    return get_tag_table().infer(*texts)
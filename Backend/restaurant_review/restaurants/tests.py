@@ -1,5 +1,1235 @@
-from django.test import TestCase
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime, time as dt_time, timedelta, timezone as dt_timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO, StringIO
+from unittest import mock, skipUnless
+from urllib.parse import parse_qs, urlparse
 
-# Create your tests here.
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+try:
+    from moto import mock_aws
+except ImportError:                     # dev-only dependency
+    mock_aws = None
+from rest_framework.test import APIClient
 
+from accounts.models import CustomUser
+from reviews.models import Review
+from . import geo, google_cache, photos, renditions, response_cache
+from .allocation import allocate, allocate_for, split_party
+from .management.commands.complete_past_bookings import watermark
+from .bookings import complete_past_bookings, transition_status
+from .models import (
+    Restaurant, RestaurantPhoto, CuisineType, FoodType, Table, TableSlot, Booking,
+    GoogleCacheEntry, StoredPhotoObject, WaitlistEntry,
+)
+from .google_cache import GoogleAPIError
+from .services import (
+    fetch_google_places, fetch_google_place_details, fetch_google_place_details_batch,
+    google_get, normalize_google_place_result,
+)
+from .serializers import RestaurantPhotoSerializer
+from .storage import get_storage
+from .tags import infer_tags, invalidate_tag_table
+from .utils import upload_to_s3, delete_s3_objects
 
+
+def make_owner(email="owner@example.com"):
+    return CustomUser.objects.create_user(
+        username=email.split("@")[0], email=email, password="owner123", role="owner"
+    )
+
+
+def make_restaurant(owner, **kwargs):
+    fields = dict(
+        name="Testaurant",
+        address="1 Main St",
+        city="San Jose",
+        state="CA",
+        zip_code="95112",
+        price_range="$$",
+        hours_of_operation="9-5",
+        phone_number="555-0100",
+    )
+    fields.update(kwargs)
+    return Restaurant.objects.create(owner=owner, **fields)
+
+
+class RestaurantSearchViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.owner = make_owner()
+        self.diner = CustomUser.objects.create_user(
+            username="diner", email="diner@example.com", password="user123"
+        )
+        self.day = timezone.localdate() + timedelta(days=1)
+
+    def add_restaurants(self, n):
+        for i in range(n):
+            rest = make_restaurant(self.owner, name=f"R{i:03}")
+            for size in (2, 4):
+                Table.objects.create(
+                    restaurant=rest, size=size, available_times=["18:00", "18:30", "20:00"]
+                )
+
+    def search(self, **params):
+        params.setdefault("date", self.day.isoformat())
+        params.setdefault("time", "18:15")
+        params.setdefault("num_people", 2)
+        return self.client.get(reverse("restaurant-search"), params)
+
+    def test_response_shape_and_booked_slots(self):
+        self.add_restaurants(1)
+        table = Table.objects.get(size=2)
+        self.search()  # warm the availability cache
+        with self.captureOnCommitCallbacks(execute=True):
+            Booking.objects.create(
+                user=self.diner, restaurant=table.restaurant, table=table,
+                date=self.day, time="18:00", num_people=2,
+            )
+
+        res = self.search()
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(len(res.data), 1)
+        entry = res.data[0]
+        self.assertEqual(
+            set(entry), {"restaurant_id", "name", "address", "rating", "tables", "bookings_today"}
+        )
+        self.assertEqual(
+            entry["tables"],
+            [
+                {"id": table.id, "size": 2, "times": ["18:30"]},
+                {"id": Table.objects.get(size=4).id, "size": 4, "times": ["18:00", "18:30"]},
+            ],
+        )
+
+    def test_query_count_is_constant(self):
+        self.add_restaurants(2)
+        with self.assertNumQueries(4):
+            self.search()
+
+        cache.clear()
+        self.add_restaurants(40)
+        with self.assertNumQueries(4):
+            res = self.search()
+        self.assertEqual(len(res.data), 42)
+
+        # warm cache: only the location query is left
+        with self.assertNumQueries(1):
+            self.assertEqual(self.search(num_people=4).data[0]["tables"][0]["size"], 4)
+
+    def test_table_edit_retires_cached_dates(self):
+        self.add_restaurants(1)
+        self.search()
+        table = Table.objects.get(size=4)
+        with self.captureOnCommitCallbacks(execute=True):
+            table.available_times = ["21:00"]
+            table.save()
+
+        res = self.search(num_people=3)
+
+        self.assertEqual(res.data, [])
+
+
+class TableSlotTests(TestCase):
+    def test_slots_follow_available_times(self):
+        rest = make_restaurant(make_owner())
+        table = Table.objects.create(restaurant=rest, size=2, available_times=["18:00", "9:30", "bad"])
+        self.assertEqual(list(table.slots.values_list("minute", flat=True)), [570, 1080])
+
+        table.available_times = ["18:00", "21:15"]
+        table.save()
+        self.assertEqual(
+            [TableSlot.as_hhmm(m) for m in table.slots.values_list("minute", flat=True)],
+            ["18:00", "21:15"],
+        )
+
+
+@override_settings(BACKGROUND_TASKS_EAGER=True)
+class BookTableTests(TestCase):
+    def setUp(self):
+        self.restaurant = make_restaurant(make_owner())
+        self.table = Table.objects.create(restaurant=self.restaurant, size=4, available_times=["19:00"])
+        self.guest = CustomUser.objects.create_user(
+            username="guest", email="guest@example.com", password="pw", role="user"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.guest)
+        self.payload = {
+            "restaurant_id": self.restaurant.id,
+            "table_id": self.table.id,
+            "date": (timezone.localdate() + timedelta(days=1)).isoformat(),
+            "time": "19:00",
+            "num_people": 2,
+        }
+
+    def book(self, **overrides):
+        return self.client.post(reverse("book-table"), {**self.payload, **overrides}, format="json")
+
+    def test_booking_mails_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.book()
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ["guest@example.com"])
+
+    def test_taken_slot_is_a_conflict(self):
+        self.assertEqual(self.book().status_code, 201)
+        response = self.book()
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()["error"], "Table already booked at that time.")
+        self.assertEqual(Booking.objects.filter(table=self.table).count(), 1)
+
+        # a cancelled booking frees the slot again
+        Booking.objects.update(status=Booking.Status.CANCELLED)
+        self.assertEqual(self.book().status_code, 201)
+
+    def test_rejections(self):
+        self.assertEqual(self.book(num_people=5).status_code, 400)
+        self.assertEqual(self.book(time="12:00").status_code, 400)
+        self.assertEqual(self.book(table_id=self.table.id + 1).status_code, 400)
+        yesterday = (timezone.localdate() - timedelta(days=1)).isoformat()
+        self.assertEqual(self.book(date=yesterday).json()["error"], "Cannot book in the past.")
+        self.assertFalse(Booking.objects.exists())
+
+
+class BookingStatusTests(TestCase):
+    def setUp(self):
+        restaurant = make_restaurant(make_owner())
+        table = Table.objects.create(restaurant=restaurant, size=4)
+        guest = CustomUser.objects.create_user(
+            username="guest", email="guest@example.com", password="pw", role="user"
+        )
+        day = timezone.localdate()
+        self.bookings = [
+            Booking.objects.create(user=guest, restaurant=restaurant, table=table,
+                                   date=day, time=f"{hour}:00", num_people=2)
+            for hour in (18, 19, 20)
+        ]
+
+    def test_save_tracks_status_without_rereading(self):
+        booking = Booking.objects.get(pk=self.bookings[0].pk)
+        stamped = booking.status_changed_at
+        self.assertIsNotNone(stamped)
+
+        booking.num_people = 3
+        with self.assertNumQueries(1):
+            booking.save()
+        self.assertEqual(booking.status_changed_at, stamped)
+
+        booking.status = Booking.Status.CANCELLED
+        with self.assertNumQueries(1):
+            booking.save(update_fields=["status"])
+        booking.refresh_from_db()
+        self.assertGreater(booking.status_changed_at, stamped)
+
+    def test_transition_status_is_one_update(self):
+        self.bookings[0].status = Booking.Status.CANCELLED
+        self.bookings[0].save()
+        cancelled_at = Booking.objects.get(pk=self.bookings[0].pk).status_changed_at
+
+        with self.captureOnCommitCallbacks(execute=True):
+            moved = transition_status(Booking.objects.all(), Booking.Status.CANCELLED)
+        self.assertEqual(moved, 2)
+        self.assertEqual(
+            set(Booking.objects.values_list("status", flat=True)), {Booking.Status.CANCELLED}
+        )
+        self.assertEqual(Booking.objects.get(pk=self.bookings[0].pk).status_changed_at, cancelled_at)
+        self.assertEqual(transition_status(Booking.objects.all(), Booking.Status.CANCELLED), 0)
+        with self.assertRaises(ValueError):
+            transition_status(Booking.objects.all(), "LOST")
+
+    def test_complete_past_bookings_in_chunks(self):
+        half_past_seven = timezone.make_aware(
+            datetime.combine(timezone.localdate(), datetime.min.time()).replace(hour=19, minute=30)
+        )
+        chunks = list(complete_past_bookings(now=half_past_seven, chunk_size=1))
+        self.assertEqual([changed for _, changed in chunks], [1, 1])
+        self.assertEqual(chunks[-1][0][2], self.bookings[1].pk)
+        self.assertEqual(
+            list(Booking.objects.order_by("time").values_list("status", flat=True)),
+            [Booking.Status.COMPLETED, Booking.Status.COMPLETED, Booking.Status.BOOKED],
+        )
+
+        Booking.objects.filter(pk=self.bookings[2].pk).update(
+            date=timezone.localdate() + timedelta(days=1)
+        )
+        out = StringIO()
+        call_command("complete_past_bookings", stdout=out)
+        self.assertIn("completed 0 bookings in 0 chunks", out.getvalue())
+
+    def test_printed_watermark_resumes_exactly(self):
+        yesterday = timezone.localdate() - timedelta(days=1)
+        Booking.objects.filter(pk=self.bookings[0].pk).update(
+            date=yesterday, time=dt_time(18, 0, 0, 250000)
+        )
+        out = StringIO()
+        call_command("complete_past_bookings", "--chunk-size", "1", stdout=out)
+        printed = out.getvalue().split("watermark ")[1].split()[0]
+        self.assertEqual(
+            watermark(printed), (yesterday, dt_time(18, 0, 0, 250000), self.bookings[0].pk)
+        )
+
+
+class AllocationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_best_fit_then_fewest_tables(self):
+        tables = [(1, 2), (2, 2), (3, 4), (4, 6), (5, 8)]
+        self.assertEqual(allocate(tables, 2), [(1, 2)])
+        self.assertEqual(allocate(tables, 5), [(4, 6)])
+        self.assertEqual(allocate(tables, 12), [(5, 8), (3, 4)])
+        self.assertEqual(allocate(tables, 15, penalty=0), [(5, 8), (4, 6), (1, 2)])
+        self.assertIsNone(allocate(tables, 23))
+        self.assertIsNone(allocate(tables, 20, max_tables=2))
+        self.assertEqual(split_party([(5, 8), (3, 4)], 10), [(5, 8), (3, 2)])
+
+    def test_party_booking_is_all_or_nothing(self):
+        restaurant = make_restaurant(make_owner())
+        six, four = (
+            Table.objects.create(restaurant=restaurant, size=size, available_times=["19:00"])
+            for size in (6, 4)
+        )
+        guest = CustomUser.objects.create_user(
+            username="guest", email="guest@example.com", password="pw", role="user"
+        )
+        client = APIClient()
+        client.force_authenticate(guest)
+        party = {
+            "restaurant_id": restaurant.id,
+            "date": (timezone.localdate() + timedelta(days=1)).isoformat(),
+            "time": "19:00",
+            "num_people": 9,
+        }
+        url = reverse("book-party")
+
+        for bad in ({"num_people": 0}, {"date": 20260101}, {"time": ["19:00"]}):
+            self.assertEqual(client.post(url, {**party, **bad}, format="json").status_code, 400)
+        self.assertEqual(client.get(url, {**party, "num_people": -1}).status_code, 400)
+
+        preview = client.get(url, party).json()["tables"]
+        self.assertEqual([(t["id"], t["num_people"]) for t in preview], [(six.id, 6), (four.id, 3)])
+
+        # the 4-top goes under a stale cache entry: retried from the database, then refused
+        Booking.objects.bulk_create([Booking(
+            user=guest, restaurant=restaurant, table=four, date=party["date"],
+            time=party["time"], num_people=2,
+        )])
+        response = client.post(url, party, format="json")
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(Booking.objects.count(), 1)
+
+        Booking.objects.all().delete()
+        response = client.post(url, party, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([b["table"] for b in response.json()], [six.id, four.id])
+
+    def test_allocation_follows_book_table_slot_rules(self):
+        restaurant = make_restaurant(make_owner())
+        slotted = Table.objects.create(restaurant=restaurant, size=4, available_times=["19:00"])
+        anytime = Table.objects.create(restaurant=restaurant, size=2, available_times=[])
+        day = timezone.localdate() + timedelta(days=1)
+
+        # 19:20 is within the 19:00 slot's window, 21:00 only for the slotless table
+        self.assertEqual(allocate_for(restaurant.id, day, "19:20", 4), [(slotted.id, 4)])
+        self.assertEqual(allocate_for(restaurant.id, day, "19:20", 2), [(anytime.id, 2)])
+        self.assertIsNone(allocate_for(restaurant.id, day, "21:00", 3))
+        self.assertEqual(allocate_for(restaurant.id, day, "21:00", 2), [(anytime.id, 2)])
+
+        Booking.objects.bulk_create([Booking(
+            user=restaurant.owner, restaurant=restaurant, table=anytime,
+            date=day, time="21:00", num_people=2,
+        )])
+        self.assertIsNone(allocate_for(restaurant.id, day, "21:00", 2, fresh=True))
+        self.assertEqual(allocate_for(restaurant.id, day, "21:30", 2, fresh=True), [(anytime.id, 2)])
+
+
+@override_settings(BACKGROUND_TASKS_EAGER=True, WAITLIST_NOTIFY_BATCH=3)
+class WaitlistTests(TestCase):
+    def setUp(self):
+        self.restaurant = make_restaurant(make_owner())
+        table = Table.objects.create(restaurant=self.restaurant, size=4, available_times=["19:00"])
+        self.guest = CustomUser.objects.create_user(
+            username="guest", email="guest@example.com", password="pw", role="user"
+        )
+        self.day = timezone.localdate() + timedelta(days=1)
+        self.booking = Booking.objects.create(
+            user=self.guest, restaurant=self.restaurant, table=table,
+            date=self.day, time="19:00", num_people=2,
+        )
+        self.client = APIClient()
+
+    def waiter(self, name, earliest, latest, num_people=2):
+        user = CustomUser.objects.create_user(
+            username=name, email=f"{name}@example.com", password="pw", role="user"
+        )
+        self.client.force_authenticate(user)
+        response = self.client.post(reverse("waitlist"), {
+            "restaurant_id": self.restaurant.id, "date": self.day.isoformat(),
+            "earliest": earliest, "latest": latest, "num_people": num_people,
+        }, format="json")
+        self.assertEqual(response.status_code, 201, response.content)
+        return response.json()["id"]
+
+    def cancel(self):
+        self.client.force_authenticate(self.guest)
+        return self.client.post(reverse("cancel-booking", args=[self.booking.id]))
+
+    def test_cancellation_notifies_oldest_matching_waiters(self):
+        first  = self.waiter("first", "18:30", "19:30")
+        self.waiter("early", "17:00", "18:30")          # window ends before 19:00
+        self.waiter("crowd", "19:00", "20:00", num_people=6)
+        second = self.waiter("second", "19:00", "19:00")
+        others = [self.waiter(f"late{i}", "18:00", "20:00") for i in range(3)]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.cancel().status_code, 200)
+
+        notified = set(WaitlistEntry.objects.filter(
+            status=WaitlistEntry.Status.NOTIFIED).values_list("id", flat=True))
+        self.assertEqual(notified, {first, second, others[0]})
+        self.assertEqual(
+            sorted(m.to[0] for m in mail.outbox),
+            ["first@example.com", "late0@example.com", "second@example.com"],
+        )
+
+    def test_cancel_cost_does_not_grow_with_the_waitlist(self):
+        with self.captureOnCommitCallbacks() as callbacks, self.assertNumQueries(2):
+            self.cancel()
+        self.assertEqual(len(callbacks), 3)            # availability, response cache, waitlist
+
+        WaitlistEntry.objects.bulk_create(
+            WaitlistEntry(user=self.guest, restaurant=self.restaurant, date=self.day,
+                          earliest=1080, latest=1200, num_people=2)
+            for _ in range(2000)
+        )
+        self.booking.status = Booking.Status.BOOKED
+        self.booking.save()
+        with self.captureOnCommitCallbacks() as callbacks, self.assertNumQueries(2):
+            self.cancel()
+        with self.assertNumQueries(5):                 # table size, claim, off the request
+            callbacks[-1]()
+        self.assertEqual(WaitlistEntry.objects.filter(status=WaitlistEntry.Status.NOTIFIED).count(), 3)
+
+    def test_past_slots_are_not_offered(self):
+        self.waiter("first", "18:30", "19:30")
+        Booking.objects.filter(pk=self.booking.pk).update(date=self.day - timedelta(days=2))
+        self.booking.refresh_from_db()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.cancel().status_code, 200)
+        self.assertFalse(WaitlistEntry.objects.exclude(status=WaitlistEntry.Status.WAITING).exists())
+        self.assertEqual(mail.outbox, [])
+
+    def test_join_rejects_bad_windows(self):
+        self.client.force_authenticate(self.guest)
+        url  = reverse("waitlist")
+        base = {"restaurant_id": self.restaurant.id, "date": self.day.isoformat(), "num_people": 2}
+        for earliest, latest in (("20:00", "19:00"), ("12:00", "20:00"), (1900, "20:00")):
+            response = self.client.post(url, {**base, "earliest": earliest, "latest": latest}, format="json")
+            self.assertEqual(response.status_code, 400)
+        self.assertFalse(WaitlistEntry.objects.exists())
+
+
+class RestaurantListQueryCountTests(TestCase):
+    """Listing endpoints must not issue per-row queries."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.owner = make_owner()
+        self.admin = CustomUser.objects.create_user(
+            username="admin", email="admin@example.com", password="admin123", role="admin"
+        )
+        self.reviewers = [
+            CustomUser.objects.create_user(
+                username=f"u{i}", email=f"u{i}@example.com", password="user123"
+            )
+            for i in range(2)
+        ]
+        self.cuisine = CuisineType.objects.create(name="Thai")
+        self.food = FoodType.objects.create(name="Vegan")
+
+    def add_restaurants(self, n, reviewed=True):
+        for i in range(n):
+            rest = make_restaurant(self.owner, name=f"Listing {Restaurant.objects.count()}")
+            rest.cuisine_type.add(self.cuisine)
+            rest.food_type.add(self.food)
+            RestaurantPhoto.objects.create(restaurant=rest, photo_key=f"p{rest.id}.jpg")
+            if reviewed:
+                for rating, user in zip((4, 5), self.reviewers):
+                    Review.objects.create(
+                        user=user, restaurant=rest, rating=rating, review_text="ok"
+                    )
+        Restaurant.objects.filter(review_count=0).update(
+            created_at=timezone.now() - timedelta(days=365)
+        )
+
+    def assert_constant_queries(self, url, user=None, reviewed=True):
+        self.client.force_authenticate(user)
+        self.add_restaurants(2, reviewed)
+        with self.assertNumQueries(4):
+            first = self.client.get(url)
+        self.add_restaurants(8, reviewed)
+        with self.assertNumQueries(4):
+            res = self.client.get(url)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(len(res.data), len(first.data) + 8)
+        return res
+
+    def test_restaurant_list(self):
+        res = self.assert_constant_queries(reverse("restaurant-list"))
+        row = res.data[0]
+        self.assertEqual(row["review_count"], 2)
+        self.assertEqual(row["average_rating"], 4.5)
+        self.assertEqual(row["cuisine_type"], [self.cuisine.id])
+        self.assertEqual(len(row["photos"]), 1)
+
+    def test_owner_listings(self):
+        self.assert_constant_queries(reverse("owner-listings"), user=self.owner)
+
+    def test_old_listings(self):
+        res = self.assert_constant_queries(
+            reverse("old-listings"), user=self.admin, reviewed=False
+        )
+        self.assertEqual(res.data[0]["review_count"], 0)
+
+
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        response_cache.clear_memory()
+        self.owner = make_owner()
+        self.restaurant = make_restaurant(self.owner)
+        self.client = APIClient()
+        self.detail = reverse("restaurant-detail", args=[self.restaurant.id])
+
+    def test_repeat_and_conditional_gets_skip_the_database(self):
+        first = self.client.get(self.detail)
+        self.assertEqual(first.status_code, 200)
+
+        with self.assertNumQueries(0):
+            again = self.client.get(self.detail)
+            not_modified = self.client.get(self.detail, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(again.content, first.content)
+        self.assertEqual(again["ETag"], first["ETag"])
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified.content, b"")
+
+        # signed in: never served from (or stored in) the cache
+        self.client.force_authenticate(self.owner)
+        with self.assertNumQueries(5):                  # the full view
+            self.client.get(self.detail)
+
+    def test_writes_retire_dependent_responses(self):
+        tables = reverse("restaurant-tables", args=[self.restaurant.id])
+        listing = self.client.get(reverse("restaurant-list"))
+        detail = self.client.get(self.detail)
+        self.assertEqual(self.client.get(tables).json(), [])
+
+        Table.objects.create(restaurant=self.restaurant, size=4, available_times=["18:00"])
+        self.assertEqual(len(self.client.get(tables).json()), 1)
+        # tables aren't part of the list
+        self.assertEqual(self.client.get(reverse("restaurant-list"))["ETag"], listing["ETag"])
+
+        critic = CustomUser.objects.create_user(
+            username="critic", email="critic@example.com", password="pw", role="user"
+        )
+        Review.objects.create(user=critic, restaurant=self.restaurant, rating=4, review_text="ok")
+        self.assertNotEqual(self.client.get(self.detail)["ETag"], detail["ETag"])
+        self.assertEqual(self.client.get(reverse("restaurant-list")).json()[0]["review_count"], 1)
+        reviews = self.client.get(reverse("get-reviews", args=[self.restaurant.id])).json()
+        self.assertEqual([r["rating"] for r in reviews], [4])
+
+    @override_settings(PHOTO_URL_SIGNING=True, PHOTO_URL_EXPIRY=600)
+    def test_signed_responses_roll_over_with_the_signing_window(self):
+        with mock.patch("restaurants.storage.time.time", return_value=1_000_000):
+            first = self.client.get(self.detail)
+            again = self.client.get(self.detail, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(again.status_code, 304)
+
+        with mock.patch("restaurants.storage.time.time", return_value=1_000_300):
+            later = self.client.get(self.detail, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(later.status_code, 200)
+        self.assertNotEqual(later["ETag"], first["ETag"])
+
+    def test_key_ignores_parameter_order_and_empty_values(self):
+        url = reverse("restaurant-list")
+        a = self.client.get(url + "?price_range=$$&city=San+Jose&min_rating=")
+        with self.assertNumQueries(0):
+            b = self.client.get(url + "?city=San+Jose&price_range=$$")
+        self.assertEqual(a["ETag"], b["ETag"])
+        self.assertNotEqual(self.client.get(url + "?city=Oakland")["ETag"], a["ETag"])
+
+
+class KeysetPaginationTests(TestCase):
+    def test_pages_follow_ranking_score_then_id(self):
+        owner = make_owner()
+        for i, score in enumerate([4.5, 3.0, 4.5, 5.0, 3.0]):
+            make_restaurant(owner, name=f"P{i}", ranking_score=score)
+        expected = list(
+            Restaurant.objects.order_by("-ranking_score", "id").values_list("id", flat=True)
+        )
+
+        seen, url = [], reverse("restaurant-list") + "?page_size=2"
+        while url:
+            res = APIClient().get(url)
+            self.assertEqual(res.status_code, 200)
+            seen += [row["id"] for row in res.data]
+            link = res.headers.get("Link")
+            url = link[1:link.index(">")] if link else None
+
+        self.assertEqual(seen, expected)
+
+    def test_garbage_cursor_is_404(self):
+        restaurant = make_restaurant(make_owner())
+        for url in (reverse("restaurant-list"), reverse("get-reviews", args=[restaurant.id])):
+            for cursor in ("not-a-cursor", "@@@"):
+                res = APIClient().get(url, {"cursor": cursor})
+                self.assertEqual(res.status_code, 404, (url, cursor))
+
+
+class RestaurantTextSearchTests(TestCase):
+    def test_document_tracks_tags_and_edits(self):
+        rest = make_restaurant(make_owner(), name="Golden Spoon", description="Noodles")
+        thai = CuisineType.objects.create(name="Thai")
+        rest.cuisine_type.add(thai)
+
+        def found(term):
+            res = APIClient().get(reverse("restaurant-list"), {"search": term})
+            return [row["id"] for row in res.data]
+
+        self.assertEqual(found("thai"), [rest.id])
+        self.assertEqual(found("noodles"), [rest.id])
+
+        thai.name = "Lao"
+        thai.save()
+        self.assertEqual(found("thai"), [])
+        self.assertEqual(found("lao"), [rest.id])
+
+        rest.cuisine_type.clear()
+        self.assertEqual(found("lao"), [])
+
+    def test_tag_changes_rewrite_documents_in_bulk(self):
+        owner = make_owner()
+        thai, vegan = CuisineType.objects.create(name="Thai"), FoodType.objects.create(name="Vegan")
+        tagged = [make_restaurant(owner, name=f"Thai {i}") for i in range(30)]
+        untagged = make_restaurant(owner, name="Burger Barn")
+        thai.restaurants.add(*tagged)
+        vegan.restaurants.add(tagged[0])
+
+        thai.name = "Lao"
+        with self.assertNumQueries(6):      # save, tagged ids, restaurants, 2 prefetches, one UPDATE
+            thai.save()
+        self.assertEqual(
+            Restaurant.objects.filter(search_document__contains="\nLao").count(), len(tagged)
+        )
+
+        # a reverse clear() rewrites only the restaurants it unlinks
+        with self.assertNumQueries(6):      # pre_clear ids, DELETE, restaurants, 2 prefetches, UPDATE
+            vegan.restaurants.clear()
+        tagged[0].refresh_from_db()
+        self.assertNotIn("Vegan", tagged[0].search_document)
+        untagged_document = Restaurant.objects.get(pk=untagged.pk).search_document
+        with self.assertNumQueries(5):      # nothing changed: no UPDATE
+            thai.save()
+        self.assertEqual(Restaurant.objects.get(pk=untagged.pk).search_document, untagged_document)
+
+    @override_settings(RESTAURANT_SEARCH_BACKEND="restaurants.search.InMemorySearchBackend")
+    def test_in_memory_backend_ranks_and_tracks_changes(self):
+        owner = make_owner()
+        named = make_restaurant(owner, name="Pizza Palace", rating=3.0)
+        described = make_restaurant(owner, name="Corner Cafe", description="pizza on fridays", rating=5.0)
+
+        def found(term):
+            res = APIClient().get(reverse("restaurant-list"), {"search": term})
+            return [row["id"] for row in res.data]
+
+        # name matches outrank description matches; "piz" is a prefix
+        self.assertEqual(found("piz"), [named.id, described.id])
+        self.assertEqual(found("pizza corner"), [described.id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            named.name = "Burger Barn"
+            named.save()
+        self.assertEqual(found("pizza"), [described.id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            described.delete()
+        self.assertEqual(found("pizza"), [])
+
+
+class NearbyRestaurantsTests(TestCase):
+    # downtown San Jose
+    LAT, LNG = 37.3349, -121.8881
+
+    def setUp(self):
+        owner = make_owner()
+        self.thai = CuisineType.objects.create(name="Thai")
+        self.close = make_restaurant(owner, name="Close", latitude=37.3382, longitude=-121.8863)
+        self.mid = make_restaurant(owner, name="Mid", latitude=37.3541, longitude=-121.9552,
+                                   price_range="$")
+        self.far = make_restaurant(owner, name="Far", latitude=37.7749, longitude=-122.4194)
+        make_restaurant(owner, name="Unmapped")
+        self.mid.cuisine_type.add(self.thai)
+
+    def nearby(self, **params):
+        params = {"lat": self.LAT, "lng": self.LNG, **params}
+        return APIClient().get(reverse("restaurant-nearby"), params)
+
+    def test_sorted_by_distance_within_radius(self):
+        res = self.nearby(radius_km=10)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual([row["id"] for row in res.data], [self.close.id, self.mid.id])
+        self.assertAlmostEqual(
+            res.data[1]["distance_km"],
+            geo.haversine_km(self.LAT, self.LNG, self.mid.latitude, self.mid.longitude),
+            places=6,
+        )
+        self.assertEqual(len(self.nearby(radius_km=80).data), 3)
+
+    def test_composes_with_list_filters(self):
+        self.assertEqual([r["id"] for r in self.nearby(radius_km=10, price_range="$").data],
+                         [self.mid.id])
+        self.assertEqual([r["id"] for r in self.nearby(radius_km=10, cuisine="thai").data],
+                         [self.mid.id])
+
+    def test_geohash_follows_coordinates(self):
+        self.close.latitude = 40.7128
+        self.close.save(update_fields=["latitude"])
+        self.close.refresh_from_db()
+        self.assertEqual(self.close.geohash, geo.encode(40.7128, self.close.longitude))
+        self.assertEqual(Restaurant.objects.get(name="Unmapped").geohash, "")
+
+    def test_bad_parameters_are_400(self):
+        self.assertEqual(self.nearby(lat="north").status_code, 400)
+        self.assertEqual(self.nearby(radius_km=5000).status_code, 400)
+
+
+class GoogleStub(BaseHTTPRequestHandler):
+    """Local stand-in for the Google Maps endpoints used by services.py."""
+    hits       = Counter()
+    broken     = False
+    name       = "Stub Diner"
+    delay      = 0                 # seconds per details call
+    flaky      = Counter()         # place_id -> 503s to return before answering
+    active     = 0
+    max_active = 0
+    lock       = threading.Lock()
+
+    @classmethod
+    def reset(cls):
+        cls.hits.clear()
+        cls.flaky.clear()
+        cls.broken, cls.name, cls.delay = False, "Stub Diner", 0
+        cls.active = cls.max_active = 0
+
+    def do_GET(self):
+        url  = urlparse(self.path)
+        path = url.path
+        stub = type(self)
+        with stub.lock:
+            stub.hits[path] += 1
+            stub.active += 1
+            stub.max_active = max(stub.max_active, stub.active)
+        try:
+            self.respond(path, parse_qs(url.query).get("place_id", [""])[0])
+        finally:
+            with stub.lock:
+                stub.active -= 1
+
+    def respond(self, path, place_id):
+        if self.broken or self.flaky[place_id] > 0:
+            self.flaky[place_id] -= 1
+            self.send_response(503 if place_id else 500)
+            self.end_headers()
+            return
+        if path.endswith("geocode/json"):
+            body = {"status": "OK", "results": [{"geometry": {"location": {"lat": 37.3, "lng": -121.9}}}]}
+        elif path.endswith("place/nearbysearch/json"):
+            body = {"status": "OK", "results": [{"name": self.name, "place_id": "p1"}]}
+        elif place_id == "unknown":
+            body = {"status": "NOT_FOUND"}
+        else:
+            time.sleep(self.delay)
+            name = self.name if place_id == "p1" else f"Place {place_id}"
+            body = {"status": "OK", "result": {"name": name, "types": ["restaurant"]}}
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+class GoogleCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), GoogleStub)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.settings_override = override_settings(
+            GOOGLE_MAPS_BASE_URL=f"http://127.0.0.1:{cls.server.server_port}/maps/api",
+            BACKGROUND_TASKS_EAGER=True,
+            GOOGLE_API_BACKOFF=0.01,
+        )
+        cls.settings_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings_override.disable()
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        google_cache.clear_memory()
+        GoogleStub.reset()
+
+    def test_repeated_zip_lookups_stay_local(self):
+        for _ in range(3):
+            self.assertEqual(fetch_google_places("95112")[0]["name"], "Stub Diner")
+        google_cache.clear_memory()             # another process: the table answers
+        with self.assertNumQueries(2):
+            fetch_google_places("95112")
+        self.assertEqual(
+            dict(GoogleStub.hits),
+            {"/maps/api/geocode/json": 1, "/maps/api/place/nearbysearch/json": 1},
+        )
+
+    def test_stale_entry_is_served_then_refreshed(self):
+        fetch_google_place_details("p1")
+        GoogleCacheEntry.objects.update(fresh_until=timezone.now() - timedelta(seconds=1))
+        google_cache.clear_memory()
+        GoogleStub.name = "Renamed Diner"
+
+        self.assertEqual(fetch_google_place_details("p1")["name"], "Stub Diner")
+        self.assertEqual(fetch_google_place_details("p1")["name"], "Renamed Diner")
+        self.assertEqual(GoogleStub.hits["/maps/api/place/details/json"], 2)
+
+    def test_expired_entry_survives_an_outage(self):
+        fetch_google_place_details("p1")
+        past = timezone.now() - timedelta(seconds=1)
+        GoogleCacheEntry.objects.update(fresh_until=past, expires_at=past)
+        google_cache.clear_memory()
+        GoogleStub.broken = True
+
+        self.assertEqual(fetch_google_place_details("p1")["name"], "Stub Diner")
+        self.assertEqual(fetch_google_place_details("unknown"), {})
+        self.assertEqual(google_cache.purge_expired(), 1)
+
+    @override_settings(GOOGLE_MAPS_BASE_URL="http://127.0.0.1:9/maps/api", GOOGLE_API_RETRIES=0)
+    @mock.patch("restaurants.services.GOOGLE_API_KEY", "not-for-logs")
+    def test_network_errors_do_not_leak_the_api_key(self):
+        with self.assertRaises(GoogleAPIError) as raised:
+            google_get("geocode/json", address="95112")
+        self.assertNotIn("not-for-logs", str(raised.exception))
+        self.assertIn("/maps/api/geocode/json", str(raised.exception))
+
+    @override_settings(GOOGLE_API_CONCURRENCY=8, GOOGLE_API_MAX_PER_HOST=4)
+    def test_batch_details_fan_out(self):
+        GoogleStub.delay = 0.2
+        GoogleStub.flaky["p3"] = 1
+        fetch_google_place_details("p1")                # already cached
+        ids = ["p1", "p2", "p3", "p4", "p5", "p2", "unknown"]
+
+        started = time.monotonic()
+        details = fetch_google_place_details_batch(ids)
+        elapsed = time.monotonic() - started
+
+        self.assertEqual(set(details), {"p1", "p2", "p3", "p4", "p5"})
+        self.assertEqual(details["p3"]["name"], "Place p3")
+        # p2-p5 + unknown + one retry; p1 from the cache, duplicate p2 coalesced,
+        # NOT_FOUND cached as an empty result
+        self.assertEqual(GoogleStub.hits["/maps/api/place/details/json"], 1 + 6)
+        self.assertLessEqual(GoogleStub.max_active, 4)
+        self.assertLess(elapsed, 0.2 * 4)                # not serial
+
+        with self.assertNumQueries(0):                  # warm: in-process layer
+            self.assertEqual(len(fetch_google_place_details_batch(ids)), 5)
+
+
+class TagInferenceTests(TestCase):
+    def setUp(self):
+        invalidate_tag_table()
+
+    def test_batch_costs_no_queries_once_warm(self):
+        thai = CuisineType.objects.create(name="Thai")
+        places = [
+            {"name": f"Thai Vegan Kitchen {i}", "vicinity": "1 Main St", "types": ["restaurant"]}
+            for i in range(20)
+        ] + [{"name": "Burger Shack", "types": ["meal_takeaway", "vegetarian_food"]}]
+
+        for place in places:                           # warm up, creates the food types
+            normalize_google_place_result(place)
+        with self.assertNumQueries(0):
+            results = [normalize_google_place_result(p) for p in places]
+
+        vegan = FoodType.objects.get(name="Vegan")
+        self.assertEqual(results[0]["cuisine_type"], [thai.id])
+        self.assertEqual(results[0]["food_type"], [vegan.id])
+        self.assertEqual(results[-1]["cuisine_type"], [])
+        self.assertEqual(
+            results[-1]["food_type"], [FoodType.objects.get(name="Vegetarian").id]
+        )
+
+    def test_table_is_rebuilt_after_tag_changes(self):
+        CuisineType.objects.create(name="Thai")
+        infer_tags("thai")
+        CuisineType.objects.all().delete()
+        replacement = CuisineType.objects.create(name="Thai")
+        self.assertEqual(infer_tags("Thai noodles"), ([replacement.id], []))
+
+
+@override_settings(BACKGROUND_TASKS_EAGER=True)
+class PhotoIngestionTests(TestCase):
+    def setUp(self):
+        self.spool = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.spool, ignore_errors=True)
+        override = override_settings(PHOTO_SPOOL_DIR=self.spool)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.owner = make_owner()
+        self.restaurant = make_restaurant(self.owner)
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def jpeg(self, name):
+        buffer = BytesIO()
+        Image.new("RGB", (640, 480), (ord(name[0]) * 37 % 256, 128, 0)).save(buffer, format="JPEG")
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/jpeg")
+
+    def upload(self, *names):
+        return self.client.post(
+            reverse("upload-photo", args=[self.restaurant.id]),
+            {"photos": [self.jpeg(n) for n in names]},
+            format="multipart",
+        )
+
+    @mock.patch("restaurants.photos.upload_to_s3", side_effect=lambda f, key, **kw: key)
+    def test_upload_returns_pending_photos_and_defers_work(self, upload):
+        with self.captureOnCommitCallbacks() as callbacks:
+            res = self.upload("a.jpg", "b.jpg")
+
+        self.assertEqual(res.status_code, 201)
+        self.assertEqual([p["status"] for p in res.data], ["PENDING", "PENDING"])
+        self.assertIsNone(res.data[0]["high_res_url"])
+        upload.assert_not_called()
+        self.assertEqual(len(os.listdir(self.spool)), 2)
+
+        for callback in callbacks:
+            callback()
+
+        # original + 150 and 480 px renditions in WebP and JPEG, per photo
+        self.assertEqual(upload.call_count, 2 * 5)
+        self.assertEqual(
+            set(RestaurantPhoto.objects.values_list("status", flat=True)), {"READY"}
+        )
+        self.assertEqual(os.listdir(self.spool), [])
+
+        photo = self.client.get(reverse("restaurant-detail", args=[self.restaurant.id])).data["photos"][0]
+        self.assertTrue(photo["thumbnail_url"].endswith("/150.jpg"))
+        self.assertEqual(set(photo["srcset"]), {"image/webp", "image/jpeg"})
+        self.assertRegex(photo["srcset"]["image/webp"], r"/150\.webp 150w, \S+/480\.webp 480w$")
+
+    def test_renditions_downscale_and_strip_exif(self):
+        exif = Image.Exif()
+        exif[0x0112] = 6                                # rotate 90° on display
+        exif[0x010F] = "Camera Co"
+        buffer = BytesIO()
+        Image.new("RGB", (3000, 2000), "orange").save(buffer, format="JPEG", exif=exif)
+        buffer.seek(0)
+
+        out = renditions.render(buffer, sizes=(150, 1024, 2048, 4096), formats=("jpeg", "webp"))
+
+        self.assertEqual(
+            [(r["size"], r["format"]) for r in out],
+            [(150, "jpeg"), (150, "webp"), (1024, "jpeg"), (1024, "webp"),
+             (2048, "jpeg"), (2048, "webp")],
+        )
+        largest = Image.open(out[-2]["data"])
+        self.assertEqual(largest.size, (1365, 2048))    # portrait after EXIF rotation
+        self.assertNotIn("exif", largest.info)
+        self.assertTrue(largest.info.get("progressive"))
+
+    @mock.patch("restaurants.photos.upload_to_s3", side_effect=Exception("S3 down"))
+    def test_failure_keeps_original_for_retry(self, upload):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.upload("a.jpg")
+        photo = RestaurantPhoto.objects.get()
+        self.assertEqual(photo.status, RestaurantPhoto.Status.FAILED)
+        self.assertTrue(os.path.exists(photo.spool_path))
+
+        upload.side_effect = lambda f, key, **kw: key
+        call_command("process_photos", "--failed", stdout=StringIO())
+        photo.refresh_from_db()
+        self.assertEqual(photo.status, RestaurantPhoto.Status.READY)
+        self.assertEqual(os.listdir(self.spool), [])
+
+    @mock.patch("restaurants.photos.upload_to_s3", side_effect=lambda f, key, **kw: key)
+    def test_photo_is_processed_by_one_claimant(self, upload):
+        self.upload("a.jpg")                                # on_commit not run: stays PENDING
+        photo = RestaurantPhoto.objects.get()
+        self.assertIsNotNone(photos.claim(photo.pk))
+        self.assertIsNone(photos.claim(photo.pk))
+
+        photos.process_photo(photo.pk)                      # e.g. the pool worker, too late
+        call_command("process_photos", "--failed", stdout=StringIO())
+        upload.assert_not_called()
+        photo.refresh_from_db()
+        self.assertEqual(photo.status, RestaurantPhoto.Status.PROCESSING)
+
+        # the claimant died: a stale claim is taken over
+        call_command("process_photos", "--stale", "0", stdout=StringIO())
+        photo.refresh_from_db()
+        self.assertEqual(photo.status, RestaurantPhoto.Status.READY)
+        self.assertEqual(os.listdir(self.spool), [])
+
+    @mock.patch("restaurants.photos.delete_s3_objects", return_value=True)
+    @mock.patch("restaurants.photos.upload_to_s3", side_effect=lambda f, key, **kw: key)
+    def test_identical_uploads_share_stored_objects(self, upload, delete):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.upload("a.jpg", "a.jpg")                   # same bytes twice in one request
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.upload("a.jpg")
+
+        self.assertEqual(res.data[0]["status"], "READY")    # nothing to process
+        self.assertEqual(upload.call_count, 5)              # one original + its renditions
+        self.assertEqual(os.listdir(self.spool), [])
+        first, second, third = RestaurantPhoto.objects.order_by("pk")
+        self.assertEqual({first.photo_key, second.photo_key, third.photo_key}, {first.photo_key})
+        self.assertEqual(third.renditions, first.renditions)
+        self.assertRegex(first.perceptual_hash, r"^[0-9a-f]{16}$")
+
+        counts = dict(StoredPhotoObject.objects.values_list("key", "references"))
+        self.assertEqual(counts, dict.fromkeys(first.storage_keys, 3))
+
+        for photo in (first, second):
+            with self.captureOnCommitCallbacks(execute=True):
+                res = self.client.delete(reverse("delete-photo", args=[photo.id]))
+            self.assertEqual(res.status_code, 200)
+        delete.assert_not_called()                          # still referenced by the third
+        with self.captureOnCommitCallbacks(execute=True), self.assertNumQueries(10):
+            # view: photo, restaurant, owner; release: lock, 3 on the counts,
+            # the row delete (+ savepoint, release) – no scan of other photos
+            self.client.delete(reverse("delete-photo", args=[third.id]))
+        delete.assert_called_once_with(third.storage_keys)
+        self.assertFalse(RestaurantPhoto.objects.exists())
+        self.assertFalse(StoredPhotoObject.objects.exists())
+
+    @mock.patch("restaurants.photos.delete_s3_objects", return_value=True)
+    def test_release_keeps_renditions_shared_with_other_originals(self, delete):
+        # same picture, different EXIF: own originals, identical renditions
+        shared = [{"key": f"ab/cd/{'e' * 64}.webp", "format": "webp", "size": 480}]
+        kept, released = (
+            RestaurantPhoto.objects.create(
+                restaurant=self.restaurant, photo_key=f"{c * 2}/{c * 2}/{c * 64}.jpg",
+                thumbnail_s3_key=shared[0]["key"], renditions=shared,
+            )
+            for c in "12"
+        )
+        for photo in (kept, released):
+            photos._retain(photo.storage_keys)
+        with self.captureOnCommitCallbacks(execute=True):
+            photos.release(released)
+        delete.assert_called_once_with([released.photo_key])
+
+        delete.reset_mock()
+        with self.captureOnCommitCallbacks() as callbacks:
+            photos.release(kept)
+        delete.assert_not_called()                          # not before the delete commits
+        for callback in callbacks:
+            callback()
+        delete.assert_called_once_with(kept.storage_keys)
+
+    def test_perceptual_hash_survives_reencoding(self):
+        image = Image.new("RGB", (640, 480), "white")
+        image.paste((20, 60, 200), (0, 0, 320, 480))
+        image.paste((220, 40, 0), (400, 120, 640, 360))
+        png, jpeg = BytesIO(), BytesIO()
+        image.save(png, format="PNG")
+        image.resize((320, 240)).save(jpeg, format="JPEG", quality=60)
+        png.seek(0), jpeg.seek(0)
+
+        a = int(photos.perceptual_hash(png), 16)
+        b = int(photos.perceptual_hash(jpeg), 16)
+        self.assertLessEqual(bin(a ^ b).count("1"), 4)
+
+
+@skipUnless(mock_aws, "moto is not installed")
+@override_settings(
+    AWS_ACCESS_KEY_ID="testing", AWS_SECRET_ACCESS_KEY="testing",
+    AWS_REGION="us-east-1", AWS_S3_BUCKET_NAME="photos-test",
+    AWS_S3_MULTIPART_THRESHOLD=5 * 1024 * 1024, AWS_S3_MULTIPART_CHUNKSIZE=5 * 1024 * 1024,
+)
+class S3StorageTests(TestCase):
+    def setUp(self):
+        aws = mock_aws()
+        aws.start()
+        self.addCleanup(aws.stop)
+        self.storage = get_storage()
+        self.s3 = self.storage.client
+        self.s3.create_bucket(Bucket="photos-test")
+
+    def test_client_is_shared(self):
+        self.assertIs(get_storage(), self.storage)
+
+    def test_large_spooled_file_goes_up_in_parts(self):
+        with tempfile.NamedTemporaryFile(suffix=".jpg") as spooled:
+            spooled.write(os.urandom(11 * 1024 * 1024))
+            spooled.flush()
+            upload_to_s3(spooled.name, "restaurant_photos/big.jpg", content_type="image/jpeg")
+
+        head = self.s3.head_object(Bucket="photos-test", Key="restaurant_photos/big.jpg")
+        self.assertTrue(head["ETag"].strip('"').endswith("-3"))    # 3 multipart parts
+        self.assertEqual(head["ContentType"], "image/jpeg")
+        self.assertEqual(head["CacheControl"], "public, max-age=31536000, immutable")
+
+    def test_deletes_are_batched(self):
+        keys = [f"renditions/x/{n}.webp" for n in range(5)]
+        for key in keys:
+            upload_to_s3(BytesIO(b"x"), key, content_type="image/webp")
+
+        with mock.patch.object(self.s3, "delete_objects", wraps=self.s3.delete_objects) as delete:
+            self.assertTrue(delete_s3_objects(keys + keys[:2]))
+        self.assertEqual(delete.call_count, 1)
+        self.assertNotIn("Contents", self.s3.list_objects_v2(Bucket="photos-test"))
+
+    @override_settings(AWS_REGION="eu-west-1", PHOTO_URL_SIGNING=True, PHOTO_URL_EXPIRY=3600)
+    def test_signed_urls_match_botocore_and_are_stable(self):
+        storage = get_storage()
+        key = "restaurant_photos/a b.jpg"
+        now = 1_700_000_000 - 1_700_000_000 % 1800
+        with mock.patch("restaurants.storage.time.time", return_value=now):
+            ours = storage.url(key)
+        with mock.patch("restaurants.storage.time.time", return_value=now + 1799):
+            self.assertEqual(storage.url(key), ours)        # same URL for the whole window
+        with mock.patch("botocore.auth.datetime") as clock:
+            clock.datetime.utcnow.return_value = datetime.fromtimestamp(now, dt_timezone.utc).replace(tzinfo=None)
+            botocore_url = storage.client.generate_presigned_url(
+                "get_object", Params={"Bucket": "photos-test", "Key": key}, ExpiresIn=3600,
+            )
+        self.assertEqual(ours, botocore_url)
+
+        upload_to_s3(BytesIO(b"x"), key, content_type="image/jpeg")
+        head = self.s3.head_object(Bucket="photos-test", Key=key)
+        self.assertEqual(head["CacheControl"], "private, max-age=3600")
+
+
+class LocalStorageTests(TestCase):
+    def setUp(self):
+        self.root  = tempfile.mkdtemp()
+        self.spool = tempfile.mkdtemp()
+        for path in (self.root, self.spool):
+            self.addCleanup(shutil.rmtree, path, ignore_errors=True)
+        override = override_settings(
+            PHOTO_STORAGE_BACKEND="restaurants.storage.LocalStorage",
+            LOCAL_STORAGE_ROOT=self.root, PHOTO_SPOOL_DIR=self.spool,
+            BACKGROUND_TASKS_EAGER=True,
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+        self.storage = get_storage()
+
+    def test_identical_content_is_stored_once(self):
+        first  = upload_to_s3(BytesIO(b"same bytes"), "restaurant_photos/a.jpg")
+        second = upload_to_s3(BytesIO(b"same bytes"), "restaurant_photos/b.jpg")
+        self.assertEqual(first, second)
+        self.assertRegex(first, r"^[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.jpg$")
+        self.assertEqual(os.listdir(self.storage.tmp), [])
+
+        self.assertTrue(delete_s3_objects([first]))
+        self.assertFalse(os.path.exists(self.storage.path(first)))
+
+    def test_pipeline_end_to_end_and_served_locally(self):
+        owner  = make_owner()
+        client = APIClient()
+        client.force_authenticate(owner)
+        buffer = BytesIO()
+        Image.new("RGB", (640, 480), "orange").save(buffer, format="JPEG")
+        original = buffer.getvalue()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            res = client.post(
+                reverse("upload-photo", args=[make_restaurant(owner).id]),
+                {"photos": [SimpleUploadedFile("a.jpg", original, content_type="image/jpeg")]},
+                format="multipart",
+            )
+        self.assertEqual(res.status_code, 201)
+
+        photo = RestaurantPhoto.objects.get()
+        self.assertEqual(photo.status, RestaurantPhoto.Status.READY)
+        url = client.get(reverse("photo-detail", args=[photo.id])).data["photo_url"]
+        self.assertEqual(url, reverse("local-media", args=[photo.photo_key]))
+
+        served = client.get(url)
+        self.assertEqual(served.status_code, 200)
+        self.assertEqual(served["Content-Type"], "image/jpeg")
+        self.assertEqual(b"".join(served.streaming_content), original)
+
+        thumbnail = client.get(self.storage.url(photo.thumbnail_s3_key))
+        self.assertEqual(Image.open(BytesIO(b"".join(thumbnail.streaming_content))).width, 150)
+
+    def test_media_view_rejects_bad_keys_and_can_delegate(self):
+        key = upload_to_s3(BytesIO(b"x"), "restaurant_photos/a.webp")
+        self.assertEqual(self.client.get("/api/restaurants/media/ab/cd/not-a-key.jpg").status_code, 404)
+        self.assertEqual(self.client.get(self.storage.url(key[:-1] + "0")).status_code, 404)
+
+        with override_settings(LOCAL_STORAGE_SENDFILE_HEADER="X-Accel-Redirect"):
+            res = self.client.get(get_storage().url(key))
+        self.assertEqual(res["X-Accel-Redirect"], f"/protected-media/{key}")
+        self.assertEqual(res.content, b"")
+        self.assertEqual(res["Cache-Control"], "public, max-age=31536000, immutable")
+
+    @override_settings(PHOTO_URL_SIGNING=True, PHOTO_URL_EXPIRY=600)
+    def test_signed_local_urls(self):
+        key = upload_to_s3(BytesIO(b"x"), "restaurant_photos/a.webp")
+        url = get_storage().url(key)
+        res = self.client.get(url)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res["Cache-Control"], "private, max-age=600")   # never outlives the URL
+        tampered = url[:-1] + ("1" if url.endswith("0") else "0")
+        self.assertEqual(self.client.get(tampered).status_code, 403)
+        self.assertEqual(self.client.get(self.storage.url(key).split("?")[0]).status_code, 403)
+
+        expired = int(time.time()) - 1
+        res = self.client.get(
+            f"{url.split('?')[0]}?expires={expired}&signature={get_storage()._signature(key, expired)}"
+        )
+        self.assertEqual(res.status_code, 403)
+
+    def test_photo_list_urls_are_built_in_one_batch(self):
+        restaurant = make_restaurant(make_owner())
+        RestaurantPhoto.objects.bulk_create(
+            RestaurantPhoto(
+                restaurant=restaurant, photo_key=f"restaurant_photos/{n}.jpg",
+                thumbnail_s3_key=f"renditions/{n}/150.jpg",
+                renditions=[{"size": 150, "width": 150, "height": 100, "format": "jpeg",
+                             "key": f"renditions/{n}/150.jpg"}],
+            )
+            for n in range(50)
+        )
+        with mock.patch.object(self.storage, "urls", wraps=self.storage.urls) as urls, \
+                mock.patch.object(self.storage, "url") as url:
+            data = RestaurantPhotoSerializer(restaurant.photos.all(), many=True).data
+        self.assertEqual(urls.call_count, 1)
+        url.assert_not_called()
+        self.assertEqual(data[7]["srcset"], {"image/jpeg": "/api/restaurants/media/renditions/7/150.jpg 150w"})
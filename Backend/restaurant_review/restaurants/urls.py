@@ -8,6 +8,7 @@ from .views import (
     # Search & list
     RestaurantSearchView,
     RestaurantListView,
+    NearbyRestaurantsView,
     RestaurantDetailView,
     RestaurantTableListView,
     DuplicateListingsView,
@@ -19,14 +20,18 @@ from .views import (
     UploadPhotoView,
     DeletePhotoView,
     PhotoDetailView,
+    local_media,
     OldListingsView,
     OwnerRestaurantListingsView,
 
     # Google & booking
     GooglePlaceDetailView,
     BookTableAPIView,
+    PartyBookingAPIView,
     CancelBookingAPIView,
-    MyBookingsAPIView
+    MyBookingsAPIView,
+    WaitlistAPIView,
+    LeaveWaitlistAPIView,
 )
 
 
@@ -44,6 +49,7 @@ urlpatterns = [
     # ───────────────────────────────────
     path("search/", RestaurantSearchView.as_view(), name="restaurant-search"),
     path("",        RestaurantListView.as_view(),  name="restaurant-list"),
+    path("nearby/", NearbyRestaurantsView.as_view(), name="restaurant-nearby"),
     path("<int:id>/", RestaurantDetailView.as_view(), name="restaurant-detail"),
 
     # ───────────────────────────────────
@@ -69,6 +75,7 @@ urlpatterns = [
     path("<int:restaurant_id>/photos/upload/", UploadPhotoView.as_view(),        name="upload-photo"),
     path("photos/<int:photo_id>/",          PhotoDetailView.as_view(),           name="photo-detail"),
     path("photos/<int:photo_id>/delete/",   DeletePhotoView.as_view(),           name="delete-photo"),
+    path("media/<path:key>",                local_media,                         name="local-media"),
 
     # ───────────────────────────────────
     #  Google Places passthrough
@@ -79,8 +86,11 @@ urlpatterns = [
     #  Booking
     # ───────────────────────────────────
     path("bookings/", BookTableAPIView.as_view(), name="book-table"),
+    path("bookings/party/", PartyBookingAPIView.as_view(), name="book-party"),
     path("bookings/my/", MyBookingsAPIView.as_view(), name="my-bookings"),
-    path("bookings/cancel/<int:booking_id>/", CancelBookingAPIView.as_view()),
+    path("bookings/cancel/<int:booking_id>/", CancelBookingAPIView.as_view(), name="cancel-booking"),
+    path("bookings/waitlist/", WaitlistAPIView.as_view(), name="waitlist"),
+    path("bookings/waitlist/<int:entry_id>/", LeaveWaitlistAPIView.as_view(), name="leave-waitlist"),
     # path('restaurants/tables/<int:table_id>/edit/', update_table),
     path("<int:restaurant_id>/tables/", RestaurantTableListView.as_view(), name="restaurant-tables"),
     
@@ -1,25 +1,25 @@
-import boto3
-from botocore.exceptions import NoCredentialsError, PartialCredentialsError, ClientError
-from django.conf import settings
+from botocore.exceptions import NoCredentialsError, PartialCredentialsError
 import uuid
-from PIL import Image
-from io import BytesIO
 import logging
 
-logger = logging.getLogger(__name__)
+from .storage import StorageError, get_storage
 
-from io import BufferedReader
+logger = logging.getLogger(__name__)
 
-class NonCloseableBufferedReader(BufferedReader):
-    def close(self):
-        self.flush()
 
-def upload_to_s3(file, key=None):
+def upload_to_s3(file, key=None, content_type=None):
     """
-    Upload a file to S3 and return the object key.
+    Upload a file to the photo storage backend (S3 unless
+    PHOTO_STORAGE_BACKEND says otherwise) and return the object key,
+    which the backend may have changed – store the returned key.
+
+    Files spooled to disk (TemporaryUploadedFile, or a plain path) are
+    streamed from disk, multipart above AWS_S3_MULTIPART_THRESHOLD.
 
     Args:
-        file (InMemoryUploadedFile): The file object from the request.
+        file (UploadedFile | file object | str): The file, or a path on disk.
+        key (str): Optional object key; a random one is generated otherwise.
+        content_type (str): Overrides ``file.content_type``.
 
     Returns:
         str: The S3 object key of the uploaded file.
@@ -27,48 +27,49 @@ def upload_to_s3(file, key=None):
     Raises:
         Exception: If upload fails for any reason.
     """
+    if key is None:
+        file_extension = str(getattr(file, "name", file)).split('.')[-1]
+        key = f"restaurant_photos/{uuid.uuid4()}.{file_extension}"  # Unique file key
+    content_type = content_type or getattr(file, "content_type", None)
+
     try:
-        s3_client = boto3.client(
-            's3',
-            aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-            # endpoint_url='http://localhost:9004',
-            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-            region_name=settings.AWS_REGION,
-            # aws_session_token=None,
-            # config=boto3.session.Config(signature_version='s3v4'),
-            # verify=False
-        )
-
-        bucket_name = settings.AWS_S3_BUCKET_NAME
-        file_extension = file.name.split('.')[-1]
-        object_key = f"restaurant_photos/{uuid.uuid4()}.{file_extension}"  if not key else key  # Unique file key
-
-        buffer = NonCloseableBufferedReader(file)
-        # Upload file
-        s3_client.upload_fileobj(
-            buffer,
-            bucket_name,
-            object_key,
-            ExtraArgs={
-                'ContentType': file.content_type,
-                'ACL': 'public-read'  # Optional: Make file publicly readable
-            }
-        )
-
-        return object_key
+        storage = get_storage()
+        if isinstance(file, str):
+            return storage.upload_path(file, key, content_type)
+        temp_path = getattr(file, "temporary_file_path", None)
+        if temp_path is not None:
+            file.file.flush()
+            return storage.upload_path(temp_path(), key, content_type)
+        file.seek(0)
+        return storage.upload_fileobj(file, key, content_type)
 
     except (NoCredentialsError, PartialCredentialsError) as e:
         raise Exception("AWS credentials are not configured properly.") from e
 
-    except Exception as e:
-        print("Exception" + str(e))
+    except StorageError as e:
+        logger.exception("S3 upload of %s failed", key)
         raise Exception("Failed to upload file to S3.") from e
-    
+
+
+def delete_s3_objects(s3_keys):
+    """
+    Deletes objects from photo storage (S3: up to 1 000 per request).
+
+    Args:
+        s3_keys (iterable[str]): The keys of the objects to delete.
+
+    Returns:
+        bool: True if every deletion was successful, False otherwise.
+    """
+    failed = get_storage().delete_many(s3_keys)
+    if failed:
+        logger.warning("could not delete %d S3 objects: %s", len(failed), failed[:10])
+    return not failed
 
 
 def delete_s3_object(s3_key):
     """
-    Deletes an object from the S3 bucket.
+    Deletes an object from photo storage.
 
     Args:
         s3_key (str): The key of the object to delete in the S3 bucket.
@@ -76,35 +77,4 @@ def delete_s3_object(s3_key):
     Returns:
         bool: True if the deletion was successful, False otherwise.
     """
-    try:
-        s3_client = boto3.client(
-            's3',
-            aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-            # endpoint_url='http://localhost:9004',
-            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-            region_name=settings.AWS_REGION,
-            # aws_session_token=None,
-            # config=boto3.session.Config(signature_version='s3v4'),
-            # verify=False
-        )
-        s3_client.delete_object(Bucket=settings.AWS_S3_BUCKET_NAME, Key=s3_key)
-        return True
-    except ClientError as e:
-        # Log the error for debugging
-        print(f"Error deleting object {s3_key}: {e}")
-        return False
-
-def generate_thumbnail(photo_file):
-        print("generating thumbnail")
-        image = Image.open(photo_file)
-        if image.mode != 'RGB':
-            image = image.convert('RGB')
-        image.thumbnail((150, 150))  # Resize the image to a thumbnail
-
-        buffer = BytesIO()
-        image.save(buffer, format='JPEG')
-        buffer.seek(0)
-        buffer.name = "thumbnail.jpg"
-        buffer.content_type = 'image/jpeg'
-
-        return buffer
\ No newline at end of file
+    return delete_s3_objects([s3_key])
@@ -3,6 +3,8 @@
 #  Imports
 # ---------------------------------------------------------------------
 import logging
+import mimetypes
+import os
 
 logger = logging.getLogger(__name__)
 from django.conf import settings
@@ -10,10 +12,9 @@ from django.utils.timezone import localdate
 from datetime import datetime, timedelta, date as dt_date, time as dt_time
 from collections import defaultdict
 from django.conf import settings
-from django.core.mail import send_mail
-from django.db import transaction
-from django.db.models import Q, Count, Avg
+from django.db.models import Avg, Exists, OuterRef
 from django.db.models.functions import Lower, Trim
+from django.http import FileResponse, Http404, HttpResponse
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 
@@ -34,20 +35,38 @@ from .models import (
     FoodType,
     Table,
     Booking,
+    WaitlistEntry,
 )
 from .serializers import (
     RestaurantSerializer,
+    NearbyRestaurantSerializer,
     RestaurantDetailSerializer,
     RestaurantListingSerializer,
+    RestaurantPhotoSerializer,
     BookingSerializer,
     TableSerializer, 
+    WaitlistEntrySerializer,
 )
 from .services import (
     fetch_google_places,
     normalize_google_place_result,
     fetch_google_place_details,
 )
-from .utils import upload_to_s3, delete_s3_object, generate_thumbnail
+from .storage import LocalStorage, StorageError, cache_control, get_storage, signing_enabled
+from .photos import ingest_all as ingest_photos, release as release_photo
+from .allocation import allocate_for, split_party
+from .bookings import BookingConflict, BookingRejected, book_party, book_table
+from .waitlist import join as join_waitlist
+from . import geo
+from .response_cache import LIST_SCOPE, cached_response, restaurant_scope
+from .availability import search_availability
+from .search import search_restaurants
+from .pagination import (
+    KeysetPagination,
+    RestaurantPagination,
+    BookingPagination,
+    paginated_response,
+)
 
 # ---------------------------------------------------------------------
 #  Search & list views
@@ -59,6 +78,7 @@ class RestaurantTableListView(APIView):
     GET /api/<restaurant_id>/tables/
     → [{id, size, available_times}, …]
     """
+    @cached_response(lambda restaurant_id: [restaurant_scope(restaurant_id)])
     def get(self, request, restaurant_id):
         try:
             restaurant = Restaurant.objects.get(pk=restaurant_id)
@@ -83,117 +103,114 @@ class RestaurantSearchView(APIView):
             )
 
         requested = datetime.strptime(f"{date_str} {time_str}", "%Y-%m-%d %H:%M")
-        low  = (requested - timedelta(minutes=30)).time()
-        high = (requested + timedelta(minutes=30)).time()
 
         # ───────────── 2. optional location filters ─────────────
         city_state = request.query_params.get("city_state", "").strip()
         zip_code   = request.query_params.get("zip_code", "").strip()
 
-        qs = Restaurant.objects.all()
-        if city_state:
-            qs = qs.filter(Q(city__icontains=city_state) | Q(state__icontains=city_state))
-        if zip_code:
-            qs = qs.filter(zip_code=zip_code)
-
         # ───────────── 3. build availability results ─────────────
-        grouped = defaultdict(lambda: {
-            "restaurant_id": None,
-            "name":          "",
-            "address":       "",
-            "rating":        0,
-            "tables":        [],
-            "bookings_today": 0,
-        })
-
-        for rest in qs:
-            for table in Table.objects.filter(restaurant=rest, size__gte=num_people):
-                # keep only start‑times inside the ±30 min window
-                booked_times = set(
-                    Booking.objects.filter(
-                        table=table,
-                        date=requested.date(),
-                        status=Booking.Status.BOOKED,
-                    ).values_list("time", flat=True)
-                )
-
-                # keep only times that are:
-                # (1) within the ±30min window
-                # (2) not already booked
-                slots = [
-                    t for t in table.available_times
-                    if (
-                        low <= datetime.strptime(t, "%H:%M").time() <= high
-                        and datetime.strptime(t, "%H:%M").time() not in booked_times
-                    )
-                ]
-                if not slots:
-                    continue
-
-                entry = grouped[rest.id]
-                # fill the restaurant‑level fields once
-                if entry["restaurant_id"] is None:
-                    entry.update(
-                        restaurant_id = rest.id,
-                        name          = rest.name,
-                        address       = rest.address,
-                        rating        = rest.rating,
-                    )
-                bookings_today = Booking.objects.filter(
-                    restaurant=rest,
-                    date=localdate()
-                ).count()
-                entry["bookings_today"] = bookings_today
-                # append this table’s data
-                entry["tables"].append({
-                    "id":    table.id,
-                    "size":  table.size,
-                    "times": sorted(slots),
-                })
-
-        # convert dict → list and send
-        payload = list(grouped.values())
+        payload = search_availability(
+            requested, num_people, city_state=city_state, zip_code=zip_code
+        )
         return Response(payload, status=status.HTTP_200_OK)
 
 
 
 class RestaurantListView(ListAPIView):
     serializer_class = RestaurantSerializer
+    pagination_class = RestaurantPagination   # (-ranking_score, id) keyset
+
+    @property
+    def paginator(self):
+        # full-text results are ranked by relevance + rating instead
+        if not hasattr(self, "_paginator"):
+            if self.request.query_params.get("search"):
+                self._paginator = RestaurantPagination(ordering=("-search_score", "id"))
+            else:
+                self._paginator = RestaurantPagination()
+        return self._paginator
+
+    @cached_response(lambda: [LIST_SCOPE])
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
 
     def get_queryset(self):
-        qs          = Restaurant.objects.all()
-        search      = self.request.query_params.get("search")
-        cuisine     = self.request.query_params.get("cuisine")
-        food_type   = self.request.query_params.get("food_type")
-        price_range = self.request.query_params.get("price_range")
-        min_rating  = self.request.query_params.get("min_rating", "")
-        max_rating  = self.request.query_params.get("max_rating", "")
-
-        if search:
-            qs = qs.filter(
-                Q(name__icontains=search)
-                | Q(cuisine_type__name__icontains=search)
-                | Q(food_type__name__icontains=search)
-            ).distinct()
+        qs = Restaurant.objects.with_listing_relations()
+        return filter_restaurants(qs, self.request.query_params)
 
-        if cuisine:
-            qs = qs.filter(cuisine_type__name__icontains=cuisine)
 
-        if food_type:
-            qs = qs.filter(food_type__name__icontains=food_type)
+class NearbyRestaurantsView(ListAPIView):
+    """
+    /api/restaurants/nearby/?lat=&lng=&radius_km=
+    Closest first; accepts the same filters as RestaurantListView.
+    """
+    serializer_class = NearbyRestaurantSerializer
 
-        if price_range:
-            qs = qs.filter(price_range=price_range)
+    @property
+    def paginator(self):
+        if not hasattr(self, "_paginator"):
+            self._paginator = KeysetPagination(ordering=("distance_km", "id"))
+        return self._paginator
 
-        if min_rating and max_rating:
-            try:
-                qs = qs.filter(
-                    rating__gte=float(min_rating), rating__lte=float(max_rating)
-                )
-            except ValueError:
-                pass
+    def list(self, request, *args, **kwargs):
+        params = request.query_params
+        try:
+            self.point = (float(params["lat"]), float(params["lng"]))
+            self.radius_km = float(params.get("radius_km", 5))
+        except (KeyError, ValueError):
+            return Response(
+                {"error": "lat and lng are required numbers."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        lat, lng   = self.point
+        max_radius = getattr(settings, "NEARBY_MAX_RADIUS_KM", 100)
+        if not (-90 <= lat <= 90 and -180 <= lng <= 180 and 0 < self.radius_km <= max_radius):
+            return Response(
+                {"error": f"lat/lng out of range or radius_km not in (0, {max_radius}]."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return super().list(request, *args, **kwargs)
+
+    def get_queryset(self):
+        qs = Restaurant.objects.with_listing_relations()
+        qs = filter_restaurants(qs, self.request.query_params)
+        return geo.within_radius(qs, *self.point, self.radius_km)
 
-        return qs.order_by("-rating")
+
+def filter_restaurants(qs, params):
+    """
+    The listing filters shared by RestaurantListView and
+    NearbyRestaurantsView: search, cuisine, food_type, price_range and
+    min_rating/max_rating.
+    """
+    search      = params.get("search")
+    cuisine     = params.get("cuisine")
+    food_type   = params.get("food_type")
+    price_range = params.get("price_range")
+    min_rating  = params.get("min_rating", "")
+    max_rating  = params.get("max_rating", "")
+
+    if search:
+        qs = search_restaurants(qs, search)
+
+    if cuisine:
+        qs = qs.filter(cuisine_type__name__icontains=cuisine)
+
+    if food_type:
+        qs = qs.filter(food_type__name__icontains=food_type)
+
+    if price_range:
+        qs = qs.filter(price_range=price_range)
+
+    if min_rating and max_rating:
+        try:
+            qs = qs.filter(
+                rating__gte=float(min_rating), rating__lte=float(max_rating)
+            )
+        except ValueError:
+            pass
+
+    return qs
 
 
 # ---------------------------------------------------------------------
@@ -202,8 +219,11 @@ class RestaurantListView(ListAPIView):
 
 class RestaurantDetailView(APIView):
     
+    @cached_response(lambda id: [restaurant_scope(id)])
     def get(self, request, id):
-        restaurant = get_object_or_404(Restaurant, id=id)
+        restaurant = get_object_or_404(
+            Restaurant.objects.with_listing_relations(), id=id
+        )
         bookings_today = Booking.objects.filter(
             restaurant=restaurant,
             date=localdate()
@@ -229,15 +249,8 @@ class RestaurantDetailView(APIView):
 
         restaurant = serializer.save()
 
-        # handle photo uploads
-        for photo in request.FILES.getlist("photos"):
-            key = upload_to_s3(photo)
-            thumb = generate_thumbnail(photo)
-            thumb_key = f"thumbnail/{key}"
-            upload_to_s3(thumb, thumb_key)
-            RestaurantPhoto.objects.create(
-                restaurant=restaurant, photo_key=key, thumbnail_s3_key=thumb_key
-            )
+        # photos are resized and uploaded in the background (restaurants/photos.py)
+        ingest_photos(restaurant, request.FILES.getlist("photos"))
         if "tables" in request.data:
             try:
                 tables_data = json.loads(request.data["tables"])
@@ -340,35 +353,32 @@ class ReservationAnalyticsMonthView(APIView):
 #  Duplicate detection / admin cleanup
 # ---------------------------------------------------------------------
 class DuplicateListingsView(APIView):
-    def get(self, _request):
-        duplicates = (
-            Restaurant.objects.annotate(
-                n_name=Lower(Trim("name")),
-                n_addr=Lower(Trim("address")),
-                n_city=Lower(Trim("city")),
-                n_state=Lower(Trim("state")),
-                n_zip=Lower(Trim("zip_code")),
-            )
-            .values("n_name", "n_addr", "n_city", "n_state", "n_zip")
-            .annotate(cnt=Count("id"))
-            .filter(cnt__gt=1)
+    def get(self, request):
+        normalized = Restaurant.objects.annotate(
+            n_name=Lower(Trim("name")),
+            n_addr=Lower(Trim("address")),
+            n_city=Lower(Trim("city")),
+            n_state=Lower(Trim("state")),
+            n_zip=Lower(Trim("zip_code")),
         )
+        # another listing with the same normalized name/address/location
+        twins = normalized.filter(
+            n_name=OuterRef("n_name"),
+            n_addr=OuterRef("n_addr"),
+            n_city=OuterRef("n_city"),
+            n_state=OuterRef("n_state"),
+            n_zip=OuterRef("n_zip"),
+        ).exclude(pk=OuterRef("pk"))
 
-        listings = []
-        for dup in duplicates:
-            listings.extend(
-                RestaurantSerializer(
-                    Restaurant.objects.filter(
-                        name__iexact=dup["n_name"],
-                        address__iexact=dup["n_addr"],
-                        city__iexact=dup["n_city"],
-                        state__iexact=dup["n_state"],
-                        zip_code__iexact=dup["n_zip"],
-                    ),
-                    many=True,
-                ).data
-            )
-        return Response(listings, status=status.HTTP_200_OK)
+        duplicates = (
+            normalized.filter(Exists(twins))
+            .with_listing_relations()
+        )
+        # (n_name, id) keeps each duplicate group together across pages
+        return paginated_response(
+            request, duplicates, RestaurantSerializer,
+            KeysetPagination(ordering=("n_name", "id")),
+        )
 
 
 class DeleteDuplicateListingView(APIView):
@@ -481,12 +491,13 @@ class AddListingView(APIView):
 class OldListingsView(APIView):
     permission_classes = [IsAdmin]
 
-    def get(self, _request):
+    def get(self, request):
         cutoff = timezone.now() - timedelta(days=180)
-        old = Restaurant.objects.filter(review_count=0, created_at__lt=cutoff)
-        return Response(
-            RestaurantSerializer(old, many=True).data, status=status.HTTP_200_OK
+        old = (
+            Restaurant.objects.with_listing_relations()
+            .filter(review_count=0, created_at__lt=cutoff)
         )
+        return paginated_response(request, old, RestaurantSerializer, RestaurantPagination())
 
     def delete(self, _request, id):
         cutoff = timezone.now() - timedelta(days=180)
@@ -499,7 +510,7 @@ class OwnerRestaurantListingsView(APIView):
     permission_classes = [IsBusinessOwner]
 
     def get(self, request):
-        listings = Restaurant.objects.filter(owner=request.user)
+        listings = Restaurant.objects.with_listing_relations().filter(owner=request.user)
         return Response(
             RestaurantListingSerializer(listings, many=True).data,
             status=status.HTTP_200_OK,
@@ -517,14 +528,7 @@ class UpdateRestaurantListingView(APIView):
 
         listing = serializer.save()
 
-        for photo in request.FILES.getlist("photos"):
-            key = upload_to_s3(photo)
-            thumb = generate_thumbnail(photo)
-            thumb_key = f"thumbnail/{key}"
-            upload_to_s3(thumb, thumb_key)
-            RestaurantPhoto.objects.create(
-                restaurant=listing, photo_key=key, thumbnail_s3_key=thumb_key
-            )
+        ingest_photos(listing, request.FILES.getlist("photos"))
 
         return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -542,14 +546,8 @@ class DeletePhotoView(APIView):
         if photo.restaurant.owner != request.user:
             return Response(status=status.HTTP_403_FORBIDDEN)
 
-        if delete_s3_object(photo.photo_key):
-            photo.delete()
-            return Response(status=status.HTTP_200_OK)
-
-        return Response(
-            {"error": "Failed to delete from S3"},
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-        )
+        release_photo(photo)
+        return Response(status=status.HTTP_200_OK)
 
 
 class UploadPhotoView(APIView):
@@ -561,28 +559,56 @@ class UploadPhotoView(APIView):
         if restaurant.owner != request.user:
             return Response(status=status.HTTP_403_FORBIDDEN)
 
-        for photo in request.FILES.getlist("photos"):
-            key = upload_to_s3(photo)
-            thumb = generate_thumbnail(photo)
-            thumb_key = f"thumbnail/{key}"
-            upload_to_s3(thumb, thumb_key)
-            RestaurantPhoto.objects.create(
-                restaurant=restaurant, photo_key=key, thumbnail_s3_key=thumb_key
-            )
-
-        return Response(status=status.HTTP_201_CREATED)
+        photos = ingest_photos(restaurant, request.FILES.getlist("photos"))
+        return Response(
+            RestaurantPhotoSerializer(photos, many=True).data,
+            status=status.HTTP_201_CREATED,
+        )
 
 
 class PhotoDetailView(APIView):
     def get(self, _request, photo_id):
         photo = get_object_or_404(RestaurantPhoto, id=photo_id)
-        url = (
-            f"https://{settings.AWS_S3_BUCKET_NAME}.s3."
-            f"{settings.AWS_REGION}.amazonaws.com/{photo.photo_key}"
-        )
+        url = get_storage().url(photo.photo_key)
         return Response({"photo_url": url}, status=status.HTTP_200_OK)
 
 
+def local_media(request, key):
+    """
+    Serve a LocalStorage file.  With LOCAL_STORAGE_SENDFILE_HEADER set the
+    front-end server (nginx X-Accel-Redirect, Apache/lighttpd X-Sendfile)
+    sends the bytes; otherwise FileResponse hands the open file to the
+    WSGI server's file_wrapper, which uses sendfile(2) where available.
+    """
+    storage = get_storage()
+    if not isinstance(storage, LocalStorage):
+        raise Http404
+    try:
+        path = storage.path(key)
+    except StorageError:
+        raise Http404
+    if signing_enabled() and not storage.verify(
+        key, request.GET.get("expires"), request.GET.get("signature")
+    ):
+        return HttpResponse(status=status.HTTP_403_FORBIDDEN)
+    if not os.path.isfile(path):
+        raise Http404
+
+    content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    header = getattr(settings, "LOCAL_STORAGE_SENDFILE_HEADER", None)
+    if header:
+        response = HttpResponse(content_type=content_type)
+        if header.lower() == "x-accel-redirect":
+            prefix = getattr(settings, "LOCAL_STORAGE_SENDFILE_PREFIX", "/protected-media/")
+            response[header] = f"{prefix.rstrip('/')}/{key}"
+        else:
+            response[header] = path
+    else:
+        response = FileResponse(open(path, "rb"), content_type=content_type)
+    response["Cache-Control"] = cache_control()      # keys are content-addressed
+    return response
+
+
 # ---------------------------------------------------------------------
 #  Google Places passthrough
 # ---------------------------------------------------------------------
@@ -610,9 +636,7 @@ class BookTableAPIView(APIView):
 #         booking.save()
 #         return Response({"message": "Booking cancelled."}, status=200)
 
-    @transaction.atomic
     def post(self, request):
-        user = request.user
         data = request.data
 
         # ----- Parse inputs ----------------------------------------------------------
@@ -628,97 +652,77 @@ class BookTableAPIView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        if date_obj < timezone.localdate() or (
-            date_obj == timezone.localdate() and time_obj <= timezone.localtime().time()
-        ):
-            print("inside date_obj < timezone.localdate() or (date_obj == timezone.localdate() and time_obj <= timezone.localtime().time()) - timezone.localtime().time(), time_obj are -  ", timezone.localtime().time(), time_obj)
-            return Response(
-                {"error": "Cannot book in the past."},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-
-        # ----- Fetch table with row-level lock --------------------------------------
+        # ----- Book (no table lock; the unique constraint decides races) -------------
         try:
-            table = (
-                Table.objects.select_for_update()
-                .get(id=table_id, restaurant_id=restaurant_id)
-            )
-        except Table.DoesNotExist:
-            return Response(
-                {"error": "Table / restaurant mismatch."},
-                status=status.HTTP_400_BAD_REQUEST,
+            booking = book_table(
+                request.user, restaurant_id, table_id, date_obj, time_obj, num_people
             )
+        except BookingRejected as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except BookingConflict as e:
+            return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT)
 
-        if num_people > table.size:
+        return Response(BookingSerializer(booking).data, status=status.HTTP_201_CREATED)
+
+
+class PartyBookingAPIView(APIView):
+    """
+    /api/restaurants/bookings/party/?restaurant_id=&date=&time=&num_people=
+
+    GET  → the tables restaurants.allocation would give the party
+    POST → book them (same fields in the body), all or nothing; 409 when
+           no free table or combination of tables seats the party
+    """
+    permission_classes = [IsAuthenticated]
+
+    @staticmethod
+    def parse(data):
+        parsed = (
+            int(data["restaurant_id"]),
+            dt_date.fromisoformat(data["date"]),
+            dt_time.fromisoformat(data["time"]),
+            int(data["num_people"]),
+        )
+        if parsed[3] < 1:
+            raise ValueError("num_people must be at least 1.")
+        return parsed
+
+    def get(self, request):
+        try:
+            restaurant_id, date_obj, time_obj, num_people = self.parse(request.query_params)
+        except (KeyError, TypeError, ValueError):
             return Response(
-                {"error": "Table seats fewer than requested party."},
+                {"error": "Invalid or missing parameters."},
                 status=status.HTTP_400_BAD_REQUEST,
             )
+        chosen = allocate_for(restaurant_id, date_obj, time_obj, num_people) or []
+        return Response({
+            "tables": [
+                {"id": table_id, "size": size, "num_people": seats}
+                for (table_id, size), (_, seats) in zip(chosen, split_party(chosen, num_people))
+            ],
+        })
 
-        # ----- Optional: enforce available_times ±30 minutes ------------------------
-        if table.available_times:
-            req_minutes = time_obj.hour * 60 + time_obj.minute
-            within_window = any(
-                abs(
-                    req_minutes
-                    - (
-                        datetime.strptime(t, "%H:%M").hour * 60
-                        + datetime.strptime(t, "%H:%M").minute
-                    )
-                )
-                <= 30
-                for t in table.available_times
-            )
-            if not within_window:
-                return Response(
-                    {"error": "Requested time outside allowed slots."},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
-
-        # ----- Double-booking check --------------------------------------------------
-        if Booking.objects.filter(
-            table=table,
-            date=date_obj,
-            time=time_obj,
-            status=Booking.Status.BOOKED,
-        ).exists():
+    def post(self, request):
+        try:
+            restaurant_id, date_obj, time_obj, num_people = self.parse(request.data)
+        except (KeyError, TypeError, ValueError):
             return Response(
-                {"error": "Table already booked at that time."},
+                {"error": "Invalid or missing parameters."},
                 status=status.HTTP_400_BAD_REQUEST,
             )
+        get_object_or_404(Restaurant, pk=restaurant_id)
 
-        # ----- Create booking --------------------------------------------------------
-        booking = Booking.objects.create(
-            user=user,
-            restaurant_id=restaurant_id,
-            table=table,
-            date=date_obj,
-            time=time_obj,
-            num_people=num_people,
-        )
-
-        # ----- Confirmation e-mail ---------------------------------------------------
         try:
-            print("Attempting to send email to:", user.email)
-            send_mail(
-                'Booking Confirmation',
-                (
-                    f"Hi {user.first_name or user.username},\n\n"
-                    f"Your table for {num_people} at {booking.restaurant.name} "
-                    f"on {date_obj:%B %d, %Y} at {time_obj:%H:%M} is confirmed."
-                ),
-                "noreply@restaurantapp.com",
-                [user.email],
-                fail_silently=False,
-            )
-        except Exception as e:
-            logger.error("Email send failed: %s", e)  # logs to console or file
-            print("Email send failed:", e) 
-            
-            print("Email user:", settings.EMAIL_HOST_USER)
+            bookings = book_party(request.user, restaurant_id, date_obj, time_obj, num_people)
+        except BookingRejected as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except BookingConflict as e:
+            return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT)
 
-
-        return Response(BookingSerializer(booking).data, status=status.HTTP_201_CREATED)
+        bookings = Booking.objects.filter(pk__in=[b.pk for b in bookings]) \
+            .select_related("restaurant", "table").order_by("-table__size", "table_id")
+        return Response(BookingSerializer(bookings, many=True).data, status=status.HTTP_201_CREATED)
 
 # class CancelBookingAPIView(APIView):
 #     permission_classes = [IsAuthenticated]
@@ -758,9 +762,6 @@ class CancelBookingAPIView(APIView):
             user=user,
             status=Booking.Status.BOOKED,
         ).first()
-        if booking.status == 'CANCELLED':
-            return Response({"detail": "Booking already cancelled."}, status=status.HTTP_400_BAD_REQUEST)
-
         if not booking:
             return Response({"error": "Booking not found."}, status=404)
 
@@ -770,11 +771,54 @@ class CancelBookingAPIView(APIView):
 
 
 
+class WaitlistAPIView(APIView):
+    """
+    GET  → the signed-in user's waitlist entries, newest first
+    POST → join: restaurant_id, date, earliest, latest (hh:mm), num_people
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        entries = WaitlistEntry.objects.filter(user=request.user) \
+            .select_related("restaurant").order_by("-created_at")
+        return Response(WaitlistEntrySerializer(entries, many=True).data)
+
+    def post(self, request):
+        data = request.data
+        try:
+            restaurant_id = int(data["restaurant_id"])
+            date_obj      = dt_date.fromisoformat(data["date"])
+            earliest      = dt_time.fromisoformat(data["earliest"])
+            latest        = dt_time.fromisoformat(data["latest"])
+            num_people    = int(data["num_people"])
+        except (KeyError, TypeError, ValueError):
+            return Response(
+                {"error": "Invalid or missing parameters."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        restaurant = get_object_or_404(Restaurant, pk=restaurant_id)
+        try:
+            entry = join_waitlist(request.user, restaurant.pk, date_obj, earliest, latest, num_people)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(WaitlistEntrySerializer(entry).data, status=status.HTTP_201_CREATED)
+
+
+class LeaveWaitlistAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def delete(self, request, entry_id):
+        deleted, _ = WaitlistEntry.objects.filter(id=entry_id, user=request.user).delete()
+        if not deleted:
+            return Response({"error": "Waitlist entry not found."}, status=404)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
 class MyBookingsAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
         bookings = Booking.objects.filter(
             user=request.user, status=Booking.Status.BOOKED
-        ).order_by('-date', '-time')
-        return Response(BookingSerializer(bookings, many=True).data)
\ No newline at end of file
+        ).select_related("restaurant", "table")
+        return paginated_response(request, bookings, BookingSerializer, BookingPagination())
\ No newline at end of file
@@ -0,0 +1,134 @@
+# restaurants/waitlist.py
+# ---------------------------------------------------------------------
+#  Waitlist and freed-slot notifications
+# ---------------------------------------------------------------------
+#  Guests join with (restaurant, date, earliest–latest window, party
+#  size).  When a BOOKED booking is cancelled (models.offer_cancelled_slot)
+#  the cancel request only schedules ``notify_waitlist`` on the "mail"
+#  background pool after commit; nothing is matched or mailed inline, so
+#  a slot with thousands of waiters cancels as fast as one with none.
+#
+#  Matching is one range scan of the partial index on WAITING entries:
+#
+#      restaurant = R, date = D, earliest BETWEEN m - W AND m
+#      ... and latest >= m, num_people <= freed table size
+#
+#  where W = WAITLIST_MAX_WINDOW_MINUTES caps every window, so only the
+#  entries that start within W minutes before the slot are read.  The
+#  oldest WAITLIST_NOTIFY_BATCH matches are marked NOTIFIED in one
+#  UPDATE and mailed; whoever books first gets the table.  Rows are
+#  claimed with SKIP LOCKED (PostgreSQL), so two cancellations at once
+#  never mail the same guest twice.
+# ---------------------------------------------------------------------
+import logging
+
+from django.conf import settings
+from django.core.mail import send_mass_mail
+from django.db import transaction
+from django.utils import timezone
+
+from . import background
+from .bookings import MAIL_POOL
+from .models import Table, TableSlot, WaitlistEntry
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_WINDOW   = 120
+DEFAULT_NOTIFY_BATCH = 10
+
+
+def max_window():
+    return int(getattr(settings, "WAITLIST_MAX_WINDOW_MINUTES", DEFAULT_MAX_WINDOW))
+
+
+def notify_batch():
+    return int(getattr(settings, "WAITLIST_NOTIFY_BATCH", DEFAULT_NOTIFY_BATCH))
+
+
+def join(user, restaurant_id, date, earliest, latest, num_people):
+    """
+    Put a party on the waitlist; ``earliest``/``latest`` are times of day.
+
+    Raises:
+        ValueError: empty, too wide or past window, or a bad party size.
+    """
+    low, high = TableSlot.to_minute(earliest), TableSlot.to_minute(latest)
+    if num_people < 1:
+        raise ValueError("num_people must be at least 1.")
+    if high < low:
+        raise ValueError("The window ends before it starts.")
+    if high - low > max_window():
+        raise ValueError(f"The window can span at most {max_window()} minutes.")
+    now = timezone.localtime()
+    if date < now.date() or (date == now.date() and high <= TableSlot.to_minute(now)):
+        raise ValueError("Cannot wait for a time in the past.")
+    return WaitlistEntry.objects.create(
+        user=user, restaurant_id=restaurant_id, date=date,
+        earliest=low, latest=high, num_people=num_people,
+    )
+
+
+def slot_released(booking):
+    """Offer a cancelled booking's table to the waitlist once the cancel commits."""
+    minute = TableSlot.to_minute(booking.time)
+    now    = timezone.localtime()
+    if booking.date < now.date() or (booking.date == now.date() and minute <= TableSlot.to_minute(now)):
+        return                          # nobody can take a slot that has passed
+    args = (booking.restaurant_id, booking.date, minute, booking.table_id)
+    transaction.on_commit(lambda: background.submit_to(MAIL_POOL, notify_waitlist, *args))
+
+
+def matching(restaurant_id, date, minute, seats):
+    """WAITING entries a table for ``seats`` at ``minute`` would suit, oldest first."""
+    return WaitlistEntry.objects.filter(
+        restaurant_id=restaurant_id,
+        date=date,
+        status=WaitlistEntry.Status.WAITING,
+        earliest__range=(minute - max_window(), minute),
+        latest__gte=minute,
+        num_people__lte=seats,
+    ).order_by("created_at", "id")
+
+
+def notify_waitlist(restaurant_id, date, minute, table_id):
+    """
+    Claim and mail the oldest entries the freed table suits; worker entry point.
+
+    Returns:
+        int: number of guests notified.
+    """
+    seats = Table.objects.filter(pk=table_id).values_list("size", flat=True).first()
+    if seats is None:
+        return 0
+    with transaction.atomic():
+        entries = list(
+            matching(restaurant_id, date, minute, seats)
+            .select_for_update(skip_locked=True, of=("self",))
+            .select_related("user", "restaurant")[:notify_batch()]
+        )
+        if not entries:
+            return 0
+        WaitlistEntry.objects.filter(pk__in=[e.pk for e in entries]).update(
+            status=WaitlistEntry.Status.NOTIFIED, notified_at=timezone.now()
+        )
+
+    name = entries[0].restaurant.name
+    messages = [
+        (
+            "A table just opened up",
+            (
+                f"Hi {e.user.first_name or e.user.username},\n\n"
+                f"A table for {e.num_people} at {name} on {date:%B %d, %Y} at "
+                f"{TableSlot.as_hhmm(minute)} is free again. Book soon – other guests "
+                f"on the waitlist have been told too."
+            ),
+            "noreply@restaurantapp.com",
+            [e.user.email],
+        )
+        for e in entries
+    ]
+    try:
+        send_mass_mail(messages, fail_silently=False)
+    except Exception as e:
+        logger.error("Waitlist mail failed for restaurant %s on %s: %s", restaurant_id, date, e)
+    return len(entries)
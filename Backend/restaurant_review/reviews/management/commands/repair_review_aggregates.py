@@ -0,0 +1,23 @@
+"""
+Rebuild the denormalized review aggregates on every restaurant.
+
+    python manage.py repair_review_aggregates
+
+Review writes keep Restaurant.rating_sum / review_count / rating current
+incrementally; run this after bulk imports, raw SQL or QuerySet.update()
+on reviews, which bypass that.
+"""
+from django.core.management.base import BaseCommand
+
+from reviews.models import repair_review_aggregates
+
+
+class Command(BaseCommand):
+    help = "Recompute restaurant rating sums, review counts and averages from the reviews."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **opts):
+        fixed = repair_review_aggregates(batch_size=opts["batch_size"])
+        self.stdout.write(f"corrected {fixed} restaurants")
@@ -0,0 +1,20 @@
+# Generated by Django 5.1.2 on 2026-10-18 13:16
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0017_keyset_pagination_indexes'),
+        ('reviews', '0002_alter_review_restaurant'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['restaurant', '-created_at', 'id'], name='reviews_rev_restaur_d6a072_idx'),
+        ),
+    ]
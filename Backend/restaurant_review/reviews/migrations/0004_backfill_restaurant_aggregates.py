@@ -0,0 +1,39 @@
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db import migrations
+from django.db.models import Count, Sum
+
+
+def backfill(apps, schema_editor):
+    # also repairs the averages the old signal stored as sum / 5
+    Restaurant = apps.get_model('restaurants', 'Restaurant')
+    Review     = apps.get_model('reviews', 'Review')
+    totals = {
+        row['restaurant_id']: (row['total'], row['count'])
+        for row in Review.objects.order_by().values('restaurant_id')
+                         .annotate(total=Sum('rating'), count=Count('id'))
+    }
+    restaurants = list(Restaurant.objects.only('id'))
+    for restaurant in restaurants:
+        rating_sum, review_count = totals.get(restaurant.pk, (0, 0))
+        restaurant.rating_sum   = rating_sum
+        restaurant.review_count = review_count
+        restaurant.rating = (
+            (Decimal(rating_sum) / review_count).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+            if review_count else Decimal('0.00')
+        )
+    Restaurant.objects.bulk_update(
+        restaurants, ['rating_sum', 'review_count', 'rating'], batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0024_restaurant_rating_sum'),
+        ('reviews', '0003_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.db import migrations
+from django.db.models import Count
+
+STAR_FIELDS = ['stars_1', 'stars_2', 'stars_3', 'stars_4', 'stars_5']
+
+
+def backfill(apps, schema_editor):
+    Restaurant = apps.get_model('restaurants', 'Restaurant')
+    Review     = apps.get_model('reviews', 'Review')
+    mean   = float(getattr(settings, 'RANKING_PRIOR_MEAN', 3.5))
+    weight = max(float(getattr(settings, 'RANKING_PRIOR_WEIGHT', 10)), 1e-9)
+
+    counts = {}
+    for row in Review.objects.order_by().values('restaurant_id', 'rating').annotate(n=Count('id')):
+        counts.setdefault(row['restaurant_id'], {})[row['rating']] = row['n']
+
+    restaurants = list(Restaurant.objects.only('id', 'rating_sum', 'review_count'))
+    for restaurant in restaurants:
+        per_rating = counts.get(restaurant.pk, {})
+        for star, name in enumerate(STAR_FIELDS, start=1):
+            setattr(restaurant, name, per_rating.get(star, 0))
+        restaurant.ranking_score = (
+            (weight * mean + restaurant.rating_sum) / (weight + restaurant.review_count)
+        )
+    Restaurant.objects.bulk_update(
+        restaurants, [*STAR_FIELDS, 'ranking_score'], batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0025_restaurant_rating_histogram'),
+        ('reviews', '0004_backfill_restaurant_aggregates'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
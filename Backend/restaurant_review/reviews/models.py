@@ -1,10 +1,16 @@
 # Create your models here.
-from django.db import models
-from django.db.models import Sum
+import math
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db import models, transaction
+from django.db.models import Case, Count, DecimalField, F, FloatField, Value, When
+from django.db.models.functions import Cast
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from accounts.models import CustomUser
+from restaurants import ranking
 from restaurants.models import Restaurant
+from restaurants.response_cache import ALL_SCOPE, invalidate, invalidate_restaurant
 
 class Review(models.Model):
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
@@ -13,16 +19,143 @@ class Review(models.Model):
     review_text = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['restaurant', '-created_at', 'id']),  # keyset pagination
+        ]
+
     def __str__(self):
         return f'{self.restaurant.name} - {self.rating}/5'
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # what the restaurant aggregates currently count for this review
+        loaded = dict(zip(field_names, values))
+        if 'restaurant_id' in loaded and 'rating' in loaded:
+            instance._counted = (loaded['restaurant_id'], loaded['rating'])
+        return instance
+
+    # the restaurant aggregates change in the same transaction as the review
+    def save(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get('using')):
+            return super().delete(*args, **kwargs)
+
+
+# ---------------------------------------------------------------------
+#  Restaurant review aggregates
+# ---------------------------------------------------------------------
+#  Restaurant.rating_sum / review_count / rating (the average), the
+#  stars_1 … stars_5 histogram and ranking_score (restaurants/ranking.py)
+#  are kept up to date with one UPDATE ... SET x = x + d per review
+#  write, so the cost doesn't grow with the number of reviews and
+#  concurrent reviews can't overwrite each other's counts.
+#  ``manage.py repair_review_aggregates`` rebuilds them from scratch.
+
+def average_rating(rating_sum, review_count):
+    if not review_count:
+        return Decimal('0.00')
+    return (Decimal(rating_sum) / review_count).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+
+def adjust_review_aggregates(restaurant_id, rating, count_delta):
+    """Count (``count_delta=1``) or uncount (``-1``) one ``rating`` for a restaurant."""
+    rating_sum   = F('rating_sum') + rating * count_delta
+    review_count = F('review_count') + count_delta
+    # the right-hand sides all see the row as it was before the UPDATE
+    updates = {
+        'rating_sum':    rating_sum,
+        'review_count':  review_count,
+        'rating':        Case(
+            When(review_count__lte=-count_delta, then=Value(Decimal('0.00'))),
+            default=Cast(
+                Cast(rating_sum, FloatField()) / review_count,
+                DecimalField(max_digits=3, decimal_places=2),
+            ),
+        ),
+        'ranking_score': ranking.score_expression(rating_sum, review_count),
+    }
+    if 1 <= rating <= 5:
+        star = Restaurant.STAR_FIELDS[rating - 1]
+        updates[star] = F(star) + count_delta
+    Restaurant.objects.filter(pk=restaurant_id).update(**updates)
+
+
+def repair_review_aggregates(batch_size=1000):
+    """
+    Recompute every restaurant's aggregates from its reviews with one
+    grouped query; returns the number of restaurants corrected.
+    """
+    with transaction.atomic():
+        # lock first: reviews committed after this wait for us and then
+        # apply their own increment on top of the rebuilt values
+        restaurants = list(
+            Restaurant.objects.select_for_update()
+            .only('id', *Restaurant.REVIEW_AGGREGATE_FIELDS)
+            .order_by('pk')
+        )
+        counts = {}                                 # {restaurant_id: {rating: n}}
+        for row in (Review.objects.order_by().values('restaurant_id', 'rating')
+                          .annotate(n=Count('id'))):
+            counts.setdefault(row['restaurant_id'], {})[row['rating']] = row['n']
+
+        changed = []
+        for restaurant in restaurants:
+            per_rating   = counts.get(restaurant.pk, {})
+            rating_sum   = sum(rating * n for rating, n in per_rating.items())
+            review_count = sum(per_rating.values())
+            values = {
+                'rating':        average_rating(rating_sum, review_count),
+                'rating_sum':    rating_sum,
+                'review_count':  review_count,
+                'ranking_score': ranking.bayesian_score(rating_sum, review_count),
+                **{name: per_rating.get(star, 0)
+                   for star, name in enumerate(Restaurant.STAR_FIELDS, start=1)},
+            }
+            if any(
+                not math.isclose(getattr(restaurant, name), value) if name == 'ranking_score'
+                else getattr(restaurant, name) != value
+                for name, value in values.items()
+            ):
+                for name, value in values.items():
+                    setattr(restaurant, name, value)
+                changed.append(restaurant)
+        Restaurant.objects.bulk_update(
+            changed, Restaurant.REVIEW_AGGREGATE_FIELDS, batch_size=batch_size
+        )
+        if changed:
+            invalidate(ALL_SCOPE)
+    return len(changed)
+
+
+@receiver(post_save, sender=Review)
+def count_review(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    current = (instance.restaurant_id, instance.rating)
+    counted = None if created else getattr(instance, '_counted', None)
+    if counted == current:
+        return
+    if counted is not None:
+        adjust_review_aggregates(counted[0], counted[1], -1)
+    adjust_review_aggregates(instance.restaurant_id, instance.rating, 1)
+    instance._counted = current
+
+
+@receiver(post_delete, sender=Review)
+def uncount_review(sender, instance, **kwargs):
+    restaurant_id, rating = getattr(instance, '_counted', (instance.restaurant_id, instance.rating))
+    adjust_review_aggregates(restaurant_id, rating, -1)
+
+
 @receiver(post_save, sender=Review)
 @receiver(post_delete, sender=Review)
-def update_restaurant_rating(sender, instance, **kwargs):
-    restaurant = instance.restaurant
-    reviews = restaurant.reviews.all()
-
-    total_rating = reviews.aggregate(Sum('rating'))['rating__sum'] or 0
-    restaurant.rating = total_rating / 5
-    restaurant.review_count = reviews.count()
-    restaurant.save()
\ No newline at end of file
+def invalidate_review_responses(sender, instance, raw=False, **kwargs):
+    # reviews move the restaurant's rating and rank, so the list changes too
+    if raw:
+        return
+    invalidate_restaurant(instance.restaurant_id)
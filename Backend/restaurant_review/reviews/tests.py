@@ -1,3 +1,102 @@
-from django.test import TestCase
+from io import StringIO
 
-# Create your tests here.
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from accounts.models import CustomUser
+from restaurants.models import Restaurant
+from restaurants.tests import make_owner, make_restaurant
+from .models import Review
+
+
+class ReviewAggregateTests(TestCase):
+    def setUp(self):
+        self.restaurant = make_restaurant(make_owner())
+        self.users = [
+            CustomUser.objects.create_user(
+                username=f"critic{i}", email=f"critic{i}@example.com", password="pw", role="user"
+            )
+            for i in range(3)
+        ]
+
+    def aggregates(self):
+        self.restaurant.refresh_from_db()
+        return self.restaurant.rating_sum, self.restaurant.review_count, float(self.restaurant.rating)
+
+    def test_submit_updates_aggregates_in_constant_queries(self):
+        client = APIClient()
+        url = reverse("submit-review", args=[self.restaurant.id])
+        for user, rating in zip(self.users, (4, 5, 2)):
+            client.force_authenticate(user)
+            # restaurant, duplicate check, insert, one UPDATE (+ savepoint, release)
+            with self.assertNumQueries(6):
+                res = client.post(url, {"rating": rating, "review_text": "ok"})
+            self.assertEqual(res.status_code, 201)
+        self.assertEqual(self.aggregates(), (11, 3, 3.67))
+
+        detail = client.get(reverse("restaurant-detail", args=[self.restaurant.id])).data
+        self.assertEqual((detail["review_count"], detail["average_rating"]), (3, 3.7))
+
+    def test_edit_delete_and_stale_restaurant_saves(self):
+        stale = Restaurant.objects.get(pk=self.restaurant.pk)
+        first = Review.objects.create(user=self.users[0], restaurant=self.restaurant, rating=5, review_text="a")
+        Review.objects.create(user=self.users[1], restaurant=self.restaurant, rating=3, review_text="b")
+
+        review = Review.objects.get(pk=first.pk)
+        review.rating = 1
+        review.save()
+        self.assertEqual(self.aggregates(), (4, 2, 2.0))
+
+        stale.description = "edited without knowing about the reviews"
+        stale.save()
+        self.assertEqual(self.aggregates(), (4, 2, 2.0))
+
+        Review.objects.filter(pk=first.pk).delete()
+        self.assertEqual(self.aggregates(), (3, 1, 3.0))
+        self.users[1].delete()                              # cascades to the review
+        self.assertEqual(self.aggregates(), (0, 0, 0.0))
+
+    @override_settings(RANKING_PRIOR_MEAN=3.5, RANKING_PRIOR_WEIGHT=10)
+    def test_many_good_reviews_outrank_one_perfect_review(self):
+        critics = self.users + [
+            CustomUser.objects.create_user(
+                username=f"extra{i}", email=f"extra{i}@example.com", password="pw", role="user"
+            )
+            for i in range(17)
+        ]
+        popular = make_restaurant(self.restaurant.owner, name="Popular")
+        for i, user in enumerate(critics):                  # 16 × 5★ + 4 × 4★ = 4.8
+            Review.objects.create(user=user, restaurant=popular, rating=5 if i < 16 else 4, review_text="x")
+        Review.objects.create(user=critics[0], restaurant=self.restaurant, rating=5, review_text="x")
+        make_restaurant(self.restaurant.owner, name="Unreviewed")
+
+        popular.refresh_from_db()
+        self.assertEqual(popular.rating_histogram, [0, 0, 0, 4, 16])
+        self.assertAlmostEqual(popular.ranking_score, (35 + 96) / 30)
+
+        res = APIClient().get(reverse("restaurant-list"))
+        self.assertEqual([row["name"] for row in res.data], ["Popular", "Testaurant", "Unreviewed"])
+        self.assertEqual(res.data[1]["rating_histogram"], [0, 0, 0, 0, 1])
+
+        Review.objects.filter(restaurant=popular, rating=4).delete()
+        popular.refresh_from_db()
+        self.assertEqual(popular.rating_histogram, [0, 0, 0, 0, 16])
+
+    def test_repair_command_rebuilds_from_reviews(self):
+        for user, rating in zip(self.users, (5, 4, 4)):
+            Review.objects.create(user=user, restaurant=self.restaurant, rating=rating, review_text="x")
+        other = make_restaurant(self.restaurant.owner, name="Unreviewed")
+        Restaurant.objects.update(rating_sum=99, review_count=7, rating=2.6, stars_2=3, ranking_score=0)
+
+        out = StringIO()
+        with self.assertNumQueries(5):      # savepoint, lock, grouped sum, bulk update, release
+            call_command("repair_review_aggregates", stdout=out)
+        self.assertIn("corrected 2", out.getvalue())
+        self.assertEqual(self.aggregates(), (13, 3, 4.33))
+        self.assertEqual(self.restaurant.rating_histogram, [0, 0, 0, 2, 1])
+        call_command("repair_review_aggregates", stdout=out)
+        self.assertIn("corrected 0", out.getvalue())    # idempotent
+        other.refresh_from_db()
+        self.assertEqual((other.rating_sum, other.review_count, other.rating), (0, 0, 0))
@@ -1,9 +1,10 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from django.db.models import Avg
 from .models import Review
 from restaurants.models import Restaurant
+from restaurants.pagination import ReviewPagination, paginated_response
+from restaurants.response_cache import cached_response, restaurant_scope
 from .serializers import ReviewSerializer
 from accounts.permissions import IsUser
 
@@ -23,19 +24,16 @@ class SubmitReviewView(APIView):
 
         serializer = ReviewSerializer(data=request.data)
         if serializer.is_valid():
+            # restaurant aggregates are updated by reviews.models
             serializer.save(user=request.user, restaurant=restaurant)
-            avg_rating = Review.objects.filter(restaurant=restaurant).aggregate(Avg('rating'))['rating__avg']
-            restaurant.rating = round(avg_rating, 1)
-            restaurant.save()
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
 class GetReviewsView(APIView):
+    @cached_response(lambda restaurant_id: [restaurant_scope(restaurant_id)])
     def get(self, request, restaurant_id):
-        try:
-            reviews = Review.objects.filter(restaurant_id=restaurant_id)
-            serializer = ReviewSerializer(reviews, many=True)
-            return Response(serializer.data, status=status.HTTP_200_OK)
-        except Exception as e:
-            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+        reviews = Review.objects.filter(restaurant_id=restaurant_id).select_related(
+            "user", "restaurant"
+        )
+        return paginated_response(request, reviews, ReviewSerializer, ReviewPagination())
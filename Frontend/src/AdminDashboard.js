@@ -3,6 +3,7 @@ import 'bootstrap/dist/css/bootstrap.min.css';
 import './AdminDashboard.css';
 import { useNavigate } from 'react-router-dom';
 import { refreshAccessToken } from './auth';
+import { fetchAllPages } from './api';
 import Footer from './Footer';
 
 function AdminDashboard() {
@@ -42,10 +43,7 @@ function AdminDashboard() {
         setIsLoading(true);
         setError(null);
         try {
-            const response = await fetch(`${API_URL}/restaurants/`);
-            if (!response.ok) throw new Error('Failed to fetch listings');
-            const data = await response.json();
-            setAllListings(data);
+            setAllListings(await fetchAllPages(`${API_URL}/restaurants/`));
         } catch (err) {
             setError(err.message);
         } finally {
@@ -2,6 +2,7 @@ import React, { useEffect, useState } from 'react';
 import { useNavigate } from 'react-router-dom';
 import Footer from './Footer';
 import "./Profile.css";
+import { fetchAllPages } from './api';
 
 const Profile = () => {
     const [bookings, setBookings] = useState([]);
@@ -50,14 +51,11 @@ const Profile = () => {
                 const token = sessionStorage.getItem("accessToken");
                 if (!token) throw new Error("Not logged in");
         
-                const res = await fetch(`${API_URL}/restaurants/bookings/my/`, {
+                const data = await fetchAllPages(`${API_URL}/restaurants/bookings/my/`, {
                     headers: {
                         'Authorization': `Bearer ${token}`,
                     },
                 });
-        
-                if (!res.ok) throw new Error("Failed to fetch bookings.");
-                const data = await res.json();
                 setBookings(data);
             } catch (err) {
                 console.error("Error fetching bookings:", err);
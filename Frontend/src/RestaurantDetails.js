@@ -4,7 +4,7 @@ import { useParams, useLocation, useNavigate } from "react-router-dom";
 
 import "./RestaurantDetails.css";
 import { refreshAccessToken } from "./auth";
-import { getGooglePlaceDetails } from "./api";
+import { fetchAllPages, getGooglePlaceDetails } from "./api";
 import ImageViewer from "./ImageViewer";
 import Navbar from "./Navbar";
 import Footer from "./Footer";
@@ -136,9 +136,7 @@ const RestaurantDetails = () => {
 
   const fetchReviews = async () => {
     try {
-      const res = await fetch(`${API_URL}/restaurants/${id}/reviews/`);
-      if (!res.ok) throw new Error();
-      setReviews(await res.json());
+      setReviews(await fetchAllPages(`${API_URL}/restaurants/${id}/reviews/`));
     } catch (e) {
       console.error("Fetch reviews error:", e);
     }
@@ -60,5 +60,21 @@
         }
     };
 
+    // List endpoints are keyset-paginated: follow `Link: <…>; rel="next"`
+    // until the last page and return every item.
+    export const fetchAllPages = async (url, options = {}) => {
+        const items = [];
+        let next = url;
+        while (next) {
+            const res = await fetch(next, options);
+            if (!res.ok) throw new Error(`Request failed: ${res.status}`);
+            items.push(...(await res.json()));
+            const link = res.headers.get('Link') || '';
+            const match = link.match(/<([^>]+)>;\s*rel="next"/);
+            next = match ? match[1] : null;
+        }
+        return items;
+    };
+
 
     export default api;